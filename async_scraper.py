@@ -0,0 +1,278 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from field_projection import JOB_DETAIL, loads
+from main_scratch import JOBCAT_SEPARATOR, JobScraper
+from rate_control import AdaptiveRateLimiter
+
+
+class AsyncJobScraper(JobScraper):
+    """以 asyncio 並行抓取職缺明細與公司資料，輸出與 JobScraper 相同的 job dict"""
+
+    def __init__(self, base_url='https://www.104.com.tw', company_cache=None, output_format='csv',
+                 concurrency=10, rate_per_host=5.0, crawl_index=None, response_cache=None):
+        super().__init__(base_url, company_cache, output_format=output_format, crawl_index=crawl_index,
+                         response_cache=response_cache)
+        self.concurrency = concurrency
+        self.rate_per_host = rate_per_host
+        self._limiters = {}
+        self._semaphore = None
+        self._client = None
+        self._company_inflight = {}
+        self._warm_up = None
+
+    def _limiter_for(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._limiters:
+            # rate_per_host 為每個主機的速率上限，遇到 429/5xx 時自動降速
+            self._limiters[host] = AdaptiveRateLimiter(initial_rate=self.rate_per_host, max_rate=self.rate_per_host)
+            self.metrics.watch_rate_limiter(host, self._limiters[host])
+        return self._limiters[host]
+
+    async def _open(self):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        # 連線數與並行數一致，閒置連線保留較久，避免類別之間重新握手
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency, limit_per_host=self.concurrency, keepalive_timeout=60, ttl_dns_cache=300
+        )
+        self._client = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=30))
+
+    async def _close(self):
+        await self._client.close()
+        self._client = None
+        self._limiters = {}
+        self._company_inflight = {}
+        self._warm_up = None
+
+    async def _init_session_async(self):
+        if self.response_cache and self.response_cache.offline:
+            return True
+        # 同一個 aiohttp session 只暖機一次，並行的類別共用同一個暖機請求
+        if self._warm_up is None:
+            self._warm_up = asyncio.ensure_future(self._warm_up_session())
+        warmed = await self._warm_up
+        if not warmed:
+            self._warm_up = None
+        return warmed
+
+    async def _warm_up_session(self):
+        try:
+            wait = self._limiter_for(self.base_url).reserve()
+            self.metrics.add_time('sleep', wait)
+            await asyncio.sleep(wait)
+            async with self._client.get(f'{self.base_url}/jobs/search/', headers=self.headers) as response:
+                await response.read()
+            return True
+        except Exception as e:
+            logging.error(f"Error initializing session: {str(e)}")
+            return False
+
+    async def get_request_async(self, url, params=None, headers=None, projection=None):
+        if not headers:
+            headers = self.headers
+
+        if self.response_cache:
+            cached = self.response_cache.get(url, params)
+            if cached is not None:
+                return projection.project(cached) if projection else cached
+            if self.response_cache.offline:
+                logging.warning(f"Offline replay: no cached response for URL: {url} with params: {params}")
+                return None
+
+        limiter = self._limiter_for(url)
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                logging.info(f"Retrying... (Attempt {attempt}/{self.max_retries})")
+            wait = limiter.reserve()
+            self.metrics.add_time('sleep', wait)
+            await asyncio.sleep(wait)
+            start = time.monotonic()
+            try:
+                async with self._semaphore:
+                    async with self._client.get(url, params=params, headers=headers) as response:
+                        body = await response.read()
+                        latency = time.monotonic() - start
+                        limiter.record(response.status, latency, response.headers.get('Retry-After'))
+                        self.metrics.record_request(url, response.status, latency, len(body), attempt)
+                        if response.status == 429 or response.status >= 500:
+                            logging.error(f"Request failed for URL: {url} with params: {params}. Status: {response.status}")
+                            continue
+                        response.raise_for_status()
+                with self.metrics.timer('parse'):
+                    if projection and not self.response_cache:
+                        return projection.decode(body)
+                    data = loads(body)
+                if self.response_cache:
+                    self.response_cache.set(url, params, data)
+                return projection.project(data) if projection else data
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if not isinstance(e, aiohttp.ClientResponseError):
+                    limiter.record(None, time.monotonic() - start)
+                    self.metrics.record_request(url, None, time.monotonic() - start, attempt=attempt)
+                logging.error(f"Request failed for URL: {url} with params: {params}. Error: {str(e)}")
+                if isinstance(e, aiohttp.ClientResponseError):
+                    return None
+            except ValueError as e:
+                logging.error(f"Request failed for URL: {url} with params: {params}. Error: {str(e)}")
+                return None
+
+        logging.error(f"Max retries reached for URL: {url}")
+        return None
+
+    async def _enrich_job_async(self, job):
+        job_detail_url = f"{self.base_url}/job/ajax/content/{job['code']}"
+        detail = await self.get_request_async(job_detail_url, headers=self.detail_headers, projection=JOB_DETAIL)
+
+        company_code = self._apply_job_detail(job, detail)
+        if company_code:
+            self._apply_company_detail(job, company_code, await self._fetch_company_async(company_code))
+
+    async def _fetch_company_async(self, company_code):
+        company = self.company_cache.get(company_code)
+        if company is not None:
+            return company
+
+        # 同一間公司同時被多筆職缺查詢時，只送出一次請求
+        if company_code not in self._company_inflight:
+            self._company_inflight[company_code] = asyncio.ensure_future(self._load_company(company_code))
+        return await self._company_inflight[company_code]
+
+    async def _load_company(self, company_code):
+        try:
+            company_url = f"{self.base_url}/company/ajax/content/{company_code}"
+            company = self._parse_company_response(await self.get_request_async(company_url))
+            if company:
+                self.company_cache.set(company_code, company)
+            return company
+        finally:
+            self._company_inflight.pop(company_code, None)
+
+    async def fetch_jobs_async(self, city_code, job_code):
+        jobs, complete = await self._fetch_category_async(city_code, job_code)
+        return jobs
+
+    async def _fetch_category_async(self, city_code, job_code):
+        """回傳 (職缺, 是否完整抓完)；暖機或任何一頁請求失敗時不算完整，增量模式不會據此判斷下架"""
+        url = f'{self.base_url}/jobs/search/list'
+        all_jobs = []
+        job_name = self.job_codes.name(job_code)
+
+        if not await self._init_session_async():
+            logging.error("Failed to initialize session")
+            return [], False
+
+        params = self._build_search_params(city_code, job_code, 1)
+        self._log_page(params, job_name)
+        first = await self.get_request_async(url, params=params)
+        remaining = self._remaining_page_params(city_code, job_code, first) if first else []
+
+        # 其餘頁面一次並行送出，再依頁序處理，遇到空頁即停止
+        for page_params in remaining:
+            self._log_page(page_params, job_name)
+        responses = [first] + list(await asyncio.gather(
+            *(self.get_request_async(url, params=page_params) for page_params in remaining)
+        ))
+
+        pending = []
+        complete = True
+        for params, response in zip([params] + remaining, responses):
+            jobs = self._list_jobs(response, params)
+            if jobs is None:
+                logging.warning(f"Page {params['page']} of job_code {job_code} failed")
+                complete = False
+                break
+            if not jobs:
+                break
+            with self.metrics.timer('parse'):
+                new_jobs, to_enrich = self._filter_new_jobs(jobs, job_name)
+            pending.extend(self._enrich_job_async(job) for job in to_enrich)
+            all_jobs.extend(new_jobs)
+            self.metrics.add_jobs(len(new_jobs))
+        await asyncio.gather(*pending)
+
+        logging.info(f"Total jobs fetched for job_code {job_code} ({job_name}): {len(all_jobs)}")
+        return all_jobs, complete
+
+    async def _run_city(self, city_name, city_code, sink):
+        """爬取一個城市的所有類別，回傳沒有完整抓完的類別 code"""
+        categories = asyncio.Semaphore(self.concurrency)
+        failed = set()
+
+        async def fetch(job_name, job_code):
+            async with categories:
+                logging.info(f"Fetching data for {city_name} - {job_name}")
+                try:
+                    jobs, complete = await self._fetch_category_async(city_code, job_code)
+                except Exception as e:
+                    logging.error(f"Error processing {city_name} - {job_name}: {str(e)}")
+                    jobs, complete = [], False
+                if not complete:
+                    failed.add(job_code)
+                return jobs
+
+        # 每個類別完成就寫出，不在記憶體累積整個城市的資料
+        tasks = [fetch(name, code) for name, code in self.job_codes.items()]
+        for completed in asyncio.as_completed(tasks):
+            jobs = await completed
+            with self.metrics.timer('save'):
+                sink.write(jobs)
+            self.metrics.add_saved(len(jobs))
+            codes = [job['code'] for job in jobs if job.get('code')]
+            self.crawl_queue.record_jobs(city_code, codes)
+            if self.crawl_index:
+                self.crawl_index.record(city_code, jobs)
+            for code in codes:
+                self.seen_jobs[code] = None
+        return failed
+
+    async def run_async(self):
+        if self.crawl_index:
+            self._begin_incremental(list(self.city_codes))
+        await self._open()
+        crawled = {}
+        try:
+            for city_name, city_code in self.city_codes.items():
+                sink = self.sink_class(self.sink_class.output_path(self.output_dir, city_name, datetime.now()))
+                failed = await self._run_city(city_name, city_code, sink)
+                if failed:
+                    logging.warning(
+                        f"{len(failed)} categories of {city_name} failed; removed jobs are not detected for this city"
+                    )
+                else:
+                    crawled[city_code] = self._crawled_categories(self.job_codes)
+                sink.merge_job_categories(self.crawl_queue.extra_categories(city_code), JOBCAT_SEPARATOR)
+                sink.close()
+        finally:
+            for limiter in self._limiters.values():
+                limiter.log_metrics()
+            await self._close()
+        self.company_cache.log_stats()
+        if self.response_cache:
+            self.response_cache.log_stats()
+        self._log_dedup_stats()
+        self.metrics.log_summary()
+        if self.crawl_index:
+            self._finish_incremental(crawled)
+
+    def fetch_jobs(self, city_code, job_code):
+        async def main():
+            await self._open()
+            try:
+                return await self.fetch_jobs_async(city_code, job_code)
+            finally:
+                await self._close()
+
+        return asyncio.run(main())
+
+    def run(self):
+        asyncio.run(self.run_async())
+
+
+if __name__ == "__main__":
+    scraper = AsyncJobScraper()
+    scraper.run()
@@ -0,0 +1,84 @@
+import argparse
+import glob
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from crawl_analytics import CrawlAnalytics
+from job_normalize import normalize_salary
+
+
+def write_history(directory, days, rows):
+    """以範例 CSV 產生連續 days 天、每天 rows 列的輸出檔，applyCnt 逐日增加"""
+    sample = pd.read_csv(glob.glob(os.path.join(ROOT, 'job_104_data_*.csv'))[0], dtype=str, keep_default_na=False)
+    df = pd.concat([sample] * (rows // len(sample) + 1), ignore_index=True).head(rows)
+    apply_cnt = pd.to_numeric(df['applyCnt'], errors='coerce').fillna(0).astype(int)
+    for day in range(days):
+        crawl_date = date(2025, 1, 1) + timedelta(days=day)
+        df['applyCnt'] = (apply_cnt + day).astype(str)
+        df.to_csv(os.path.join(directory, f'job_104_data_台北市_{crawl_date:%Y%m%d}_0900.csv'), index=False,
+                  encoding='utf-8-sig')
+
+
+def raw_groupby(directory):
+    """原本的做法：每次查詢都讀取所有原始 CSV 再 groupby"""
+    frames = []
+    for path in sorted(glob.glob(os.path.join(directory, 'job_104_data_*.csv'))):
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        df['crawl_date'] = os.path.basename(path).split('_')[-2]
+        frames.append(df)
+    df = pd.concat(frames, ignore_index=True)
+    df = pd.concat([df, normalize_salary(df)], axis=1)
+    latest = df[df['crawl_date'] == df['crawl_date'].max()]
+    df['applyCnt'] = pd.to_numeric(df['applyCnt'], errors='coerce')
+    return (
+        latest.groupby('coIndustryDesc')['salary_monthly_min'].median(),
+        latest.groupby('jobAddrNoDesc').size(),
+        df.groupby(['JobCat', 'crawl_date'])['applyCnt'].mean()
+    )
+
+
+def queries(analytics):
+    return (analytics.median_salary_by_industry(), analytics.postings_by_district(), analytics.apply_trend())
+
+
+def timed(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    print(f"{label:<28}: {(time.perf_counter() - start) * 1000:10.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比較每次掃描原始輸出檔的 groupby 與預先彙總表的查詢速度")
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--rows', type=int, default=20000, help="每天的職缺數")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    directory = tempfile.mkdtemp()
+    try:
+        write_history(directory, args.days, args.rows)
+        print(f"snapshots: {args.days}  rows: {args.days * args.rows}")
+        timed('raw files + groupby', raw_groupby, directory)
+
+        analytics = CrawlAnalytics(os.path.join(directory, 'store'))
+        timed('update (all snapshots)', analytics.update, [directory])
+        timed('update (nothing changed)', analytics.update, [directory])
+        timed('queries (cold)', queries, analytics)
+        timed('queries (warm)', queries, analytics)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_scraper import AsyncJobScraper
+from main_scratch import JobScraper
+from mock_104_server import start_mock_server
+from rate_control import AdaptiveRateLimiter
+
+
+def bench(scraper, city_code, job_code):
+    start = time.perf_counter()
+    jobs = scraper.fetch_jobs(city_code, job_code)
+    return jobs, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比較同步與 asyncio 爬取引擎在模擬 104 API 上的吞吐量")
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--pages', type=int, default=3)
+    parser.add_argument('--jobs-per-page', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--rate', type=float, default=200.0)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    server, base_url = start_mock_server(latency=args.latency, pages=args.pages, jobs_per_page=args.jobs_per_page)
+    city_code, job_code = '6001001000', '2001001002'
+
+    # 同步引擎不限速，只比較請求模式本身的差異
+    sync_scraper = JobScraper(base_url, rate_limiter=AdaptiveRateLimiter(initial_rate=10000, max_rate=10000))
+    sync_jobs, sync_elapsed = bench(sync_scraper, city_code, job_code)
+
+    async_scraper = AsyncJobScraper(base_url, concurrency=args.concurrency, rate_per_host=args.rate)
+    async_jobs, async_elapsed = bench(async_scraper, city_code, job_code)
+    server.shutdown()
+
+    assert sync_jobs == async_jobs, "async engine produced different job dicts"
+    print(f"jobs: {len(sync_jobs)}  latency: {args.latency * 1000:.0f} ms")
+    print(f"sync : {sync_elapsed:7.2f} s  {len(sync_jobs) / sync_elapsed:8.1f} jobs/s")
+    print(f"async: {async_elapsed:7.2f} s  {len(async_jobs) / async_elapsed:8.1f} jobs/s")
+    print(f"speedup: {sync_elapsed / async_elapsed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import ast
+import glob
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from crawl_index import decode_nested
+from csv_ingest import convert_directory, decode_repr_values, load_crawl_csv
+from sinks import NESTED_COLUMNS
+
+
+def write_sample(path, rows):
+    """把範例 CSV 重複到指定列數；每列換上不同的 code 與連結，和實際資料一樣不會被去重或共用解析結果"""
+    sample = pd.read_csv(glob.glob(os.path.join(ROOT, 'job_104_data_*.csv'))[0], dtype=str, keep_default_na=False)
+    df = pd.concat([sample] * (rows // len(sample) + 1), ignore_index=True).head(rows)
+    df['code'] = [str(10000000 + i) for i in range(len(df))]
+    df['link'] = [link.replace('?', f'?r={i}&', 1) for i, link in enumerate(df['link'])]
+    df.to_csv(path, index=False, encoding='utf-8-sig')
+
+
+def legacy_load(path):
+    """原本的讀法：pandas 推斷型別，再逐格 literal_eval"""
+    df = pd.read_csv(path)
+    for col in NESTED_COLUMNS:
+        if col in df.columns:
+            df[col] = [ast.literal_eval(x) if isinstance(x, str) else x for x in df[col]]
+    return df
+
+
+def check_mixed_values():
+    """不是 repr 的值（例如含逗號的 1,2）混在其中時，其他列的值不能錯位"""
+    values = ["['a']", '1,2', "{'k': 'v'}", "['b', 'c']"]
+    assert decode_repr_values(values) == [decode_nested(value) for value in values]
+    assert decode_repr_values(values)[2:] == [{'k': 'v'}, ['b', 'c']]
+
+
+def timed(label, rows, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32}: {elapsed:7.2f} s  {rows / elapsed:10.0f} rows/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比較舊 CSV 的讀取方式與 csv_ingest 的速度")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--files', type=int, default=4, help="平行轉換 Parquet 時的檔案數")
+    parser.add_argument('--processes', type=int, default=4)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    check_mixed_values()
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'job_104_data_台北市_20250105_1424.csv')
+        write_sample(path, args.rows)
+
+        legacy = timed('pandas + literal_eval', args.rows, legacy_load, path)
+        loaded = timed('csv_ingest (pyarrow)', args.rows, load_crawl_csv, path, engine='pyarrow')
+        timed('csv_ingest (pandas chunks)', args.rows, load_crawl_csv, path, engine='pandas')
+        assert len(legacy) == len(loaded)
+        assert all(loaded[col].tolist() == legacy[col].tolist() for col in ('tags', 'link', 'major'))
+
+        for i in range(1, args.files):
+            shutil.copy(path, os.path.join(directory, f'job_104_data_台北市_20250105_{1424 + i}.csv'))
+        timed(
+            f'to parquet ({args.files} files, {args.processes} procs)', args.rows * args.files,
+            convert_directory, [directory], os.path.join(directory, 'out'), args.processes
+        )
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
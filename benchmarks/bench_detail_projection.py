@@ -0,0 +1,103 @@
+import argparse
+import gc
+import json
+import logging
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from field_projection import JOB_DETAIL, loads, msgspec
+from mock_104_server import load_fixtures
+
+
+def detail_payload(fixture, index):
+    """仿照職缺明細 API 的完整回應：除了要用的欄位，還有職缺描述、地址、環境照片等大量不需要的欄位"""
+    description = fixture.get('description', '')
+    return {
+        'data': {
+            'header': {
+                'jobName': fixture.get('jobName', ''), 'appearDate': fixture.get('appearDate', ''),
+                'custName': fixture.get('custName', ''), 'custUrl': f'https://www.104.com.tw/company/a{index}x',
+                'analysisType': 1, 'analysisUrl': f'//www.104.com.tw/jobs/apply/analysis/{index}', 'isSaved': False,
+                'isApplied': False
+            },
+            'contact': {'hrName': '人資部', 'email': '', 'visit': '', 'phone': [], 'other': '', 'reply': '2 天內回覆'},
+            'environmentPic': {
+                'environmentPic': [{'thumbnailLink': f'https://static.104.com.tw/{index}/{i}.jpg'} for i in range(8)]
+            },
+            'condition': {
+                'acceptRole': {'role': [{'code': 1, 'description': '上班族'}], 'disRole': {'needHandicapCompendium': False}},
+                'workExp': fixture.get('periodDesc', ''), 'edu': fixture.get('optionEdu', ''), 'major': [],
+                'language': [], 'specialty': [{'code': '12001003009', 'description': 'Excel'}],
+                'skill': [{'code': '11009001003', 'description': '門市管理'}], 'certificate': [], 'other': description
+            },
+            'welfare': {'tag': ['年終獎金', '員工旅遊'], 'welfare': description * 2, 'legalTag': ['勞保', '健保']},
+            'jobDetail': {
+                'jobDescription': description * 3,
+                'jobCategory': [{'code': '2001001002', 'description': '儲備幹部'}],
+                'salary': fixture.get('salaryDesc', ''), 'salaryMin': 30000, 'salaryMax': 45000, 'salaryType': 50,
+                'jobType': 1, 'workType': [], 'addressRegion': fixture.get('jobAddrNoDesc', ''),
+                'addressDetail': fixture.get('jobAddress', ''), 'industryArea': '', 'longitude': fixture.get('lon'),
+                'latitude': fixture.get('lat'), 'manageResp': '不需負擔管理責任', 'businessTrip': '無需出差外派',
+                'workPeriod': '日班', 'vacationPolicy': '週休二日', 'startWorkingDay': '不限', 'needEmp': '1~2人'
+            },
+            'switch': 'on', 'custNo': fixture.get('custNo', ''), 'industry': fixture.get('coIndustryDesc', ''),
+            'employees': '100人'
+        }
+    }
+
+
+def legacy_extract(raw):
+    """原本的做法：解析整個回應，再以巢狀 .get() 與 split 取值"""
+    rep = json.loads(raw)
+    if not rep or 'data' not in rep:
+        return None
+    cust_url = rep['data']['header'].get('custUrl', None)
+    return {
+        'condition': rep['data'].get('condition', {}),
+        'jobCategory': rep['data']['jobDetail'].get('jobCategory', {}),
+        'company_code': cust_url.split('/')[-1] if cust_url else None
+    }
+
+
+def timed(label, count, repeat, func, *args):
+    """執行 repeat 次取最快的一次"""
+    elapsed = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    print(f"{label:<28}: {elapsed:7.2f} s  {count / elapsed:10.0f} responses/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比較職缺明細的完整解析與欄位投影的速度")
+    parser.add_argument('--responses', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    fixtures = load_fixtures()
+    raws = [
+        json.dumps(detail_payload(fixtures[i % len(fixtures)], i), ensure_ascii=False).encode('utf-8')
+        for i in range(args.responses)
+    ]
+    print(f"responses: {len(raws)}  average size: {sum(map(len, raws)) / len(raws) / 1024:.1f} KiB")
+
+    legacy = timed('json.loads + .get()', len(raws), args.repeat, lambda: [legacy_extract(raw) for raw in raws])
+    timed('loads + project', len(raws), args.repeat, lambda: JOB_DETAIL.project_many([loads(raw) for raw in raws]))
+    label = f"decode ({'msgspec' if msgspec else 'no msgspec'})"
+    projected = timed(label, len(raws), args.repeat, JOB_DETAIL.decode_many, raws)
+
+    for old, new in zip(legacy, projected):
+        assert all(old[field] == new[field] for field in old)
+    assert all(new['welfare'] and new['skills'] and new['contact'] for new in projected)
+
+
+if __name__ == "__main__":
+    main()
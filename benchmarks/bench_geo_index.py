@@ -0,0 +1,82 @@
+import argparse
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from geo_index import GeoIndex, haversine
+
+
+def synthetic_jobs(count, seed=0):
+    """台北附近隨機分布、集中在幾個商圈的職缺座標"""
+    rng = np.random.default_rng(seed)
+    centers = np.array([[121.5654, 25.0330], [121.5170, 25.0478], [121.5437, 25.0418], [121.5777, 25.0800]])
+    picked = centers[rng.integers(len(centers), size=count)]
+    lon = picked[:, 0] + rng.normal(0, 0.03, count)
+    lat = picked[:, 1] + rng.normal(0, 0.02, count)
+    districts = np.array(['信義區', '中正區', '大安區', '內湖區'])[rng.integers(4, size=count)]
+    mrt = np.array(['捷運市政府站', '捷運台北車站', '捷運忠孝復興站', '捷運內湖站'])[rng.integers(4, size=count)]
+    codes = np.char.add('job', np.arange(count).astype(str))
+    return lon, lat, codes, districts, mrt, rng.uniform(0, 2, count)
+
+
+def per_query(label, queries, func):
+    """執行每個查詢點取平均時間"""
+    start = time.perf_counter()
+    results = [func(lon, lat) for lon, lat in queries]
+    elapsed = (time.perf_counter() - start) / len(queries)
+    print(f"{label:<28}: {elapsed * 1000:9.3f} ms/query")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比較逐筆計算距離與方格索引的查詢速度")
+    parser.add_argument('--jobs', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--meters', type=float, default=500)
+    parser.add_argument('-k', type=int, default=10)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    lon, lat, codes, districts, mrt, mrt_dist = synthetic_jobs(args.jobs)
+    start = time.perf_counter()
+    index = GeoIndex(lon, lat, codes, districts, mrt, mrt_dist)
+    print(f"jobs: {len(index)}  build: {time.perf_counter() - start:.2f} s  cells: {len(index.cells)}")
+    queries = list(zip(*synthetic_jobs(args.queries, seed=1)[:2]))
+
+    def brute_radius(x, y):
+        distances = haversine(x, y, index.lon, index.lat)
+        return np.flatnonzero(distances <= args.meters)
+
+    def brute_nearest(x, y):
+        return np.argsort(haversine(x, y, index.lon, index.lat))[:args.k]
+
+    brute = per_query('brute force radius', queries, brute_radius)
+    indexed = per_query('index radius', queries, lambda x, y: index.radius(x, y, args.meters)[0])
+    for expected, found in zip(brute, indexed):
+        assert np.array_equal(np.sort(expected), np.sort(found))
+    brute = per_query('brute force nearest', queries, brute_nearest)
+    indexed = per_query('index nearest', queries, lambda x, y: index.nearest(x, y, args.k)[0])
+    for (x, y), expected, found in zip(queries, brute, indexed):
+        assert np.allclose(haversine(x, y, index.lon[expected], index.lat[expected]),
+                           haversine(x, y, index.lon[found], index.lat[found]))
+    per_query('index bbox (1 km)', queries, lambda x, y: index.bbox(x - 0.005, y - 0.005, x + 0.005, y + 0.005))
+    per_query('index station', queries[:1] * args.queries, lambda x, y: index.near_station('捷運市政府站', args.meters))
+
+    path = os.path.join(ROOT, 'bench_geo_index.geo.npz')
+    try:
+        index.save(path)
+        start = time.perf_counter()
+        GeoIndex.load(path)
+        print(f"npz {os.path.getsize(path) / 1024 ** 2:.1f} MiB, load: {time.perf_counter() - start:.2f} s")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import csv
+import gc
+import glob
+import json
+import logging
+import os
+import sys
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from crawl_index import DETAIL_FIELDS, decode_nested
+from job_record import JobRecord
+from sinks import NESTED_COLUMNS
+
+
+def load_pages(rows, page_size=20):
+    """以範例 CSV 組出 API 搜尋列表的 JSON 字串，之後每頁各自解析，模擬爬蟲收到的 dict"""
+    with open(glob.glob(os.path.join(ROOT, 'job_104_data_*.csv'))[0], encoding='utf-8-sig') as f:
+        sample = list(csv.DictReader(f))
+    list_rows = []
+    for row in sample:
+        raw = {k: (decode_nested(v) if k in NESTED_COLUMNS else v) for k, v in row.items()}
+        for column in DETAIL_FIELDS + ('JobCat', 'code'):
+            raw.pop(column, None)
+        list_rows.append(raw)
+    # 範例 CSV 沒有明細欄位，以模擬 API 的明細代替
+    details = {
+        'condition': {'edu': '專科', 'workExp': '2年以上', 'specialty': [], 'skill': [], 'other': '具管理潛能及抗壓性'},
+        'jobCategory': [{'code': '2001001002', 'description': '儲備幹部'}],
+        'company_employees': '6600人',
+        'company_capital': '暫不提供'
+    }
+
+    pages = []
+    for start in range(0, rows, page_size):
+        page = [list_rows[i % len(list_rows)] for i in range(start, min(start + page_size, rows))]
+        pages.append(json.dumps(page, ensure_ascii=False))
+    return pages, details
+
+
+def build(pages, details, compact):
+    jobs = []
+    for payload in pages:
+        for raw in json.loads(payload):
+            job = JobRecord.from_api(raw) if compact else raw
+            job['JobCat'] = '儲備幹部'
+            job['code'] = job['jobNo']
+            for column, value in json.loads(json.dumps(details, ensure_ascii=False)).items():
+                job[column] = value
+            jobs.append(job)
+    return jobs
+
+
+def measure(pages, details, compact):
+    gc.collect()
+    tracemalloc.start()
+    jobs = build(pages, details, compact)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return jobs, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比較 raw dict 與 JobRecord 保存職缺的記憶體用量")
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    pages, details = load_pages(args.rows)
+
+    dict_jobs, dict_bytes = measure(pages, details, compact=False)
+    record_jobs, record_bytes = measure(pages, details, compact=True)
+    assert all(record == job for record, job in zip(record_jobs[:1000], dict_jobs[:1000]))
+
+    per_100k = 100000 / len(dict_jobs) / 1024 ** 2
+    print(f"jobs: {len(dict_jobs)}")
+    print(f"raw dict : {dict_bytes * per_100k:8.1f} MiB per 100k jobs")
+    print(f"JobRecord: {record_bytes * per_100k:8.1f} MiB per 100k jobs")
+    print(f"saved: {(1 - record_bytes / dict_bytes) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import glob
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+from sqlalchemy import text
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from jobdata_to_mysql import JobScraper, read_load_data_file, write_load_data_file
+from sinks import INT_COLUMNS
+
+
+def load_sample(rows):
+    """把範例 CSV 複製到指定筆數，每筆給不同的 code"""
+    sample = pd.read_csv(glob.glob(os.path.join(ROOT, 'job_104_data_*.csv'))[0])
+    repeats = rows // len(sample) + 1
+    df = pd.concat([sample] * repeats, ignore_index=True).head(rows)
+    df['code'] = [f'bench{i}' for i in range(len(df))]
+    return df
+
+
+def check_load_data_file(scraper, df, directory):
+    """寫出 LOAD DATA 用的 TSV 再讀回，確認 NULL、整數與跳脫字元都原樣保留"""
+    rows = scraper._prepare_rows(scraper.serialize_nested_columns(scraper.map_dataframe_to_db(df)))
+    # 加入缺值與需要跳脫的字元
+    rows.loc[rows.index[0], 'applyCnt'] = None
+    rows.loc[rows.index[1], 'jobName'] = 'tab\there\nnew line \\N back\\slash'
+    path = os.path.join(directory, 'load_data.tsv')
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        write_load_data_file(f, rows)
+    loaded = read_load_data_file(path)
+    assert len(loaded) == len(rows)
+    for expected, actual in zip(rows.itertuples(index=False), loaded):
+        for name, value, read in zip(rows.columns, expected, actual):
+            if value is None:
+                assert read is None, (name, read)
+            elif name in INT_COLUMNS:
+                assert read == str(int(value)), (name, value, read)
+            else:
+                assert read == str(value), (name, value, read)
+    return len(loaded)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比較 to_sql(method='multi') 與分批 upsert 的寫入速度（SQLite 代替 MySQL）")
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--db-url', default=None, help="預設使用暫存的 SQLite 檔")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    df = load_sample(args.rows)
+    tmpdir = tempfile.mkdtemp()
+    db_url = args.db_url or f"sqlite:///{os.path.join(tmpdir, 'bench.sqlite')}"
+    scraper = JobScraper(db_url=db_url, batch_size=args.batch_size)
+    checked = check_load_data_file(scraper, df.head(1000), tmpdir)
+
+    # 舊的寫法：逐格序列化後 to_sql append（SQLite 有變數上限，因此加上 chunksize）
+    legacy = scraper.map_dataframe_to_db(df).astype(str)
+    start = time.perf_counter()
+    legacy.to_sql('jobs_legacy', con=scraper.engine, if_exists='append', index=False, method='multi', chunksize=500)
+    legacy_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scraper.save_to_mysql(df)
+    upsert_elapsed = time.perf_counter() - start
+
+    # 重爬同一批資料：upsert 不會產生重複列
+    start = time.perf_counter()
+    scraper.save_to_mysql(df)
+    reupsert_elapsed = time.perf_counter() - start
+
+    with scraper.engine.connect() as conn:
+        count = conn.execute(text('SELECT COUNT(*) FROM jobs')).scalar()
+
+    print(f"rows: {len(df)}  batch size: {args.batch_size}  LOAD DATA file round trip: {checked} rows OK")
+    print(f"to_sql multi   : {legacy_elapsed:7.2f} s  {len(df) / legacy_elapsed:10.0f} rows/s")
+    print(f"bulk upsert    : {upsert_elapsed:7.2f} s  {len(df) / upsert_elapsed:10.0f} rows/s")
+    print(f"re-crawl upsert: {reupsert_elapsed:7.2f} s  rows in table: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse
+import glob
+import html
+import logging
+import os
+import re
+import sys
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from job_normalize import MONTHLY_FACTORS, normalize_jobs, parse_salary_desc
+
+SALARY_DESCS = [
+    '月薪33,000~38,000元', '月薪50,000元以上', '待遇面議', '面議（經常性薪資達4萬元或以上）', '年薪800,000~1,200,000元',
+    '時薪190元', '日薪1,600元', '論件計酬'
+]
+
+
+def load_sample(rows):
+    """把範例 CSV 重複到指定列數，salaryDesc 混入各種薪資寫法"""
+    sample = pd.read_csv(glob.glob(os.path.join(ROOT, 'job_104_data_*.csv'))[0], dtype=str, keep_default_na=False)
+    df = pd.concat([sample] * (rows // len(sample) + 1), ignore_index=True).head(rows)
+    mixed = df.index % 4 == 0
+    df.loc[mixed, 'salaryDesc'] = [SALARY_DESCS[i % len(SALARY_DESCS)] for i in range(mixed.sum())]
+    df.loc[mixed, ['salaryLow', 'salaryHigh', 'salaryType']] = ''
+    return df
+
+
+def row_by_row(df):
+    """逐列處理的寫法，作為比較基準"""
+    rows = []
+    for record in df.to_dict('records'):
+        salary_type, low, high, negotiable, open_ended = parse_salary_desc(record['salaryDesc'])
+        factor = MONTHLY_FACTORS.get(salary_type or 'unknown')
+        text = record['descWithoutHighlight'] or record['description']
+        text = re.sub(r'\s+', ' ', html.unescape(re.sub(r'<[^>]*>', '', text))).strip()
+        rows.append((salary_type, negotiable, low * factor if factor else None, text))
+    return rows
+
+
+def check_leftover_entities(df):
+    """每一列都含 html.unescape 才能處理的實體字元時，結果要與先解開實體字元再正規化相同"""
+    df = df.head(100).copy()
+    df['descWithoutHighlight'] = ''
+    decoded = df.copy()
+    df['description'] = df['description'] + ' &hellip;&#8203;&#x2026;'
+    decoded['description'] = decoded['description'] + html.unescape(' &hellip;&#8203;&#x2026;')
+    expected = normalize_jobs(decoded)['description_text'].tolist()
+    assert normalize_jobs(df)['description_text'].tolist() == expected
+    print(f"leftover entities: {len(df)} rows OK")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比較逐列與整欄向量化的薪資、描述正規化速度")
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    df = load_sample(args.rows)
+    print(f"rows: {len(df)}")
+    check_leftover_entities(df)
+
+    start = time.perf_counter()
+    row_by_row(df)
+    elapsed = time.perf_counter() - start
+    print(f"row by row : {elapsed:7.2f} s  {len(df) / elapsed:10.0f} rows/s")
+
+    start = time.perf_counter()
+    normalized = normalize_jobs(df)
+    elapsed = time.perf_counter() - start
+    print(f"vectorized : {elapsed:7.2f} s  {len(df) / elapsed:10.0f} rows/s")
+    print(normalized['salary_type'].value_counts().to_string())
+
+
+if __name__ == "__main__":
+    main()
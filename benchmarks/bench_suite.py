@@ -0,0 +1,175 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from async_scraper import AsyncJobScraper
+from code_registry import load_registry
+from crawl_metrics import CrawlMetrics
+from crawl_queue import CrawlQueue
+from main_scratch import JobScraper
+from mock_104_server import start_mock_server
+from pipeline import PipelinedJobScraper
+from rate_control import AdaptiveRateLimiter
+
+CITY_CODE = '6001001000'
+JOB_CODES = load_registry().jobs.select(['2001001002', '2001001001', '2001002001'])
+
+
+def _limiter(rate):
+    return AdaptiveRateLimiter(initial_rate=rate, max_rate=rate)
+
+
+def fetch_jobs(base_url, output_dir, rate):
+    scraper = JobScraper(base_url, rate_limiter=_limiter(rate), metrics=CrawlMetrics())
+    return len(scraper.fetch_jobs(CITY_CODE, '2001001002')), scraper.metrics
+
+
+def fetch_jobs_async(base_url, output_dir, rate):
+    scraper = AsyncJobScraper(base_url, concurrency=20, rate_per_host=rate)
+    return len(scraper.fetch_jobs(CITY_CODE, '2001001002')), scraper.metrics
+
+
+def _run(scraper, output_dir):
+    scraper.city_codes = {'台北市': CITY_CODE}
+    scraper.job_codes = JOB_CODES
+    scraper.run()
+    return scraper.metrics.saved_rows, scraper.metrics
+
+
+def run(base_url, output_dir, rate):
+    scraper = JobScraper(
+        base_url, rate_limiter=_limiter(rate), metrics=CrawlMetrics(), output_dir=output_dir,
+        crawl_queue=CrawlQueue(os.path.join(output_dir, 'crawl_queue.sqlite'))
+    )
+    return _run(scraper, output_dir)
+
+
+def run_pipeline(base_url, output_dir, rate):
+    scraper = PipelinedJobScraper(
+        base_url, rate_limiter=_limiter(rate), metrics=CrawlMetrics(), output_dir=output_dir,
+        crawl_queue=CrawlQueue(os.path.join(output_dir, 'crawl_queue.sqlite'))
+    )
+    return _run(scraper, output_dir)
+
+
+SCENARIOS = {
+    'fetch_jobs': fetch_jobs,
+    'fetch_jobs_async': fetch_jobs_async,
+    'run': run,
+    'run_pipeline': run_pipeline
+}
+
+
+def measure(name, base_url, rate, memory):
+    """執行一個情境，回傳吞吐量、各 API 的延遲百分位數，以及（memory 時）tracemalloc 的峰值"""
+    output_dir = tempfile.mkdtemp()
+    try:
+        if memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        jobs, metrics = SCENARIOS[name](base_url, output_dir, rate)
+        elapsed = time.perf_counter() - start
+        peak = None
+        if memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    finally:
+        shutil.rmtree(output_dir)
+
+    endpoints = metrics.snapshot()['endpoints']
+    return {
+        'jobs': jobs,
+        'seconds': elapsed,
+        'jobs_per_second': jobs / elapsed,
+        'peak_memory_mib': peak / 1024 ** 2 if peak is not None else None,
+        'latency': {
+            endpoint: {q: stats['latency'][q] for q in ('p50', 'p95', 'p99')}
+            for endpoint, stats in endpoints.items() if stats['latency']
+        },
+        'requests': {endpoint: stats['requests'] for endpoint, stats in endpoints.items()}
+    }
+
+
+def compare(results, baseline, tolerance):
+    """回傳退步超過 tolerance 的項目"""
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        if result['jobs_per_second'] < old['jobs_per_second'] * (1 - tolerance):
+            regressions.append(f"{name}: {old['jobs_per_second']:.1f} -> {result['jobs_per_second']:.1f} jobs/s")
+        if result['peak_memory_mib'] and old.get('peak_memory_mib') and \
+                result['peak_memory_mib'] > old['peak_memory_mib'] * (1 + tolerance):
+            regressions.append(f"{name}: {old['peak_memory_mib']:.1f} -> {result['peak_memory_mib']:.1f} MiB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在模擬的 104 API 上量測爬蟲的吞吐量、記憶體與延遲長尾")
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument('--latency', type=float, default=0.01)
+    parser.add_argument('--jitter', type=float, default=0.005, help="額外延遲（指數分佈）的平均秒數")
+    parser.add_argument('--pages', type=int, default=3)
+    parser.add_argument('--jobs-per-page', type=int, default=20)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-every', type=int, default=0)
+    parser.add_argument('--rate-limit-burst', type=int, default=0)
+    parser.add_argument('--rate', type=float, default=1000.0, help="爬蟲的速率上限（每秒請求數）")
+    parser.add_argument('--no-memory', action='store_true', help="不以 tracemalloc 量測記憶體（較快）")
+    parser.add_argument('--output', help="把結果寫成 JSON，可作為之後的 --baseline")
+    parser.add_argument('--baseline', help="與先前的結果比較，有退步時以狀態碼 1 結束")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="允許的退步比例")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    server, base_url = start_mock_server(
+        latency=args.latency, jitter=args.jitter, pages=args.pages, jobs_per_page=args.jobs_per_page,
+        error_rate=args.error_rate, rate_limit_every=args.rate_limit_every, rate_limit_burst=args.rate_limit_burst,
+        retry_after=0.1, seed=0
+    )
+    results = {}
+    try:
+        for name in args.scenarios:
+            # 記憶體量測會拖慢執行，吞吐量與延遲另外量一次
+            result = measure(name, base_url, args.rate, memory=False)
+            if not args.no_memory:
+                result['peak_memory_mib'] = measure(name, base_url, args.rate, memory=True)['peak_memory_mib']
+            results[name] = result
+            memory = f"{result['peak_memory_mib']:7.1f} MiB" if result['peak_memory_mib'] is not None else ''
+            tails = ', '.join(
+                f"{endpoint} p95 {latency['p95'] * 1000:.0f} ms / p99 {latency['p99'] * 1000:.0f} ms"
+                for endpoint, latency in result['latency'].items()
+            )
+            print(f"{name:<17}: {result['jobs']:5d} jobs {result['jobs_per_second']:8.1f} jobs/s {memory}")
+            print(f"{'':<17}  {tails}")
+    finally:
+        server.shutdown()
+    statuses = {}
+    for (endpoint, status), count in server.stats.items():
+        statuses[status] = statuses.get(status, 0) + count
+    print(f"mock server responses by status: {dict(sorted(statuses.items()))}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
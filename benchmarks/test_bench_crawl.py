@@ -0,0 +1,34 @@
+"""以 pytest-benchmark 量測 bench_suite 的各情境，CI 可用 --benchmark-compare-fail 擋下吞吐量退步
+
+    pytest benchmarks/test_bench_crawl.py --benchmark-autosave
+    pytest benchmarks/test_bench_crawl.py --benchmark-compare --benchmark-compare-fail=mean:20%
+"""
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from bench_suite import SCENARIOS, start_mock_server
+
+RATE = 1000.0
+
+
+@pytest.fixture(scope='module')
+def base_url():
+    server, base_url = start_mock_server(latency=0.01, jitter=0.005, pages=3, jobs_per_page=20, seed=0)
+    yield base_url
+    server.shutdown()
+
+
+@pytest.mark.parametrize('name', list(SCENARIOS))
+def test_crawl(benchmark, base_url, tmp_path, name):
+    rounds = iter(range(1000))
+
+    def setup():
+        # 每一輪用新的輸出目錄，run() 才不會從上一輪的續跑佇列接著跑
+        output_dir = tmp_path / f'round_{next(rounds)}'
+        output_dir.mkdir()
+        return (base_url, str(output_dir), RATE), {}
+
+    jobs, metrics = benchmark.pedantic(SCENARIOS[name], setup=setup, rounds=5)
+    benchmark.extra_info['jobs'] = jobs
+    assert jobs > 0
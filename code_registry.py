@@ -0,0 +1,68 @@
+import json
+import os
+from collections.abc import Mapping
+from functools import lru_cache
+
+CODES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'codes_104.json')
+
+# 104 的 10 碼代碼：前 4 碼為大類、前 7 碼為中類（城市則為地區、縣市）
+FAMILY_LEVELS = {1: 4, 2: 7}
+
+
+class CodeTable(Mapping):
+    """名稱 → code 的唯讀對照表，另外建好 code → 名稱的反向索引
+
+    行為與原本的 dict 相同（依名稱取 code、依序走訪），name() 以 O(1) 由 code 取回名稱
+    """
+
+    def __init__(self, items=()):
+        self._codes = dict(items)
+        self._names = {}
+        for name, code in self._codes.items():
+            self._names.setdefault(code, name)
+
+    def __getitem__(self, name):
+        return self._codes[name]
+
+    def __iter__(self):
+        return iter(self._codes)
+
+    def __len__(self):
+        return len(self._codes)
+
+    def __repr__(self):
+        return f'CodeTable({self._codes!r})'
+
+    def name(self, code, default=None):
+        return self._names.get(code, default)
+
+    def select(self, prefixes=None, names=None):
+        """依 code 前綴或名稱挑出子集合，例如 select(['2001']) 取得整個大類"""
+        prefixes = tuple(prefixes or ())
+        names = set(names or ())
+        return CodeTable(
+            (name, code) for name, code in self._codes.items()
+            if (prefixes and code.startswith(prefixes)) or name in names
+        )
+
+    def families(self, level=1):
+        """依前綴分組，回傳 {前綴: CodeTable}；level 1 為大類，level 2 為中類"""
+        width = FAMILY_LEVELS[level]
+        groups = {}
+        for name, code in self._codes.items():
+            groups.setdefault(code[:width], []).append((name, code))
+        return {prefix: CodeTable(items) for prefix, items in groups.items()}
+
+
+class CodeRegistry:
+    def __init__(self, cities, jobs):
+        self.cities = CodeTable(cities)
+        self.jobs = CodeTable(jobs)
+
+
+@lru_cache(maxsize=None)
+def load_registry(path=CODES_PATH):
+    """讀取城市與職務類別代碼；同一個 process 只讀一次"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return CodeRegistry(data['cities'], data['jobs'])
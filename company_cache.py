@@ -0,0 +1,80 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class CompanyCache:
+    """以公司 code 為 key 的快取：記憶體 LRU，加上可選的 SQLite 持久層"""
+
+    def __init__(self, max_size=10000, db_path=None, ttl=7 * 24 * 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS company ('
+                'code TEXT PRIMARY KEY, data TEXT NOT NULL, fetched_at REAL NOT NULL)'
+            )
+            self._db.commit()
+
+    def _expired(self, fetched_at):
+        return self.ttl is not None and time.time() - fetched_at > self.ttl
+
+    def get(self, company_code):
+        with self._lock:
+            entry = self._lru.get(company_code)
+            if entry and not self._expired(entry[1]):
+                self._lru.move_to_end(company_code)
+                self.hits += 1
+                return entry[0]
+
+            if self._db:
+                row = self._db.execute(
+                    'SELECT data, fetched_at FROM company WHERE code = ?', (company_code,)
+                ).fetchone()
+                if row and not self._expired(row[1]):
+                    data = json.loads(row[0])
+                    self._remember(company_code, data, row[1])
+                    self.hits += 1
+                    return data
+
+            self.misses += 1
+            return None
+
+    def set(self, company_code, data):
+        fetched_at = time.time()
+        with self._lock:
+            self._remember(company_code, data, fetched_at)
+            if self._db:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO company (code, data, fetched_at) VALUES (?, ?, ?)',
+                    (company_code, json.dumps(data, ensure_ascii=False), fetched_at)
+                )
+                self._db.commit()
+
+    def _remember(self, company_code, data, fetched_at):
+        self._lru[company_code] = (data, fetched_at)
+        self._lru.move_to_end(company_code)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+    def log_stats(self):
+        total = self.hits + self.misses
+        hit_rate = self.hits / total * 100 if total else 0.0
+        logging.info(
+            f"Company cache: {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate), "
+            f"{self.hits} company requests saved"
+        )
+
+    def close(self):
+        if self._db:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,352 @@
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from csv_ingest import normalize_frame, read_csv_frame, repair_frame
+from job_normalize import normalize_salary
+from sinks import JOBCAT_SEPARATOR, ParquetSink
+
+# 計算彙總表用到的欄位，其餘欄位不讀入
+SNAPSHOT_COLUMNS = (
+    'coIndustryDesc', 'jobAddrNoDesc', 'JobCat', 'applyCnt', 'custNo', 'salaryLow', 'salaryHigh', 'salaryDesc',
+    'salaryType'
+)
+# 每張彙總表的維度欄位（除了 crawl_date、city）
+TABLES = {
+    'salary_by_industry': ('coIndustryDesc', 'salary_monthly_min', 'salary_monthly_max'),
+    'postings_by_district': ('jobAddrNoDesc',),
+    'apply_by_jobcat': ('JobCat',)
+}
+# CSV / JSONL 輸出檔：job_104_data_<城市>_<YYYYmmdd>_<HHMM>.<副檔名>
+_OUTPUT_FILE = re.compile(r'job_104_data_(?P<city>.+)_(?P<stamp>\d{8}_\d{4})\.(?:csv|jsonl)$')
+# ParquetSink 的 part 檔：city=<城市>/crawl_date=<YYYY-MM-DD>/<HHMM>-<序號>.parquet
+_PARQUET_PART = re.compile(r'city=(?P<city>[^/\\]+)[/\\]crawl_date=(?P<date>[\d-]+)[/\\](?P<hhmm>\d{4})-\d+\.parquet$')
+
+
+class Snapshot:
+    """一個城市在一個爬取日期的輸出；同一天爬了多次時只取最後一次"""
+
+    __slots__ = ('city', 'crawl_date', 'stamp', 'files')
+
+    def __init__(self, city, crawl_date, stamp, files):
+        self.city = city
+        self.crawl_date = crawl_date
+        self.stamp = stamp
+        self.files = sorted(files)
+
+    @property
+    def key(self):
+        return f'{self.city}/{self.crawl_date}'
+
+    def signature(self):
+        """檔案路徑、大小與修改時間；與上次相同時不必重新彙總"""
+        return [[path, os.path.getsize(path), os.stat(path).st_mtime_ns] for path in self.files]
+
+
+def find_snapshots(paths):
+    """由輸出檔或目錄找出所有快照，回傳 {key: Snapshot}"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            root = glob.escape(path)
+            for extension in ('csv', 'jsonl'):
+                files += glob.glob(os.path.join(root, f'job_104_data_*.{extension}'))
+            files += glob.glob(os.path.join(root, ParquetSink.root, 'city=*', 'crawl_date=*', '*.parquet'))
+            files += glob.glob(os.path.join(root, 'city=*', 'crawl_date=*', '*.parquet'))
+        else:
+            files.append(path)
+
+    runs = {}
+    for path in files:
+        match = _OUTPUT_FILE.search(os.path.basename(path))
+        if match:
+            crawled_at = datetime.strptime(match['stamp'], '%Y%m%d_%H%M')
+            city, crawl_date, stamp = match['city'], crawled_at.strftime('%Y-%m-%d'), crawled_at.strftime('%H%M')
+        else:
+            match = _PARQUET_PART.search(os.path.abspath(path))
+            if not match:
+                logging.warning(f"Skipping {path}: not a crawl output")
+                continue
+            city, crawl_date, stamp = match['city'], match['date'], match['hhmm']
+        runs.setdefault((city, crawl_date, stamp), []).append(path)
+
+    snapshots = {}
+    for (city, crawl_date, stamp), run_files in sorted(runs.items()):
+        # 依 stamp 排序，後面的（較晚的一次）覆蓋同一天較早的
+        snapshot = Snapshot(city, crawl_date, stamp, run_files)
+        snapshots[snapshot.key] = snapshot
+    return snapshots
+
+
+def read_snapshot(snapshot, columns=SNAPSHOT_COLUMNS):
+    """讀取快照中的 columns 欄位（預設為計算彙總表用到的欄位），缺少的欄位為空值"""
+    frames = []
+    for path in snapshot.files:
+        if path.endswith('.parquet'):
+            present = [name for name in columns if name in pq.read_schema(path).names]
+            frames.append(pq.read_table(path, columns=present).to_pandas())
+            continue
+        if path.endswith('.csv'):
+            df = repair_frame(read_csv_frame(path))
+        else:
+            df = pd.read_json(path, lines=True, dtype=False)
+        frames.append(normalize_frame(df[[name for name in columns if name in df.columns]]))
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    return df.reindex(columns=list(columns))
+
+
+def _strings(values):
+    return pa.array(values.astype(object).where(values.notna(), None), type=pa.string())
+
+
+def aggregate_snapshot(df):
+    """以 pyarrow 的 hash aggregate 計算一個快照的三張彙總表，回傳 {表名: pa.Table}
+
+    彙總表只存可以再加總的值（筆數、總和、薪資值的出現次數），跨城市、跨日期查詢時再合併
+    """
+    salary = normalize_salary(df)
+    jobs = pa.table({
+        'coIndustryDesc': _strings(df['coIndustryDesc']),
+        'jobAddrNoDesc': _strings(df['jobAddrNoDesc']),
+        'custNo': _strings(df['custNo']),
+        'applyCnt': pa.array(pd.to_numeric(df['applyCnt'], errors='coerce'), type=pa.float64(), from_pandas=True),
+        'salary_monthly_min': pa.array(salary['salary_monthly_min'], from_pandas=True),
+        'salary_monthly_max': pa.array(salary['salary_monthly_max'], from_pandas=True)
+    })
+    tables = {
+        # 同一產業相同的薪資只留一列與出現次數，中位數可以由次數精確算出
+        'salary_by_industry': jobs.group_by(list(TABLES['salary_by_industry'])).aggregate([([], 'count_all')])
+        .rename_columns(list(TABLES['salary_by_industry']) + ['postings']),
+        'postings_by_district': jobs.group_by('jobAddrNoDesc').aggregate([([], 'count_all'), ('custNo', 'count_distinct')])
+        .rename_columns(['jobAddrNoDesc', 'postings', 'companies'])
+    }
+
+    # 合併多個類別的 JobCat 拆開，各類別都計入
+    job_cats = pc.split_pattern(_strings(df['JobCat']), JOBCAT_SEPARATOR)
+    parents = pc.list_parent_indices(job_cats)
+    by_cat = pa.table({'JobCat': pc.list_flatten(job_cats), 'applyCnt': jobs['applyCnt'].take(parents)})
+    tables['apply_by_jobcat'] = by_cat.group_by('JobCat').aggregate(
+        [([], 'count_all'), ('applyCnt', 'count'), ('applyCnt', 'sum')]
+    ).rename_columns(['JobCat', 'postings', 'apply_postings', 'apply_total'])
+    return tables
+
+
+def _weighted_median(df, group, value, weight):
+    """依 group 計算 value 以 weight 為次數的中位數（偶數筆時取中間兩個的平均）"""
+    df = df[df[value].notna()].sort_values([group, value])
+    if df.empty:
+        return pd.Series(dtype='float64')
+    counts = df[weight].to_numpy(dtype='int64')
+    cumulative = np.cumsum(counts)
+    groups = df[group].to_numpy()
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    ends = np.r_[starts[1:], len(groups)]
+    offsets = cumulative[starts] - counts[starts]
+    totals = cumulative[ends - 1] - offsets
+    values = df[value].to_numpy()
+    lower = values[np.searchsorted(cumulative, offsets + (totals - 1) // 2, side='right')]
+    upper = values[np.searchsorted(cumulative, offsets + totals // 2, side='right')]
+    return pd.Series((lower + upper) / 2, index=groups[starts])
+
+
+class CrawlAnalytics:
+    """以每個爬取日期、每個城市為單位增量維護的彙總表
+
+    store_dir 下每張彙總表為一個 Parquet 檔，manifest.json 記錄已彙總的快照與來源檔案的簽章；
+    update() 只重新彙總新增或變動的快照，查詢只讀取這些小表，不必再掃描原始輸出檔
+    """
+
+    def __init__(self, store_dir='crawl_analytics'):
+        if pa is None:
+            raise ImportError("Crawl analytics requires pyarrow: pip install pyarrow")
+        self.store_dir = store_dir
+        self.manifest_path = os.path.join(store_dir, 'manifest.json')
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        self._frames = {}
+
+    def _table_path(self, name):
+        return os.path.join(self.store_dir, f'{name}.parquet')
+
+    def _read_table(self, name):
+        path = self._table_path(name)
+        return pq.read_table(path) if os.path.exists(path) else None
+
+    def _write(self, path, write):
+        # 先寫到暫存檔再取代，中斷時不會留下寫一半的表
+        temp_path = f'{path}.tmp'
+        write(temp_path)
+        os.replace(temp_path, path)
+
+    def update(self, paths):
+        """彙總 paths 中新增或變動的快照，回傳更新的快照 key"""
+        snapshots = find_snapshots(paths)
+        changed = {}
+        for key, snapshot in snapshots.items():
+            entry = self.manifest.get(key)
+            signature = snapshot.signature()
+            if entry and entry['stamp'] == snapshot.stamp and entry['files'] == signature:
+                continue
+            if entry and entry['stamp'] > snapshot.stamp:
+                continue
+            start = time.perf_counter()
+            df = read_snapshot(snapshot)
+            changed[key] = aggregate_snapshot(df)
+            self.manifest[key] = {
+                'city': snapshot.city, 'crawl_date': snapshot.crawl_date, 'stamp': snapshot.stamp,
+                'files': signature, 'rows': len(df), 'updated_at': datetime.now().isoformat(timespec='seconds')
+            }
+            logging.info(f"Aggregated {key}: {len(df)} rows in {time.perf_counter() - start:.2f} s")
+        if not changed:
+            return []
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        keys = pa.array(list(changed), type=pa.string())
+        for name in TABLES:
+            parts = []
+            for key, tables in changed.items():
+                entry = self.manifest[key]
+                table = tables[name]
+                table = table.append_column('crawl_date', pa.array([entry['crawl_date']] * len(table), pa.string()))
+                table = table.append_column('city', pa.array([entry['city']] * len(table), pa.string()))
+                parts.append(table)
+            old = self._read_table(name)
+            if old is not None:
+                # 移除這些快照舊的彙總結果，其餘的原樣保留
+                old_keys = pc.binary_join_element_wise(old['city'], old['crawl_date'], '/')
+                parts.insert(0, old.filter(pc.invert(pc.is_in(old_keys, value_set=keys))))
+            table = pa.concat_tables(parts, promote_options='permissive').sort_by([('crawl_date', 'ascending'),
+                                                                                   ('city', 'ascending')])
+            self._write(self._table_path(name), lambda path: pq.write_table(table, path))
+        self._write(self.manifest_path, self._save_manifest)
+        self._frames = {}
+        return list(changed)
+
+    def _save_manifest(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+
+    def snapshots(self):
+        """已彙總的快照清單"""
+        rows = [{key: entry[key] for key in ('city', 'crawl_date', 'stamp', 'rows', 'updated_at')}
+                for entry in self.manifest.values()]
+        return pd.DataFrame(rows, columns=['city', 'crawl_date', 'stamp', 'rows', 'updated_at'])
+
+    def frame(self, name):
+        """整張彙總表（DataFrame），讀取一次後保留在記憶體"""
+        if name not in self._frames:
+            table = self._read_table(name)
+            self._frames[name] = table.to_pandas() if table is not None else pd.DataFrame(
+                columns=list(TABLES[name]) + ['crawl_date', 'city']
+            )
+        return self._frames[name]
+
+    def _select(self, name, crawl_date=None, city=None):
+        """篩選城市與日期；沒有指定日期時每個城市取最近一次快照"""
+        df = self.frame(name)
+        if city:
+            df = df[df['city'] == city]
+        if crawl_date:
+            return df[df['crawl_date'] == crawl_date]
+        latest = df.groupby('city')['crawl_date'].transform('max')
+        return df[df['crawl_date'] == latest]
+
+    def median_salary_by_industry(self, crawl_date=None, city=None, industries=None):
+        """各產業的職缺數、有薪資的職缺數，以及月薪下限、上限的中位數（面議、論件計酬不計入）"""
+        df = self._select('salary_by_industry', crawl_date, city)
+        if industries:
+            df = df[df['coIndustryDesc'].isin(industries)]
+        df = df.groupby(['coIndustryDesc', 'salary_monthly_min', 'salary_monthly_max'], dropna=False,
+                        as_index=False)['postings'].sum()
+        result = pd.DataFrame({
+            'postings': df.groupby('coIndustryDesc')['postings'].sum(),
+            'salaried': df[df['salary_monthly_min'].notna()].groupby('coIndustryDesc')['postings'].sum()
+        })
+        result['salaried'] = result['salaried'].fillna(0).astype('int64')
+        result['median_monthly_min'] = _weighted_median(df, 'coIndustryDesc', 'salary_monthly_min', 'postings')
+        result['median_monthly_max'] = _weighted_median(df, 'coIndustryDesc', 'salary_monthly_max', 'postings')
+        return result.rename_axis('coIndustryDesc').reset_index().sort_values('postings', ascending=False,
+                                                                              ignore_index=True)
+
+    def postings_by_district(self, crawl_date=None, city=None):
+        """各行政區的職缺數與公司數"""
+        df = self._select('postings_by_district', crawl_date, city)
+        df = df.groupby(['city', 'jobAddrNoDesc'], dropna=False, as_index=False)[['postings', 'companies']].sum()
+        return df.sort_values('postings', ascending=False, ignore_index=True)
+
+    def apply_trend(self, job_cats=None, city=None, start=None, end=None):
+        """各職務類別每個爬取日期的職缺數、應徵人數總和與平均，以及平均較上一次的變化"""
+        df = self.frame('apply_by_jobcat')
+        if city:
+            df = df[df['city'] == city]
+        if job_cats:
+            df = df[df['JobCat'].isin(job_cats)]
+        if start:
+            df = df[df['crawl_date'] >= start]
+        if end:
+            df = df[df['crawl_date'] <= end]
+        df = df.groupby(['JobCat', 'crawl_date'], as_index=False)[['postings', 'apply_postings', 'apply_total']].sum()
+        df['apply_mean'] = df['apply_total'] / df['apply_postings'].where(df['apply_postings'] > 0)
+        df['apply_mean_change'] = df.groupby('JobCat')['apply_mean'].diff()
+        return df.sort_values(['JobCat', 'crawl_date'], ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="爬取輸出的彙總表：產業薪資中位數、行政區職缺數、職務類別應徵人數趨勢")
+    parser.add_argument('--store', default='crawl_analytics', help="彙總表的目錄")
+    commands = parser.add_subparsers(dest='command', required=True)
+    update = commands.add_parser('update', help="彙總新增或變動的快照")
+    update.add_argument('paths', nargs='+', help="輸出檔或輸出目錄（CSV、JSONL 與 job_104_parquet/）")
+    commands.add_parser('snapshots', help="列出已彙總的快照")
+    for name in ('salary', 'districts'):
+        query = commands.add_parser(name)
+        query.add_argument('--date', help="爬取日期 YYYY-MM-DD，預設為每個城市最近一次")
+        query.add_argument('--city')
+        query.add_argument('--top', type=int, default=30)
+    trend = commands.add_parser('apply-trend')
+    trend.add_argument('--jobcat', nargs='*', help="職務類別名稱")
+    trend.add_argument('--city')
+    trend.add_argument('--start')
+    trend.add_argument('--end')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    analytics = CrawlAnalytics(args.store)
+    if args.command == 'update':
+        updated = analytics.update(args.paths)
+        logging.info(f"Updated {len(updated)} snapshots, {len(analytics.manifest)} in total")
+        return
+
+    start = time.perf_counter()
+    if args.command == 'snapshots':
+        result = analytics.snapshots()
+    elif args.command == 'salary':
+        result = analytics.median_salary_by_industry(args.date, args.city).head(args.top)
+    elif args.command == 'districts':
+        result = analytics.postings_by_district(args.date, args.city).head(args.top)
+    else:
+        result = analytics.apply_trend(args.jobcat, args.city, args.start, args.end)
+    elapsed = time.perf_counter() - start
+    print(result.to_string(index=False))
+    logging.info(f"Query took {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
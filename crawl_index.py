@@ -0,0 +1,197 @@
+import ast
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from datetime import date, datetime
+
+from sinks import JOBCAT_SEPARATOR, NESTED_COLUMNS
+
+# 列表頁上足以判斷職缺內容是否變動的欄位；applyCnt、isSave 等每天都會變的欄位不列入
+FINGERPRINT_FIELDS = (
+    'jobType', 'jobName', 'jobRole', 'jobRo', 'jobAddrNo', 'jobAddress', 'description', 'optionEdu', 'period',
+    'custNo', 'custName', 'coIndustry', 'salaryLow', 'salaryHigh', 'salaryDesc', 'salaryType', 'appearDate',
+    'tags', 'lon', 'lat', 'remoteWorkType', 'major'
+)
+# 由明細與公司 API 補上的欄位，列表沒變動時直接沿用上次的值
+DETAIL_FIELDS = ('condition', 'jobCategory', 'company_employees', 'company_capital', 'welfare', 'skills', 'contact')
+_INT_FIELDS = {'salaryLow', 'salaryHigh'}
+_FLOAT_FIELDS = {'lon', 'lat'}
+
+
+def decode_nested(value):
+    """還原輸出檔中的巢狀欄位：JSONL/Parquet 為 JSON 字串，CSV 為 Python repr"""
+    if not isinstance(value, str):
+        return value
+    if not value:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value
+
+
+def _canonical(field, value):
+    # API 回傳字串，Parquet 讀回來是具型別的值，先統一格式再計算指紋
+    if field in NESTED_COLUMNS:
+        return decode_nested(value)
+    if field in _INT_FIELDS or field in _FLOAT_FIELDS:
+        try:
+            return int(value) if field in _INT_FIELDS else float(value)
+        except (TypeError, ValueError):
+            return None
+    if isinstance(value, date):
+        return value.strftime('%Y%m%d')
+    return '' if value is None else str(value)
+
+
+def fingerprint(job):
+    values = [_canonical(field, job.get(field)) for field in FINGERPRINT_FIELDS]
+    payload = json.dumps(values, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class CrawlIndex:
+    """記錄上次爬取的職缺索引（code → appearDate、列表指紋、明細欄位），每日重爬時只抓新增或變動的職缺明細"""
+
+    def __init__(self, db_path=':memory:'):
+        self.db_path = db_path
+        self.run_id = None
+        self.carried = 0
+        # 管線模式下由多個執行緒共用，所有存取都經過 _lock
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.executescript(
+            'CREATE TABLE IF NOT EXISTS postings ('
+            '  code TEXT PRIMARY KEY, city_code TEXT NOT NULL, appear_date TEXT, fingerprint TEXT NOT NULL,'
+            '  detail TEXT, first_run INTEGER NOT NULL, last_run INTEGER NOT NULL, changed_run INTEGER,'
+            '  job_cats TEXT);'
+            'CREATE INDEX IF NOT EXISTS postings_city ON postings (city_code, last_run);'
+            'CREATE TABLE IF NOT EXISTS runs ('
+            '  run_id INTEGER PRIMARY KEY AUTOINCREMENT, started_at TEXT NOT NULL,'
+            '  finished INTEGER NOT NULL DEFAULT 0);'
+        )
+        # 舊版索引沒有 job_cats 欄位
+        columns = {row[1] for row in self._db.execute('PRAGMA table_info(postings)')}
+        if 'job_cats' not in columns:
+            self._db.execute('ALTER TABLE postings ADD COLUMN job_cats TEXT')
+        self._db.commit()
+
+    def is_new(self):
+        """還沒有任何索引資料，也沒有開始過任何一輪"""
+        with self._lock:
+            return (self._db.execute('SELECT 1 FROM postings LIMIT 1').fetchone() is None
+                    and self._db.execute('SELECT 1 FROM runs LIMIT 1').fetchone() is None)
+
+    def seed(self, city_code, rows):
+        """以上次的輸出檔建立索引（run 0），回傳載入筆數"""
+        with self._lock:
+            count = 0
+            with self._db:
+                for row in rows:
+                    if not row.get('code'):
+                        continue
+                    detail = {field: decode_nested(row.get(field)) for field in DETAIL_FIELDS}
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO postings (code, city_code, appear_date, fingerprint, detail, '
+                        'first_run, last_run, job_cats) VALUES (?, ?, ?, ?, ?, 0, 0, ?)',
+                        (row['code'], city_code, _canonical('appearDate', row.get('appearDate')), fingerprint(row),
+                         json.dumps(detail, ensure_ascii=False) if detail['condition'] else None,
+                         row.get('JobCat') or None)
+                    )
+                    count += 1
+            return count
+
+    def begin_run(self):
+        """開始新的一輪；上一輪中斷時沿用同一個 run_id"""
+        with self._lock:
+            row = self._db.execute('SELECT run_id FROM runs WHERE finished = 0 ORDER BY run_id DESC').fetchone()
+            if row:
+                self.run_id = row[0]
+            else:
+                with self._db:
+                    cursor = self._db.execute('INSERT INTO runs (started_at) VALUES (?)', (datetime.now().isoformat(),))
+                self.run_id = cursor.lastrowid
+            return self.run_id
+
+    def carry_forward(self, job):
+        """列表指紋沒變且上次有完整明細時，把明細欄位帶入 job 並回傳 True"""
+        with self._lock:
+            row = self._db.execute('SELECT fingerprint, detail FROM postings WHERE code = ?', (job['code'],)).fetchone()
+            if not row or not row[1] or row[0] != fingerprint(job):
+                return False
+            job.update(json.loads(row[1]))
+            self.carried += 1
+            return True
+
+    def record(self, city_code, jobs):
+        """記錄本輪已寫出的職缺；明細抓取失敗的職缺不保存明細，下次會重抓"""
+        with self._lock:
+            with self._db:
+                for job in jobs:
+                    if not job.get('code'):
+                        continue
+                    detail = None
+                    if job.get('condition'):
+                        detail = json.dumps({field: job.get(field) for field in DETAIL_FIELDS}, ensure_ascii=False)
+                    self._db.execute(
+                        'INSERT INTO postings (code, city_code, appear_date, fingerprint, detail, first_run, last_run, '
+                        '  job_cats) '
+                        'VALUES (:code, :city_code, :appear_date, :fingerprint, :detail, :run, :run, :job_cats) '
+                        'ON CONFLICT (code) DO UPDATE SET city_code = excluded.city_code, job_cats = excluded.job_cats, '
+                        '  appear_date = excluded.appear_date, detail = excluded.detail, last_run = excluded.last_run, '
+                        '  changed_run = CASE WHEN postings.fingerprint != excluded.fingerprint '
+                        '    AND postings.first_run != excluded.first_run '
+                        '    THEN excluded.last_run ELSE postings.changed_run END, '
+                        '  fingerprint = excluded.fingerprint',
+                        {
+                            'code': job['code'], 'city_code': city_code,
+                            'appear_date': _canonical('appearDate', job.get('appearDate')),
+                            'fingerprint': fingerprint(job), 'detail': detail, 'run': self.run_id,
+                            'job_cats': job.get('JobCat') or None
+                        }
+                    )
+
+    def finish_run(self, crawled):
+        """結束本輪，回傳 {'added', 'changed', 'removed'}
+
+        crawled 為 {city_code: 本輪完整爬過的類別名稱集合}，None 代表爬過所有類別。
+        只有這些城市中沒再出現、且所屬類別都在本輪爬過的職缺才算下架，並從索引移除；
+        不知道類別的職缺只在爬過所有類別時才判斷
+        """
+        with self._lock:
+            def codes(sql, *args):
+                return sorted(row[0] for row in self._db.execute(sql, (self.run_id,) + args))
+
+            delta = {
+                'added': codes('SELECT code FROM postings WHERE first_run = ?'),
+                'changed': codes('SELECT code FROM postings WHERE changed_run = ?'),
+                'removed': []
+            }
+            with self._db:
+                for city_code, job_cats in crawled.items():
+                    rows = self._db.execute(
+                        'SELECT code, job_cats FROM postings WHERE last_run < ? AND city_code = ?',
+                        (self.run_id, city_code)
+                    ).fetchall()
+                    removed = [
+                        code for code, cats in rows
+                        if job_cats is None or (cats and set(cats.split(JOBCAT_SEPARATOR)) <= job_cats)
+                    ]
+                    self._db.executemany('DELETE FROM postings WHERE code = ?', [(code,) for code in removed])
+                    delta['removed'].extend(sorted(removed))
+                self._db.execute('UPDATE runs SET finished = 1 WHERE run_id = ?', (self.run_id,))
+            self.run_id = None
+            return delta
+
+    def log_stats(self):
+        logging.info(f"Crawl index: {self.carried} unchanged jobs reused previous details")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,283 @@
+import bisect
+import cProfile
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+from response_cache import endpoint_type
+
+# 延遲直方圖的上界（秒），約以 1.5 倍遞增，最後一格為 +Inf
+LATENCY_BUCKETS = tuple(round(0.01 * 1.5 ** i, 3) for i in range(22))
+PHASES = ('sleep', 'network', 'parse', 'save')
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """與 Prometheus histogram_quantile 相同，在所屬的區間內線性內插"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+
+class CrawlMetrics:
+    """爬取過程的計數、延遲分佈與各階段耗時，可輸出為 Prometheus 文字格式或 JSON 快照"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.requests = {}
+        self.retries = {}
+        self.bytes = {}
+        self.latency = {}
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.jobs = 0
+        self.saved_rows = 0
+        self.queue_depth = {}
+        self.rate_limiters = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._snapshot_stop = None
+
+    def record_request(self, url, status, latency, size=0, attempt=0):
+        """status 為 None 表示連線失敗"""
+        endpoint = endpoint_type(url)
+        status_class = 'error' if status is None else f'{status // 100}xx'
+        with self._lock:
+            key = (endpoint, status_class)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            if attempt:
+                self.retries[endpoint] = self.retries.get(endpoint, 0) + 1
+            self.bytes[endpoint] = self.bytes.get(endpoint, 0) + size
+            self.latency.setdefault(endpoint, Histogram()).observe(latency)
+            self.phases['network'] += latency
+
+    def add_time(self, phase, seconds):
+        with self._lock:
+            self.phases[phase] += seconds
+
+    @contextmanager
+    def timer(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - start)
+
+    def add_jobs(self, count):
+        with self._lock:
+            self.jobs += count
+
+    def add_saved(self, count):
+        with self._lock:
+            self.saved_rows += count
+
+    def set_queue_depth(self, stage, depth):
+        """管線各階段佇列目前的長度"""
+        with self._lock:
+            self.queue_depth[stage] = depth
+
+    def watch_rate_limiter(self, host, limiter):
+        """登記主機的限速器，快照與 /metrics 會讀取它目前與目標的速率"""
+        with self._lock:
+            self.rate_limiters[host] = limiter
+
+    def snapshot(self):
+        with self._lock:
+            elapsed = time.time() - self.started
+            endpoints = sorted(set(self.latency) | set(self.retries) | {endpoint for endpoint, _ in self.requests})
+            return {
+                'timestamp': time.time(),
+                'elapsed_seconds': elapsed,
+                'jobs': self.jobs,
+                'jobs_per_minute': self.jobs / elapsed * 60 if elapsed else 0.0,
+                'saved_rows': self.saved_rows,
+                'phase_seconds': dict(self.phases),
+                'queue_depth': dict(self.queue_depth),
+                'rate_limits': {host: limiter.metrics() for host, limiter in sorted(self.rate_limiters.items())},
+                'endpoints': {
+                    endpoint: {
+                        'requests': {
+                            status: count for (name, status), count in sorted(self.requests.items())
+                            if name == endpoint
+                        },
+                        'retries': self.retries.get(endpoint, 0),
+                        'bytes': self.bytes.get(endpoint, 0),
+                        'latency': self._latency_summary(self.latency.get(endpoint))
+                    }
+                    for endpoint in endpoints
+                }
+            }
+
+    def _latency_summary(self, histogram):
+        if histogram is None:
+            return None
+        return {
+            'count': histogram.count,
+            'mean': histogram.sum / histogram.count,
+            'p50': histogram.quantile(0.5),
+            'p95': histogram.quantile(0.95),
+            'p99': histogram.quantile(0.99)
+        }
+
+    def prometheus_text(self):
+        lines = []
+        with self._lock:
+            lines += ['# TYPE crawl_requests_total counter']
+            lines += [
+                f'crawl_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}'
+                for (endpoint, status), count in sorted(self.requests.items())
+            ]
+            lines += ['# TYPE crawl_retries_total counter']
+            lines += [f'crawl_retries_total{{endpoint="{e}"}} {count}' for e, count in sorted(self.retries.items())]
+            lines += ['# TYPE crawl_response_bytes_total counter']
+            lines += [f'crawl_response_bytes_total{{endpoint="{e}"}} {size}' for e, size in sorted(self.bytes.items())]
+            lines += ['# TYPE crawl_request_seconds histogram']
+            for endpoint, histogram in sorted(self.latency.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                    cumulative += count
+                    lines.append(f'crawl_request_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+                lines.append(f'crawl_request_seconds_sum{{endpoint="{endpoint}"}} {histogram.sum}')
+                lines.append(f'crawl_request_seconds_count{{endpoint="{endpoint}"}} {histogram.count}')
+            lines += ['# TYPE crawl_phase_seconds_total counter']
+            lines += [f'crawl_phase_seconds_total{{phase="{phase}"}} {seconds}' for phase, seconds in self.phases.items()]
+            lines += ['# TYPE crawl_queue_depth gauge']
+            lines += [f'crawl_queue_depth{{stage="{stage}"}} {depth}' for stage, depth in sorted(self.queue_depth.items())]
+            limits = [(host, limiter.metrics()) for host, limiter in sorted(self.rate_limiters.items())]
+            lines += ['# TYPE crawl_rate_limit_current gauge']
+            lines += [f'crawl_rate_limit_current{{host="{host}"}} {m["current_rate"]}' for host, m in limits]
+            lines += ['# TYPE crawl_rate_limit_target gauge']
+            lines += [f'crawl_rate_limit_target{{host="{host}"}} {m["target_rate"]}' for host, m in limits]
+            lines += ['# TYPE crawl_rate_limit_throttled_total counter']
+            lines += [f'crawl_rate_limit_throttled_total{{host="{host}"}} {m["throttled"]}' for host, m in limits]
+            lines += ['# TYPE crawl_jobs_total counter', f'crawl_jobs_total {self.jobs}']
+            lines += ['# TYPE crawl_saved_rows_total counter', f'crawl_saved_rows_total {self.saved_rows}']
+        return '\n'.join(lines) + '\n'
+
+    def serve_prometheus(self, port, host='0.0.0.0'):
+        """在背景執行緒提供 /metrics，回傳 server"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logging.debug(format % args)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        logging.info(f"Serving crawl metrics on http://{host}:{self._server.server_port}/metrics")
+        return self._server
+
+    def write_snapshot(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def start_snapshots(self, path, interval=60):
+        """每 interval 秒把快照寫到 path，stop() 時再寫一次"""
+        self._snapshot_stop = threading.Event()
+
+        def loop(stop):
+            while not stop.wait(interval):
+                self.write_snapshot(path)
+            self.write_snapshot(path)
+
+        self._snapshot_thread = threading.Thread(target=loop, args=(self._snapshot_stop,), daemon=True)
+        self._snapshot_thread.start()
+
+    def stop(self):
+        if self._snapshot_stop:
+            self._snapshot_stop.set()
+            self._snapshot_thread.join()
+            self._snapshot_stop = None
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def log_summary(self):
+        snapshot = self.snapshot()
+        phases = ', '.join(f"{phase} {seconds:.1f} s" for phase, seconds in snapshot['phase_seconds'].items())
+        logging.info(
+            f"Crawl metrics: {snapshot['jobs']} jobs ({snapshot['jobs_per_minute']:.1f}/min) in "
+            f"{snapshot['elapsed_seconds']:.1f} s; {phases}"
+        )
+        for endpoint, stats in snapshot['endpoints'].items():
+            latency = stats['latency']
+            percentiles = (
+                f"p50 {latency['p50']:.3f} s, p95 {latency['p95']:.3f} s, p99 {latency['p99']:.3f} s"
+                if latency else 'no latency samples'
+            )
+            logging.info(
+                f"  {endpoint}: {stats['requests']}, {stats['retries']} retries, "
+                f"{stats['bytes'] / 1024 ** 2:.1f} MiB, {percentiles}"
+            )
+
+
+@contextmanager
+def profile(path, profiler='cprofile'):
+    """以 cProfile（輸出 .prof，可用 snakeviz 檢視）或 pyinstrument（輸出 HTML）剖析區塊內的程式"""
+    if profiler == 'pyinstrument':
+        if pyinstrument is None:
+            raise ImportError("pyinstrument profiling requires: pip install pyinstrument")
+        session = pyinstrument.Profiler()
+        session.start()
+        try:
+            yield session
+        finally:
+            session.stop()
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(session.output_html())
+            logging.info(f"Saved pyinstrument profile to {path}")
+        return
+
+    session = cProfile.Profile()
+    session.enable()
+    try:
+        yield session
+    finally:
+        session.disable()
+        session.dump_stats(path)
+        logging.info(f"Saved cProfile stats to {path}")
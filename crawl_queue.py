@@ -0,0 +1,147 @@
+import sqlite3
+import threading
+
+
+class CrawlQueue:
+    """以 SQLite 記錄 (city_code, job_code, page) 工作單元，中斷後可從未完成的頁面續跑"""
+
+    def __init__(self, db_path=':memory:'):
+        self.db_path = db_path
+        # 管線模式下由多個執行緒共用，所有存取都經過 _lock
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.executescript(
+            'CREATE TABLE IF NOT EXISTS units ('
+            '  city_code TEXT NOT NULL, job_code TEXT NOT NULL, page INTEGER NOT NULL,'
+            '  done INTEGER NOT NULL DEFAULT 0,'
+            '  PRIMARY KEY (city_code, job_code, page));'
+            'CREATE TABLE IF NOT EXISTS categories ('
+            '  city_code TEXT NOT NULL, job_code TEXT NOT NULL, done INTEGER NOT NULL DEFAULT 0,'
+            '  PRIMARY KEY (city_code, job_code));'
+            'CREATE TABLE IF NOT EXISTS outputs ('
+            '  city_code TEXT PRIMARY KEY, filename TEXT NOT NULL,'
+            '  committed_size INTEGER NOT NULL DEFAULT 0, finalized INTEGER NOT NULL DEFAULT 0);'
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            '  code TEXT PRIMARY KEY, city_code TEXT NOT NULL);'
+            'CREATE TABLE IF NOT EXISTS job_categories ('
+            '  code TEXT NOT NULL, job_cat TEXT NOT NULL, PRIMARY KEY (code, job_cat));'
+        )
+        self._db.commit()
+
+    def output_file(self, city_code, default):
+        """取得城市的輸出路徑；續跑時沿用上次的路徑與已確認寫入的 offset"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT filename, committed_size FROM outputs WHERE city_code = ?', (city_code,)
+            ).fetchone()
+            if row:
+                return row
+            with self._db:
+                self._db.execute('INSERT INTO outputs (city_code, filename) VALUES (?, ?)', (city_code, default))
+            return default, 0
+
+    def is_finalized(self, city_code):
+        with self._lock:
+            row = self._db.execute('SELECT finalized FROM outputs WHERE city_code = ?', (city_code,)).fetchone()
+            return bool(row and row[0])
+
+    def mark_finalized(self, city_code):
+        with self._lock:
+            with self._db:
+                self._db.execute('UPDATE outputs SET finalized = 1 WHERE city_code = ?', (city_code,))
+
+    def is_category_done(self, city_code, job_code):
+        with self._lock:
+            row = self._db.execute(
+                'SELECT done FROM categories WHERE city_code = ? AND job_code = ?', (city_code, job_code)
+            ).fetchone()
+            return bool(row and row[0])
+
+    def pending_pages(self, city_code, job_code):
+        """回傳尚未完成的頁面；還沒抓過第一頁時回傳 None"""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT page, done FROM units WHERE city_code = ? AND job_code = ? ORDER BY page',
+                (city_code, job_code)
+            ).fetchall()
+            if not rows:
+                return None
+            return [page for page, done in rows if not done]
+
+    def add_pages(self, city_code, job_code, last_page):
+        with self._lock:
+            with self._db:
+                self._db.execute(
+                    'INSERT OR IGNORE INTO categories (city_code, job_code) VALUES (?, ?)', (city_code, job_code)
+                )
+                self._db.executemany(
+                    'INSERT OR IGNORE INTO units (city_code, job_code, page) VALUES (?, ?, ?)',
+                    [(city_code, job_code, page) for page in range(1, last_page + 1)]
+                )
+
+    def mark_done(self, city_code, job_code, page, codes, committed_size):
+        """頁面資料寫出後呼叫；頁面狀態、職缺 code 與輸出檔大小在同一個 transaction 內更新"""
+        with self._lock:
+            with self._db:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO units (city_code, job_code, page, done) VALUES (?, ?, ?, 1)',
+                    (city_code, job_code, page)
+                )
+                self._db.executemany(
+                    'INSERT OR IGNORE INTO jobs (code, city_code) VALUES (?, ?)',
+                    [(code, city_code) for code in codes]
+                )
+                self._db.execute(
+                    'UPDATE outputs SET committed_size = ? WHERE city_code = ?', (committed_size, city_code)
+                )
+
+    def complete_category(self, city_code, job_code):
+        with self._lock:
+            with self._db:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO categories (city_code, job_code, done) VALUES (?, ?, 1)',
+                    (city_code, job_code)
+                )
+                self._db.execute(
+                    'UPDATE units SET done = 1 WHERE city_code = ? AND job_code = ?', (city_code, job_code)
+                )
+
+    def record_jobs(self, city_code, codes):
+        with self._lock:
+            with self._db:
+                self._db.executemany(
+                    'INSERT OR IGNORE INTO jobs (code, city_code) VALUES (?, ?)',
+                    [(code, city_code) for code in codes]
+                )
+
+    def seen_codes(self):
+        with self._lock:
+            return [row[0] for row in self._db.execute('SELECT code FROM jobs')]
+
+    def add_job_category(self, code, job_cat):
+        with self._lock:
+            with self._db:
+                self._db.execute('INSERT OR IGNORE INTO job_categories (code, job_cat) VALUES (?, ?)', (code, job_cat))
+
+    def extra_categories(self, city_code):
+        """回傳 {code: [類別, ...]}，為已寫出的職缺後來又命中的類別"""
+        with self._lock:
+            extra = {}
+            rows = self._db.execute(
+                'SELECT c.code, c.job_cat FROM job_categories c JOIN jobs j ON j.code = c.code '
+                'WHERE j.city_code = ? ORDER BY c.rowid', (city_code,)
+            )
+            for code, job_cat in rows:
+                extra.setdefault(code, []).append(job_cat)
+            return extra
+
+    def clear(self):
+        """整輪爬取完成後清空，下次執行從頭開始"""
+        with self._lock:
+            with self._db:
+                for table in ('units', 'categories', 'outputs', 'jobs', 'job_categories'):
+                    self._db.execute(f'DELETE FROM {table}')
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,261 @@
+import argparse
+import csv
+import glob
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+from crawl_index import decode_nested
+from field_projection import job_code_from_link
+from sinks import DATE_COLUMNS, FLOAT_COLUMNS, INT_COLUMNS, JOB_COLUMNS, JOBCAT_SEPARATOR, NESTED_COLUMNS, ParquetSink
+
+# 爬蟲輸出檔名：job_104_data_<城市>_<YYYYmmdd>_<HHMM>.csv
+FILENAME_PATTERN = re.compile(r'job_104_data_(?P<city>.+)_(?P<stamp>\d{8}_\d{4})\.csv$')
+# 含有這些字的 repr 不能只換引號轉成 JSON，改走 literal_eval
+_PY_LITERALS = re.compile(r'\b(?:True|False|None)\b')
+_QUOTES = str.maketrans("'", '"')
+
+
+def decode_repr_values(values, as_json=False):
+    """批次還原 CSV 中以 Python repr 儲存的巢狀欄位，回傳與 values 等長的 list；as_json 時回傳 JSON 字串
+
+    重複的字串只解一次；只含單引號字串的 repr（絕大多數）換成雙引號後以一次 json.loads 解完，
+    含跳脫字元、雙引號或 True/False/None 的才逐筆交給 decode_nested
+    """
+    decoded = {}
+    fast = []
+    for value in dict.fromkeys(values):
+        if not isinstance(value, str) or not value:
+            decoded[value] = None
+        elif '"' in value or '\\' in value or _PY_LITERALS.search(value):
+            decoded[value] = decode_nested(value)
+        else:
+            fast.append(value)
+    if fast:
+        try:
+            results = json.loads('[' + ','.join(value.translate(_QUOTES) for value in fast) + ']')
+        except ValueError:
+            results = None
+        if results is None or len(results) != len(fast):
+            # 有不是 repr 的值混在其中（例如含逗號的 1,2 會多出元素，後面的值全部錯位），整批退回逐筆解析
+            results = [decode_nested(value) for value in fast]
+        decoded.update(zip(fast, results))
+    if as_json:
+        decoded = {
+            value: None if result is None else json.dumps(result, ensure_ascii=False)
+            for value, result in decoded.items()
+        }
+    return [decoded[value] for value in values]
+
+
+def _header(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        return next(csv.reader(f), [])
+
+
+def read_csv_frame(path, engine=None, chunksize=50000, stats=None):
+    """以 pyarrow CSV reader（沒有安裝時改用分塊的 pandas）讀取整個檔案，所有欄位先當字串讀入
+
+    description 等欄位內的換行會正確處理；欄數不對的殘缺列（例如寫到一半中斷）略過，
+    筆數記在 stats['bad_rows']
+    """
+    stats = {} if stats is None else stats
+    stats.setdefault('bad_rows', 0)
+    engine = engine or ('pyarrow' if pa is not None else 'pandas')
+    columns = _header(path)
+    if engine == 'pyarrow':
+        def skip(row):
+            stats['bad_rows'] += 1
+            return 'skip'
+
+        table = pa_csv.read_csv(
+            path,
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True, invalid_row_handler=skip),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={column: pa.string() for column in columns}, strings_can_be_null=False
+            )
+        )
+        return table.to_pandas()
+
+    def warn(row):
+        stats['bad_rows'] += 1
+        return None
+
+    chunks = pd.read_csv(
+        path, dtype=str, keep_default_na=False, encoding='utf-8-sig', chunksize=chunksize,
+        on_bad_lines=warn, engine='python'
+    )
+    frames = []
+    for frame in chunks:
+        # 欄數不足的列，pandas 會以 NaN 補齊最後幾欄
+        short = frame.iloc[:, -1].isna()
+        stats['bad_rows'] += int(short.sum())
+        frames.append(frame[~short])
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+
+def _merge_job_cats(job_cats):
+    return JOBCAT_SEPARATOR.join(dict.fromkeys(c for job_cat in job_cats for c in job_cat.split(JOBCAT_SEPARATOR) if c))
+
+
+def repair_frame(df, stats=None):
+    """修復舊輸出檔常見的問題，回傳新的 DataFrame
+
+    - 補上缺少的 JOB_COLUMNS 欄位並依固定順序排列
+    - 移除接續寫入時重複出現的表頭列
+    - 缺少 code 時由 link 的 applyAnalyze 補上
+    - 同一職缺出現多列時只保留第一列，類別併入 JobCat
+    """
+    stats = {} if stats is None else stats
+    df = df.reindex(columns=JOB_COLUMNS, fill_value='')
+    header_rows = df['jobNo'] == 'jobNo'
+    stats['header_rows'] = int(header_rows.sum())
+    df = df[~header_rows]
+
+    missing = df['code'] == ''
+    codes = [job_code_from_link(link) or '' for link in decode_repr_values(df.loc[missing, 'link'].tolist())]
+    stats['filled_codes'] = sum(1 for code in codes if code)
+    if stats['filled_codes']:
+        df = df.copy()
+        df.loc[missing, 'code'] = codes
+
+    has_code = df['code'] != ''
+    duplicated = has_code & df['code'].duplicated()
+    stats['duplicate_rows'] = int(duplicated.sum())
+    if stats['duplicate_rows']:
+        repeated = has_code & df['code'].duplicated(keep=False)
+        job_cats = df[repeated].groupby('code', sort=False)['JobCat'].agg(_merge_job_cats)
+        df = df[~duplicated].copy()
+        merged = df['code'].map(job_cats)
+        df['JobCat'] = merged.where(merged.notna(), df['JobCat'])
+    return df.reset_index(drop=True)
+
+
+def _to_float64(values):
+    # pd.to_numeric 的快速解析會差最後一位，與 float() 結果不同；astype 則逐位精確
+    try:
+        return values.where(values != '').astype('float64')
+    except ValueError:
+        return pd.to_numeric(values, errors='coerce').astype('float64')
+
+
+def normalize_frame(df, nested='objects'):
+    """轉成與 ParquetSink 相同的型別：整數為 Int64、lon/lat 為 float64、日期為 datetime64
+
+    nested 為 'objects' 時巢狀欄位還原成 dict / list，為 'json' 時轉成 JSON 字串（寫入 Parquet 用）
+    """
+    df = df.copy()
+    for column in df.columns:
+        if column in INT_COLUMNS:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('Int64')
+        elif column in FLOAT_COLUMNS:
+            df[column] = _to_float64(df[column])
+        elif column in DATE_COLUMNS:
+            df[column] = pd.to_datetime(df[column], format='%Y%m%d', errors='coerce')
+        elif column in NESTED_COLUMNS:
+            df[column] = decode_repr_values(df[column].tolist(), as_json=nested == 'json')
+        else:
+            # CSV 以空字串表示缺值
+            df[column] = df[column].where(df[column] != '', None)
+    return df
+
+
+def load_crawl_csv(path, engine=None, repair=True, nested='objects', stats=None):
+    """讀取爬蟲輸出的 CSV，回傳型別已正規化、巢狀欄位已還原的 DataFrame"""
+    stats = {} if stats is None else stats
+    df = read_csv_frame(path, engine=engine, stats=stats)
+    if repair:
+        df = repair_frame(df, stats)
+    stats['rows'] = len(df)
+    return normalize_frame(df, nested=nested)
+
+
+def parse_output_filename(path):
+    """由檔名取出 (城市, 爬取時間)，不符合命名規則時回傳 None"""
+    match = FILENAME_PATTERN.search(os.path.basename(path))
+    if not match:
+        return None
+    return match['city'], datetime.strptime(match['stamp'], '%Y%m%d_%H%M')
+
+
+def convert_csv(path, output_dir, engine=None):
+    """把一個 CSV 轉進 Parquet 欄式儲存，分區與爬蟲的 ParquetSink 相同
+
+    回傳 (path, 列數, 秒數, stats)
+    """
+    start = time.perf_counter()
+    city_name, crawled_at = parse_output_filename(path)
+    stats = {}
+    df = load_crawl_csv(path, engine=engine, nested='json', stats=stats)
+    sink = ParquetSink(ParquetSink.output_path(output_dir, city_name, crawled_at))
+    sink.write_frame(df)
+    return path, len(df), time.perf_counter() - start, stats
+
+
+def find_csv_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(glob.escape(path), 'job_104_data_*.csv')))
+        else:
+            files.append(path)
+    return [path for path in files if parse_output_filename(path)]
+
+
+def convert_directory(paths, output_dir='.', processes=None, engine=None):
+    """以 process pool 平行轉換多個 CSV，回傳總列數"""
+    files = find_csv_files(paths)
+    start = time.perf_counter()
+    total = 0
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for path, rows, seconds, stats in pool.map(convert_csv, files, [output_dir] * len(files),
+                                                   [engine] * len(files)):
+            total += rows
+            logging.info(
+                f"Converted {path}: {rows} rows in {seconds:.2f} s ({rows / seconds if seconds else 0:.0f} rows/s); "
+                f"skipped {stats['bad_rows']} bad rows, {stats['header_rows']} repeated headers, "
+                f"{stats['duplicate_rows']} duplicates; filled {stats['filled_codes']} codes"
+            )
+    elapsed = time.perf_counter() - start
+    logging.info(
+        f"Converted {len(files)} files, {total} rows in {elapsed:.1f} s "
+        f"({total / elapsed if elapsed else 0:.0f} rows/s)"
+    )
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="讀取、修復既有的 104 CSV 輸出檔，並轉成 Parquet 欄式儲存")
+    parser.add_argument('paths', nargs='+', help="CSV 檔或包含 job_104_data_*.csv 的目錄")
+    parser.add_argument('--output-dir', default='.', help="Parquet 輸出的根目錄（其下為 job_104_parquet/）")
+    parser.add_argument('--processes', type=int, help="平行轉換的 process 數，預設為 CPU 數")
+    parser.add_argument('--engine', choices=['pyarrow', 'pandas'], help="CSV 解析引擎，預設為 pyarrow（有安裝時）")
+    parser.add_argument('--check', action='store_true', help="只讀取並回報修復統計，不寫出 Parquet")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if not args.check:
+        convert_directory(args.paths, args.output_dir, args.processes, args.engine)
+        return
+    for path in find_csv_files(args.paths):
+        stats = {}
+        start = time.perf_counter()
+        df = load_crawl_csv(path, engine=args.engine, stats=stats)
+        seconds = time.perf_counter() - start
+        logging.info(f"{path}: {len(df)} rows in {seconds:.2f} s ({len(df) / seconds:.0f} rows/s); {stats}")
+
+
+if __name__ == "__main__":
+    main()
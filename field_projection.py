@@ -0,0 +1,155 @@
+import json
+import re
+from typing import Any, Optional
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads
+
+# applyAnalyze 連結：//www.104.com.tw/jobs/apply/analysis/<職缺 code>?...
+_ANALYZE_CODE = re.compile(r'/jobs/apply/analysis/([^/?#]+)')
+
+
+def job_code_from_link(link):
+    """由列表的 link 取出職缺 code，沒有 applyAnalyze 時回傳 None"""
+    apply_analyze = link.get('applyAnalyze') if isinstance(link, dict) else None
+    match = _ANALYZE_CODE.search(apply_analyze or '')
+    return match.group(1) if match else None
+
+
+def url_code(url):
+    """網址最後一段（不含查詢字串），例如 custUrl 的公司 code"""
+    if not url:
+        return None
+    return url.split('?', 1)[0].rstrip('/').rsplit('/', 1)[-1] or None
+
+
+class _Node:
+    __slots__ = ('children', 'leaves', 'is_list', 'names')
+
+    def __init__(self, is_list=False):
+        self.children = {}
+        self.leaves = []
+        self.is_list = is_list
+        self.names = ()
+
+    def freeze(self):
+        """記下這個節點以下所有的欄位名稱，投影時不必再走訪子樹"""
+        names = [name for name, convert in self.leaves]
+        for child in self.children.values():
+            names += child.freeze()
+        self.names = tuple(names)
+        return names
+
+
+class Projection:
+    """由 JSON 路徑組成的欄位投影，建立時編譯一次，之後套用到大量回應
+
+    schema 為 {欄位: 路徑} 或 {欄位: (路徑, 轉換函式)}；路徑以 . 分隔，相對於 root，
+    `key[]` 表示對 list 的每個元素取值，例如 'condition.skill[].description'。
+    root 不存在（例如錯誤回應）時回傳 None，其餘缺少的路徑為 None 再交給轉換函式。
+
+    decode() 直接由原始 bytes 解析：有 msgspec 時依 schema 產生的 Struct 解碼，
+    沒有投影到的欄位不會建立物件；否則以 orjson（或 json）解析後再投影。
+    """
+
+    def __init__(self, schema, root=None):
+        self.root = root
+        self.fields = {}
+        self._tree = _Node()
+        for name, spec in schema.items():
+            path, convert = spec if isinstance(spec, tuple) else (spec, None)
+            self.fields[name] = convert
+            node = self._tree
+            for segment in path.split('.'):
+                is_list = segment.endswith('[]')
+                key = segment[:-2] if is_list else segment
+                node = node.children.setdefault(key, _Node(is_list))
+            node.leaves.append((name, convert))
+        self._tree.freeze()
+        self._converters = [(name, convert) for name, convert in self.fields.items() if convert is not None]
+        self._decoder = None
+        if msgspec is not None:
+            root_type = self._struct_type(self._tree, 'Projection')
+            if root:
+                root_type = msgspec.defstruct('ProjectionRoot', [('f0', root_type, None)], rename={'f0': root})
+            self._decoder = msgspec.json.Decoder(root_type)
+
+    def _struct_type(self, node, name):
+        """把路徑樹轉成 msgspec Struct；整個取出的節點為 Any，其下的路徑改在投影時由 dict 取值"""
+        if node.leaves:
+            return Any
+        fields = []
+        rename = {}
+        for i, (key, child) in enumerate(node.children.items()):
+            child_type = self._struct_type(child, f'{name}_{i}')
+            if child.is_list:
+                child_type = list[child_type]
+            fields.append((f'f{i}', Optional[child_type], None))
+            rename[f'f{i}'] = key
+        return msgspec.defstruct(name, fields, rename=rename)
+
+    def _extract(self, node, value, out):
+        for name, convert in node.leaves:
+            out[name] = value
+        for key, child in node.children.items():
+            sub = value.get(key) if isinstance(value, dict) else None
+            if not child.is_list:
+                self._extract(child, sub, out)
+                continue
+            if not isinstance(sub, list):
+                for name in child.names:
+                    out[name] = None
+                continue
+            parts = [self._extract(child, item, {}) for item in sub]
+            for name in child.names:
+                out[name] = [part[name] for part in parts if part[name] is not None]
+        return out
+
+    def project(self, payload):
+        """套用到已解析的 dict"""
+        if self.root:
+            payload = payload.get(self.root) if isinstance(payload, dict) else None
+            if payload is None:
+                return None
+        out = self._extract(self._tree, payload, {})
+        for name, convert in self._converters:
+            out[name] = convert(out[name])
+        return out
+
+    def decode(self, raw):
+        """由原始 bytes 解析並投影；格式不是 JSON 時拋出 ValueError"""
+        if self._decoder is None:
+            return self.project(loads(raw))
+        try:
+            payload = msgspec.to_builtins(self._decoder.decode(raw))
+        except msgspec.ValidationError:
+            # 型別與 schema 不符（例如該是 dict 的地方是字串），改走一般解析
+            return self.project(loads(raw))
+        return self.project(payload)
+
+    def decode_many(self, raws):
+        return [self.decode(raw) for raw in raws]
+
+    def project_many(self, payloads):
+        return [self.project(payload) for payload in payloads]
+
+
+# 職缺明細 API（/job/ajax/content/<code>）要用到的欄位
+JOB_DETAIL_FIELDS = {
+    'condition': ('condition', lambda value: value if value is not None else {}),
+    'jobCategory': ('jobDetail.jobCategory', lambda value: value if value is not None else {}),
+    'company_code': ('header.custUrl', url_code),
+    'welfare': 'welfare.tag',
+    'skills': 'condition.skill[].description',
+    'contact': 'contact'
+}
+JOB_DETAIL = Projection(JOB_DETAIL_FIELDS, root='data')
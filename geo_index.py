@@ -0,0 +1,308 @@
+import argparse
+import glob
+import json
+import logging
+import math
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from crawl_analytics import find_snapshots, read_snapshot
+
+EARTH_RADIUS = 6371008.8
+# 建立索引用到的欄位；dist 為 API 提供的職缺到 mrtDesc 捷運站的距離（公里）
+GEO_COLUMNS = ('code', 'lon', 'lat', 'jobAddrNoDesc', 'mrtDesc', 'dist')
+
+
+def haversine(lon, lat, lons, lats):
+    """一個點到多個點的大圓距離（公尺）"""
+    lat_rad = math.radians(lat)
+    lats = np.radians(lats)
+    a = (np.sin((lats - lat_rad) / 2) ** 2
+         + math.cos(lat_rad) * np.cos(lats) * np.sin(np.radians(lons - lon) / 2) ** 2)
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _gather(starts, ends):
+    """把多段 [start, end) 攤平成一個索引陣列"""
+    lengths = ends - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return np.arange(lengths.sum()) + offsets
+
+
+class GeoIndex:
+    """以經緯度方格建立的職缺座標索引，支援半徑、最近 k 筆、範圍框與各行政區的密度查詢
+
+    職缺依所在方格排序，每個方格在排序後的陣列中是連續的一段；查詢只取出涵蓋範圍內的方格，
+    再以 haversine 計算精確距離。查詢回傳的位置為排序後的陣列索引，可用於 codes、lon、lat 等陣列或 frame()。
+    沒有座標（空值或 0）的職缺不列入索引。
+    """
+
+    ARRAYS = ('lon', 'lat', 'codes', 'district_names', 'district_ids', 'mrt_names', 'mrt_ids', 'mrt_dist', 'cells',
+              'cell_starts', 'station_order', 'station_starts', 'station_dist')
+
+    def __init__(self, lon, lat, codes, districts, mrt, mrt_dist, cell_meters=250, signature=None):
+        lon = np.asarray(lon, dtype='float64')
+        lat = np.asarray(lat, dtype='float64')
+        valid = np.isfinite(lon) & np.isfinite(lat) & (lon != 0) & (lat != 0)
+        lon, lat = lon[valid], lat[valid]
+        self.cell_meters = cell_meters
+        self.signature = signature
+        # 方格在緯度方向固定為 cell_meters，經度方向依資料的平均緯度換算
+        self.origin = (float(lon.min()), float(lat.min())) if len(lon) else (0.0, 0.0)
+        mean_lat = float(lat.mean()) if len(lat) else 0.0
+        self.cell_lat = math.degrees(cell_meters / EARTH_RADIUS)
+        self.cell_lon = self.cell_lat / math.cos(math.radians(mean_lat))
+        self.columns = int((lon.max() - self.origin[0]) // self.cell_lon) + 1 if len(lon) else 1
+
+        cell_ids = self._cell_ids(lon, lat)
+        order = np.argsort(cell_ids, kind='stable')
+        self.lon = lon[order]
+        self.lat = lat[order]
+        self.codes = np.asarray(codes, dtype=str)[valid][order]
+        # 行政區與捷運站名稱重複很多，存成名稱表與整數代碼
+        self.district_names, self.district_ids = self._factorize(districts, valid, order)
+        self.mrt_names, self.mrt_ids = self._factorize(mrt, valid, order)
+        self.mrt_dist = np.asarray(mrt_dist, dtype='float64')[valid][order]
+        self.cells, first = np.unique(cell_ids[order], return_index=True)
+        self.cell_starts = np.r_[first, len(order)]
+
+        # 各捷運站附近的職缺，依 API 的距離排序
+        self.station_order = np.lexsort((self.mrt_dist, self.mrt_ids))
+        self.station_starts = np.searchsorted(self.mrt_ids[self.station_order], np.arange(len(self.mrt_names) + 1))
+        self.station_dist = self.mrt_dist[self.station_order]
+
+    @staticmethod
+    def _factorize(values, valid, order):
+        names, ids = np.unique(np.asarray(values, dtype=str)[valid][order], return_inverse=True)
+        return names, ids.astype('int32')
+
+    def __len__(self):
+        return len(self.lon)
+
+    def _cell_xy(self, lon, lat):
+        x = np.floor((np.asarray(lon) - self.origin[0]) / self.cell_lon).astype('int64')
+        y = np.floor((np.asarray(lat) - self.origin[1]) / self.cell_lat).astype('int64')
+        return x, y
+
+    def _cell_ids(self, lon, lat):
+        x, y = self._cell_xy(lon, lat)
+        return y * self.columns + x
+
+    def _candidates(self, min_lon, min_lat, max_lon, max_lat):
+        """範圍框涵蓋的方格內所有職缺的位置"""
+        (x0, x1), (y0, y1) = self._cell_xy([min_lon, max_lon], [min_lat, max_lat])
+        if not len(self.cells):
+            return np.empty(0, dtype='int64')
+        x0, x1 = max(x0, 0), min(x1, self.columns - 1)
+        y0, y1 = max(y0, 0), min(y1, self.cells[-1] // self.columns)
+        if x0 > x1 or y0 > y1:
+            return np.empty(0, dtype='int64')
+        ids = (np.arange(y0, y1 + 1)[:, None] * self.columns + np.arange(x0, x1 + 1)[None, :]).ravel()
+        found = np.searchsorted(self.cells, ids)
+        found = found[(found < len(self.cells)) & (self.cells[np.minimum(found, len(self.cells) - 1)] == ids)]
+        return _gather(self.cell_starts[found], self.cell_starts[found + 1])
+
+    def bbox(self, min_lon, min_lat, max_lon, max_lat):
+        """範圍框內的職缺位置"""
+        positions = self._candidates(min_lon, min_lat, max_lon, max_lat)
+        lon, lat = self.lon[positions], self.lat[positions]
+        return positions[(lon >= min_lon) & (lon <= max_lon) & (lat >= min_lat) & (lat <= max_lat)]
+
+    def radius(self, lon, lat, meters):
+        """距離 (lon, lat) meters 公尺內的職缺，回傳依距離排序的 (位置, 距離)"""
+        delta_lat = math.degrees(meters / EARTH_RADIUS)
+        far_lat = min(abs(lat) + delta_lat, 89.9)
+        delta_lon = delta_lat / math.cos(math.radians(far_lat))
+        positions = self._candidates(lon - delta_lon, lat - delta_lat, lon + delta_lon, lat + delta_lat)
+        distances = haversine(lon, lat, self.lon[positions], self.lat[positions])
+        inside = distances <= meters
+        positions, distances = positions[inside], distances[inside]
+        order = np.argsort(distances, kind='stable')
+        return positions[order], distances[order]
+
+    def nearest(self, lon, lat, k=10):
+        """最近的 k 筆職缺：由一個方格的半徑開始，找不到 k 筆時半徑加倍"""
+        k = min(k, len(self))
+        meters = self.cell_meters
+        while True:
+            positions, distances = self.radius(lon, lat, meters)
+            # 半徑內已有 k 筆時，半徑外的職缺不可能更近；半徑涵蓋所有方格時也不必再擴大
+            if len(positions) >= k or meters >= self._reach(lon, lat):
+                return positions[:k], distances[:k]
+            meters *= 2
+
+    def _reach(self, lon, lat):
+        """(lon, lat) 到方格範圍四個角落的最遠距離"""
+        rows = int(self.cells[-1] // self.columns) + 1 if len(self.cells) else 1
+        corner_lon = [self.origin[0], self.origin[0] + self.columns * self.cell_lon]
+        corner_lat = [self.origin[1], self.origin[1] + rows * self.cell_lat]
+        lons, lats = np.meshgrid(corner_lon, corner_lat)
+        return float(haversine(lon, lat, lons.ravel(), lats.ravel()).max())
+
+    def near_station(self, name, meters=500):
+        """API 標示最近捷運站為 name、且距離在 meters 公尺內的職缺，回傳依距離排序的 (位置, 距離)"""
+        i = np.searchsorted(self.mrt_names, name)
+        if i >= len(self.mrt_names) or self.mrt_names[i] != name:
+            return np.empty(0, dtype='int64'), np.empty(0)
+        start, end = self.station_starts[i], self.station_starts[i + 1]
+        end = start + np.searchsorted(self.station_dist[start:end], meters / 1000, side='right')
+        return self.station_order[start:end], self.station_dist[start:end] * 1000
+
+    def density(self, district=None, scale=1):
+        """各行政區每個方格的職缺數與每平方公里職缺數；scale 把 scale × scale 個方格合併成一格"""
+        if district:
+            i = np.searchsorted(self.district_names, district)
+            found = i < len(self.district_names) and self.district_names[i] == district
+            positions = np.flatnonzero(self.district_ids == i) if found else np.empty(0, dtype='int64')
+        else:
+            positions = np.arange(len(self))
+        x, y = self._cell_xy(self.lon[positions], self.lat[positions])
+        x, y = x // scale, y // scale
+        df = pd.DataFrame({'district': self.district_names[self.district_ids[positions]], 'x': x, 'y': y})
+        df = df.groupby(['district', 'x', 'y']).size().rename('postings').reset_index()
+        df['lon'] = self.origin[0] + (df['x'] + 0.5) * self.cell_lon * scale
+        df['lat'] = self.origin[1] + (df['y'] + 0.5) * self.cell_lat * scale
+        df['per_km2'] = df['postings'] / (self.cell_meters * scale / 1000) ** 2
+        return df.drop(columns=['x', 'y']).sort_values('postings', ascending=False, ignore_index=True)
+
+    def frame(self, positions, distances=None):
+        """查詢結果轉成 DataFrame"""
+        df = pd.DataFrame({
+            'code': self.codes[positions], 'district': self.district_names[self.district_ids[positions]],
+            'lon': self.lon[positions], 'lat': self.lat[positions],
+            'mrtDesc': self.mrt_names[self.mrt_ids[positions]], 'dist': self.mrt_dist[positions]
+        })
+        if distances is not None:
+            df['meters'] = np.round(distances, 1)
+        return df
+
+    @classmethod
+    def from_frame(cls, df, cell_meters=250, signature=None):
+        def strings(column):
+            return df[column].astype(object).where(df[column].notna(), '').astype(str).to_numpy()
+
+        return cls(
+            pd.to_numeric(df['lon'], errors='coerce'), pd.to_numeric(df['lat'], errors='coerce'), strings('code'),
+            strings('jobAddrNoDesc'), strings('mrtDesc'), pd.to_numeric(df['dist'], errors='coerce'),
+            cell_meters=cell_meters, signature=signature
+        )
+
+    def save(self, path):
+        """存成未壓縮的 npz，載入時不必解壓縮也不必重新排序"""
+        meta = {
+            'cell_meters': self.cell_meters, 'origin': self.origin, 'cell_lon': self.cell_lon,
+            'cell_lat': self.cell_lat, 'columns': self.columns, 'signature': self.signature
+        }
+        temp_path = f'{path}.tmp.npz'
+        np.savez(temp_path, meta=np.array(json.dumps(meta, ensure_ascii=False)),
+                 **{name: getattr(self, name) for name in self.ARRAYS})
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            index = cls.__new__(cls)
+            for name in cls.ARRAYS:
+                setattr(index, name, data[name])
+        index.cell_meters = meta['cell_meters']
+        index.origin = tuple(meta['origin'])
+        index.cell_lon = meta['cell_lon']
+        index.cell_lat = meta['cell_lat']
+        index.columns = meta['columns']
+        index.signature = meta['signature']
+        return index
+
+
+def index_path(snapshot):
+    """索引檔與快照放在一起：CSV / JSONL 為 <檔名>.geo.npz，Parquet 分區為 <HHMM>.geo.npz"""
+    path = snapshot.files[0]
+    if path.endswith('.parquet'):
+        return os.path.join(os.path.dirname(path), f'{snapshot.stamp}.geo.npz')
+    return f'{os.path.splitext(path)[0]}.geo.npz'
+
+
+def snapshot_index(snapshot, cell_meters=250, rebuild=False):
+    """載入快照的索引；沒有索引檔或來源檔案已變動時重新建立並存檔"""
+    path = index_path(snapshot)
+    signature = snapshot.signature()
+    if not rebuild and os.path.exists(path):
+        try:
+            index = GeoIndex.load(path)
+        except (KeyError, ValueError, OSError) as e:
+            # 索引檔損毀或格式不同，重新建立
+            logging.warning(f"Rebuilding {path}: {e}")
+        else:
+            if index.signature == signature and index.cell_meters == cell_meters:
+                return index
+    start = time.perf_counter()
+    index = GeoIndex.from_frame(read_snapshot(snapshot, GEO_COLUMNS), cell_meters, signature)
+    index.save(path)
+    logging.info(f"Indexed {snapshot.key}: {len(index)} jobs in {time.perf_counter() - start:.2f} s -> {path}")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="職缺座標索引：半徑、最近 k 筆、範圍框、捷運站周邊與行政區密度查詢")
+    parser.add_argument('--cell-meters', type=int, default=250, help="方格邊長（公尺）")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="替每個快照建立（或更新）索引檔")
+    build.add_argument('paths', nargs='+', help="輸出檔或輸出目錄（CSV、JSONL 與 job_104_parquet/）")
+    build.add_argument('--rebuild', action='store_true')
+    queries = {
+        'radius': "距離某點 --meters 公尺內的職缺", 'nearest': "最近的 -k 筆職缺", 'bbox': "範圍框內的職缺",
+        'station': "捷運站周邊 --meters 公尺內的職缺", 'density': "各行政區的職缺密度"
+    }
+    for name, description in queries.items():
+        query = commands.add_parser(name, help=description)
+        query.add_argument('snapshot', help="快照的輸出檔或 Parquet 分區目錄")
+        if name in ('radius', 'nearest'):
+            query.add_argument('--lon', type=float, required=True)
+            query.add_argument('--lat', type=float, required=True)
+        if name in ('radius', 'station'):
+            query.add_argument('--meters', type=float, default=500)
+        if name == 'nearest':
+            query.add_argument('-k', type=int, default=10)
+        if name == 'bbox':
+            query.add_argument('bounds', nargs=4, type=float, metavar=('MIN_LON', 'MIN_LAT', 'MAX_LON', 'MAX_LAT'))
+        if name == 'station':
+            query.add_argument('name', help="捷運站名稱（mrtDesc），例如 捷運大安站")
+        if name == 'density':
+            query.add_argument('--district')
+            query.add_argument('--scale', type=int, default=4, help="合併 scale × scale 個方格")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.command == 'build':
+        for snapshot in find_snapshots(args.paths).values():
+            snapshot_index(snapshot, args.cell_meters, args.rebuild)
+        return
+
+    path = args.snapshot
+    paths = sorted(glob.glob(os.path.join(glob.escape(path), '*.parquet'))) if os.path.isdir(path) else [path]
+    snapshots = find_snapshots(paths)
+    if not snapshots:
+        parser.error(f"{args.snapshot} is not a crawl output")
+    index = snapshot_index(list(snapshots.values())[-1], args.cell_meters)
+
+    start = time.perf_counter()
+    if args.command == 'radius':
+        result = index.frame(*index.radius(args.lon, args.lat, args.meters))
+    elif args.command == 'nearest':
+        result = index.frame(*index.nearest(args.lon, args.lat, args.k))
+    elif args.command == 'bbox':
+        result = index.frame(index.bbox(*args.bounds))
+    elif args.command == 'station':
+        result = index.frame(*index.near_station(args.name, args.meters))
+    else:
+        result = index.density(args.district, args.scale)
+    elapsed = time.perf_counter() - start
+    print(result.to_string(index=False))
+    logging.info(f"{len(result)} results in {elapsed * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
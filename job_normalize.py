@@ -0,0 +1,225 @@
+import argparse
+import glob
+import html
+import logging
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+from csv_ingest import load_crawl_csv
+
+SALARY_TYPES = ('monthly', 'annual', 'daily', 'hourly', 'piece', 'negotiable', 'unknown')
+# salaryDesc 開頭的薪資種類，以及 salaryType 代碼（salaryDesc 缺少時使用）
+_DESC_TYPES = {
+    '月薪': 'monthly', '年薪': 'annual', '日薪': 'daily', '時薪': 'hourly', '論件計酬': 'piece', '待遇面議': 'negotiable',
+    '面議': 'negotiable'
+}
+_CODE_TYPES = {'M': 'monthly', 'Y': 'annual', 'D': 'daily', 'H': 'hourly'}
+# 換算成月薪的倍數，依勞基法的工資換算慣例：日薪 × 30、時薪 × 240
+MONTHLY_FACTORS = {'monthly': 1.0, 'annual': 1 / 12, 'daily': 30.0, 'hourly': 240.0}
+# salaryHigh 為 9999999 表示「以上」，沒有上限
+OPEN_ENDED_SALARY = 9999999
+
+_DESC_TYPE = re.compile(r'^\s*(' + '|'.join(sorted(_DESC_TYPES, key=len, reverse=True)) + ')')
+_AMOUNTS = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*(萬)?(?:\s*[~～\-]\s*(\d[\d,]*(?:\.\d+)?)\s*(萬)?)?\s*元')
+_TAGS = r'<[^>]*>'
+_ENTITIES = {'&lt;': '<', '&gt;': '>', '&quot;': '"', '&#39;': "'", '&nbsp;': ' ', '&amp;': '&'}
+_LEFTOVER_ENTITY = r'&(?:#\d+|#x[0-9a-fA-F]+|[a-zA-Z]+);'
+# normalize_jobs 產生 description_text 後，這些欄位與 description 重複
+REDUNDANT_TEXT_COLUMNS = ('descWithoutHighlight', 'descSnippet')
+
+
+def _amount(number, unit):
+    if not number:
+        return np.nan
+    value = float(number.replace(',', ''))
+    return value * 10000 if unit else value
+
+
+def parse_salary_desc(desc):
+    """解析一個 salaryDesc，回傳 (薪資種類, 下限, 上限, 是否面議, 是否「以上」)"""
+    if not isinstance(desc, str):
+        return None, np.nan, np.nan, False, False
+    match = _DESC_TYPE.match(desc)
+    amounts = _AMOUNTS.search(desc)
+    low = high = np.nan
+    if amounts:
+        low_number, low_unit, high_number, high_unit = amounts.groups()
+        # 「1~2萬元」的單位寫在後面，兩端都以萬計
+        low = _amount(low_number, low_unit or high_unit)
+        high = _amount(high_number, high_unit or low_unit)
+    return _DESC_TYPES[match.group(1)] if match else None, low, high, '面議' in desc, '以上' in desc
+
+
+def _parse_unique(values):
+    """salaryDesc 只有少數幾種寫法：先 factorize，只解析不重複的值，再以整數索引展開回每一列"""
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    parsed = [parse_salary_desc(desc) for desc in uniques]
+    # 最後一格給缺值（codes 為 -1）使用
+    parsed.append(parse_salary_desc(None))
+    columns = list(zip(*parsed))
+    return [np.asarray(column, dtype=object if i == 0 else None)[codes] for i, column in enumerate(columns)]
+
+
+def _numeric(df, column):
+    if column not in df.columns:
+        return pd.Series(np.nan, index=df.index)
+    return pd.to_numeric(df[column], errors='coerce').astype('float64')
+
+
+def normalize_salary(df):
+    """由 salaryLow / salaryHigh / salaryDesc / salaryType 產生正規化的薪資欄位，回傳新的 DataFrame
+
+    - salary_type：SALARY_TYPES 之一（面議但註明經常性薪資時視為月薪）
+    - salary_negotiable：是否面議；salary_open_ended：是否為「以上」沒有上限
+    - salary_min / salary_max：原本單位的範圍，0 與 9999999 改為缺值
+    - salary_monthly_min / max、salary_annual_min / max：換算成月薪與年薪（論件計酬與面議為缺值）
+    """
+    desc = df['salaryDesc'] if 'salaryDesc' in df.columns else pd.Series(None, index=df.index, dtype=object)
+    desc_type, desc_low, desc_high, negotiable, open_ended = _parse_unique(desc)
+
+    low = _numeric(df, 'salaryLow').to_numpy()
+    high = _numeric(df, 'salaryHigh').to_numpy()
+    open_ended = open_ended.astype(bool) | (high >= OPEN_ENDED_SALARY)
+    low = np.where(low > 0, low, desc_low.astype('float64'))
+    high = np.where((high > 0) & (high < OPEN_ENDED_SALARY), high, desc_high.astype('float64'))
+    # 只有一個金額且不是「以上」時，上下限相同
+    high = np.where(np.isnan(high) & ~open_ended, low, high)
+    high = np.where(open_ended, np.nan, high)
+
+    salary_type = pd.Series(desc_type, index=df.index, dtype=object)
+    if 'salaryType' in df.columns:
+        salary_type = salary_type.fillna(df['salaryType'].map(_CODE_TYPES))
+    negotiable = negotiable.astype(bool)
+    has_amount = ~np.isnan(low)
+    # 面議的職缺依法須註明經常性薪資（月薪），有金額時以月薪計
+    salary_type[negotiable & has_amount] = 'monthly'
+    salary_type[negotiable & ~has_amount] = 'negotiable'
+    salary_type = salary_type.fillna('unknown')
+
+    factor = salary_type.map(MONTHLY_FACTORS).astype('float64').to_numpy()
+    monthly_min = low * factor
+    monthly_max = high * factor
+    return pd.DataFrame({
+        'salary_type': pd.Categorical(salary_type, categories=SALARY_TYPES),
+        'salary_negotiable': negotiable,
+        'salary_open_ended': open_ended,
+        'salary_min': low,
+        'salary_max': high,
+        'salary_monthly_min': monthly_min,
+        'salary_monthly_max': monthly_max,
+        'salary_annual_min': monthly_min * 12,
+        'salary_annual_max': monthly_max * 12
+    }, index=df.index)
+
+
+def _string(values):
+    # 有 pyarrow 時以 Arrow 字串欄位執行 str.replace，整欄在 C++ 內完成
+    return values.astype('string[pyarrow]' if pa is not None else 'string')
+
+
+def _unescape(values):
+    for entity, char in _ENTITIES.items():
+        values = values.str.replace(entity, char, regex=False)
+    # 少見的數字實體才逐筆交給 html.unescape
+    leftover = values.str.contains(_LEFTOVER_ENTITY, regex=True).fillna(False).to_numpy(dtype=bool)
+    if leftover.any():
+        # 以相同 index 的 Series 指定，所有列都含實體字元時也能正確對齊
+        values = values.copy()
+        values.loc[leftover] = pd.Series(
+            [html.unescape(value) for value in values[leftover]], index=values.index[leftover], dtype=values.dtype
+        )
+    return values
+
+
+def normalize_text(df):
+    """合併 description 與 descWithoutHighlight 成一欄 description_text
+
+    優先使用已去除標示的 descWithoutHighlight，移除 HTML 標籤與實體字元，並統一換行與空白
+    """
+    text = _string(df['description'] if 'description' in df.columns else pd.Series('', index=df.index))
+    if 'descWithoutHighlight' in df.columns:
+        plain = _string(df['descWithoutHighlight'])
+        text = plain.where(plain.notna() & (plain != ''), text)
+    text = text.str.replace(_TAGS, '', regex=True)
+    # 含實體字元的列不多，只替換這些列
+    has_entity = text.str.contains('&', regex=False).fillna(False).to_numpy(dtype=bool)
+    if has_entity.any():
+        text = text.copy()
+        text[has_entity] = _unescape(text[has_entity])
+    # 字元類別與前後空白的 regex 在長字串上很慢，盡量用固定字串替換
+    for old, new in (('\r\n', '\n'), ('\r', '\n'), ('\t', ' '), ('　', ' '), ('\xa0', ' ')):
+        text = text.str.replace(old, new, regex=False)
+    text = text.str.replace('  +', ' ', regex=True)
+    text = text.str.replace(' \n', '\n', regex=False).str.replace('\n ', '\n', regex=False)
+    text = text.str.replace('\n\n\n+', '\n\n', regex=True)
+    text = text.str.strip()
+    return text.where(text != '')
+
+
+def normalize_jobs(df, drop_redundant=True):
+    """加上正規化的薪資欄位與 description_text；drop_redundant 時移除與 description 重複的欄位"""
+    result = pd.concat([df, normalize_salary(df)], axis=1)
+    result['description_text'] = normalize_text(df)
+    if drop_redundant:
+        result = result.drop(columns=[column for column in REDUNDANT_TEXT_COLUMNS if column in result.columns])
+    return result
+
+
+def read_output(path):
+    """讀取爬蟲的輸出檔（CSV、JSONL 或 Parquet）"""
+    if path.endswith('.csv'):
+        return load_crawl_csv(path, nested='json')
+    if path.endswith('.jsonl'):
+        return pd.read_json(path, lines=True, dtype=False)
+    return pd.read_parquet(path)
+
+
+def normalize_file(path, output_dir='.', output_format='parquet'):
+    """正規化一個輸出檔，寫成 <原檔名>_normalized.<格式>，回傳 (輸出路徑, 列數, 秒數)"""
+    start = time.perf_counter()
+    df = normalize_jobs(read_output(path))
+    stem = os.path.splitext(os.path.basename(path))[0]
+    output = os.path.join(output_dir, f'{stem}_normalized.{output_format}')
+    if output_format == 'csv':
+        df.to_csv(output, index=False, encoding='utf-8-sig')
+    else:
+        df.to_parquet(output, index=False)
+    return output, len(df), time.perf_counter() - start
+
+
+def find_outputs(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for extension in ('csv', 'jsonl'):
+                files += sorted(glob.glob(os.path.join(glob.escape(path), f'job_104_data_*.{extension}')))
+        else:
+            files.append(path)
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="爬取後的正規化：薪資範圍換算、薪資種類、面議旗標與去重的職缺描述")
+    parser.add_argument('paths', nargs='+', help="輸出檔（CSV、JSONL、Parquet）或包含 job_104_data_* 的目錄")
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--format', default='parquet', choices=['parquet', 'csv'])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    os.makedirs(args.output_dir, exist_ok=True)
+    for path in find_outputs(args.paths):
+        output, rows, seconds = normalize_file(path, args.output_dir, args.format)
+        logging.info(f"Normalized {path}: {rows} rows in {seconds:.2f} s ({rows / seconds if seconds else 0:.0f} rows/s) -> {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import sys
+from collections.abc import MutableMapping
+
+from sinks import JOB_COLUMNS
+
+# 大量重複的字串（地區、產業、公司名稱等）只保留一份
+INTERN_FIELDS = {
+    'jobType', 'jobRole', 'jobRo', 'jobAddrNo', 'jobAddrNoDesc', 'optionEdu', 'period', 'periodDesc',
+    'applyType', 'applyDesc', 'custNo', 'custName', 'custNameRaw', 'coIndustry', 'coIndustryDesc', 'salaryDesc',
+    's10', 'appearDate', 'appearDateDesc', 'optionZone', 'isApply', 'isSave', 'jobsource', 'remoteWorkType',
+    'salaryType', 'JobCat', 'company_employees', 'company_capital'
+}
+
+# API 常把同一段文字放在多個欄位（原文與去除標示的版本），內容相同時共用同一個字串物件
+SHARED_TEXT_FIELDS = {
+    'descWithoutHighlight': 'description',
+    'descSnippet': 'description',
+    'jobNameSnippet': 'jobName',
+    'jobNameRaw': 'jobName',
+    'custNameRaw': 'custName'
+}
+
+
+class JobRecord(MutableMapping):
+    """只保存 JOB_COLUMNS 欄位的職缺紀錄，以 __slots__ 取代每筆一個 dict
+
+    介面與 dict 相同（get、[]、update、in、==），未設定的欄位視為不存在；
+    INTERN_FIELDS 的字串值會經過 sys.intern
+    """
+
+    __slots__ = tuple(JOB_COLUMNS)
+
+    def __init__(self, values=None):
+        if values:
+            self.update(values)
+
+    @classmethod
+    def from_api(cls, raw):
+        """由 API 回傳的列表資料建立紀錄，不在 JOB_COLUMNS 中的欄位直接捨棄"""
+        record = cls()
+        for column in JOB_COLUMNS:
+            if column in raw:
+                record[column] = raw[column]
+        for column, source in SHARED_TEXT_FIELDS.items():
+            value = record.get(column)
+            if value is not None and value == record.get(source):
+                setattr(record, column, getattr(record, source))
+        return record
+
+    def __getitem__(self, key):
+        if key not in _COLUMN_SET:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key not in _COLUMN_SET:
+            raise KeyError(f"{key!r} is not a job column")
+        if key in INTERN_FIELDS and type(value) is str:
+            value = sys.intern(value)
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        if key not in _COLUMN_SET:
+            raise KeyError(key)
+        try:
+            delattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __iter__(self):
+        for column in JOB_COLUMNS:
+            if hasattr(self, column):
+                yield column
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def get(self, key, default=None):
+        # 比 Mapping.get 少一次例外轉換，sink 逐欄讀取時會大量呼叫
+        return getattr(self, key, default) if key in _COLUMN_SET else default
+
+    def __contains__(self, key):
+        return key in _COLUMN_SET and hasattr(self, key)
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return f'JobRecord({self.to_dict()!r})'
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self.update(state)
+
+
+_COLUMN_SET = frozenset(JOB_COLUMNS)
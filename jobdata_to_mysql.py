@@ -1,16 +1,34 @@
-import requests
 import pandas as pd
 import json
+import os
+import re
+import tempfile
 import time
-import random
 from sqlalchemy.types import VARCHAR, INTEGER, TEXT, DATE, FLOAT
 from urllib.parse import quote_plus
 import logging
-from sqlalchemy import create_engine
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from sqlalchemy import Column, Index, MetaData, Table, create_engine, inspect, text
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from datetime import datetime
 
+from code_registry import load_registry
+from crawl_metrics import CrawlMetrics
+from field_projection import JOB_DETAIL, job_code_from_link, loads
+from rate_control import AdaptiveRateLimiter
+from response_cache import ResponseCache
+from session_manager import SessionManager
+from sinks import INT_COLUMNS, NESTED_COLUMNS
+
+try:
+    import orjson
+
+    def _dumps(value):
+        return orjson.dumps(value).decode('utf-8')
+except ImportError:
+    def _dumps(value):
+        return json.dumps(value, ensure_ascii=False)
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -20,22 +38,125 @@ logging.basicConfig(
     ]
 )
 
+# LOAD DATA 預設的跳脫規則（ESCAPED BY '\\'）：NULL 寫成 \N，反斜線、tab、換行前加反斜線
+LOAD_DATA_NULL = '\\N'
+_LOAD_DATA_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r', '\0': '\\0'})
+_LOAD_DATA_UNESCAPES = {'t': '\t', 'n': '\n', 'r': '\r', '0': '\0'}
+_LOAD_DATA_ESCAPED = re.compile(r'\\(.)', re.DOTALL)
+
+
+def _load_data_value(value):
+    if value is None or value is pd.NA or (isinstance(value, float) and value != value):
+        return LOAD_DATA_NULL
+    return str(value).translate(_LOAD_DATA_ESCAPES)
+
+
+def write_load_data_file(f, df):
+    """把 df 寫成 LOAD DATA LOCAL INFILE 用的 TSV；整數欄位先轉成 Int64，有缺值時也不會寫成 1.0"""
+    columns = []
+    for name in df.columns:
+        values = df[name]
+        if name in INT_COLUMNS:
+            values = pd.to_numeric(values, errors='coerce').astype('Int64')
+        columns.append([_load_data_value(value) for value in values])
+    for row in zip(*columns):
+        f.write('\t'.join(row))
+        f.write('\n')
+
+
+def read_load_data_file(path):
+    """依相同的跳脫規則讀回 write_load_data_file 寫出的 TSV（檢查用），NULL 為 None"""
+    def unescape(field):
+        if field == LOAD_DATA_NULL:
+            return None
+        return _LOAD_DATA_ESCAPED.sub(lambda match: _LOAD_DATA_UNESCAPES.get(match[1], match[1]), field)
+
+    with open(path, encoding='utf-8', newline='') as f:
+        return [[unescape(field) for field in line[:-1].split('\t')] for line in f]
+
+
+# Define the mapping from DataFrame columns to database fields with types
+DTYPE_MAPPING = {
+    'jobType': VARCHAR(255),
+    'jobNo': VARCHAR(255),
+    'jobName': VARCHAR(255),
+    'jobNameSnippet': TEXT,
+    'jobRole': VARCHAR(255),
+    'jobRo': VARCHAR(255),
+    'jobAddrNo': VARCHAR(255),
+    'jobAddrNoDesc': VARCHAR(255),
+    'jobAddress': TEXT,
+    'description': TEXT,
+    'descWithoutHighlight': TEXT,
+    'optionEdu': VARCHAR(255),
+    'period': VARCHAR(255),
+    'periodDesc': VARCHAR(255),
+    'applyCnt': INTEGER,
+    'applyType': VARCHAR(255),
+    'applyDesc': VARCHAR(255),
+    'custNo': VARCHAR(255),
+    'custName': VARCHAR(255),
+    'coIndustry': VARCHAR(255),
+    'coIndustryDesc': VARCHAR(255),
+    'salaryLow': INTEGER,
+    'salaryHigh': INTEGER,
+    'salaryDesc': VARCHAR(255),
+    's10': VARCHAR(255),
+    'appearDate': DATE,
+    'appearDateDesc': VARCHAR(255),
+    'optionZone': VARCHAR(255),
+    'isApply':  INTEGER,
+    'applyDate': DATE,
+    'isSave':  INTEGER,
+    'descSnippet': TEXT,
+    'tags': TEXT,
+    'landmark': VARCHAR(255),
+    'link': TEXT,
+    'jobsource': VARCHAR(255),
+    'jobNameRaw': TEXT,
+    'custNameRaw': TEXT,
+    'lon': FLOAT,
+    'lat': FLOAT,
+    'remoteWorkType': VARCHAR(255),
+    'major': VARCHAR(255),
+    'salaryType': VARCHAR(255),
+    'dist': VARCHAR(255),
+    'mrt': VARCHAR(255),
+    'mrtDesc': VARCHAR(255),
+    'JobCat': VARCHAR(255),
+    'code': VARCHAR(255),
+    'condition': TEXT,
+    'jobCategory': TEXT,
+    'company_employees': VARCHAR(255),
+    'company_capital': VARCHAR(255),
+    'welfare': TEXT,
+    'skills': TEXT,
+    'contact': TEXT
+}
+
+
 class JobScraper:
-    def __init__(self, host, port, user, password, db):
-        self.city_codes = {
-            "台北市": "6001001000"
-        }
-        self.job_codes = {
-            "儲備幹部": "2001001002"
-            # "經營管理主管": "2001001001"
-        }
-        self.session = self._create_session()
+    def __init__(self, host=None, port=None, user=None, password=None, db=None, db_url=None, batch_size=1000,
+                 rate_limiter=None, response_cache=None, metrics=None, session=None):
+        registry = load_registry()
+        self.city_codes = registry.cities.select(names=['台北市'])
+        # 改用 select(prefixes=['2001001']) 即可抓整個經營管理中類
+        self.job_codes = registry.jobs.select(names=['儲備幹部'])
+        self.session = session or SessionManager()
         self._init_headers()
-        self.base_wait_time = 3
-
-        # MySQL 連線設定
-        db_url = f"mysql+pymysql://{user}:{password}@{host}:{port}/{db}?charset=utf8mb4"
-        self.engine = create_engine(db_url, pool_pre_ping=True)
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.response_cache = response_cache
+        self.metrics = metrics or CrawlMetrics()
+        self.max_retries = 5
+
+        # MySQL 連線設定；db_url 可改用其他資料庫（例如以 SQLite 測試）
+        if db_url is None:
+            db_url = f"mysql+pymysql://{user}:{quote_plus(password)}@{host}:{port}/{db}?charset=utf8mb4"
+            self.engine = create_engine(db_url, pool_pre_ping=True, connect_args={'local_infile': True})
+        else:
+            self.engine = create_engine(db_url, pool_pre_ping=True)
+        self.batch_size = batch_size
+        self._table = None
 
     def _init_headers(self):
         self.headers = {
@@ -47,60 +168,75 @@ class JobScraper:
             'Host': 'www.104.com.tw',
             'Origin': 'https://www.104.com.tw',
             'Referer': 'https://www.104.com.tw/jobs/search/',
-            'User-Agent': self._get_random_ua()
+            'User-Agent': self.session.user_agent
+        }
+        self.detail_headers = {
+            'Accept': 'application/json, text/plain, */*',
+            'Accept-Encoding': 'gzip, deflate, br, zstd',
+            'Accept-Language': 'zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7',
+            'Connection': 'keep-alive',
+            'Host': 'www.104.com.tw',
+            'Referer': 'https://www.104.com.tw/',
+            'User-Agent': self.session.user_agent
         }
 
-    def _get_random_ua(self):
-        user_agents = [
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:123.0) Gecko/20100101 Firefox/123.0'
-        ]
-        return random.choice(user_agents)
-
-    def _create_session(self):
-        session = requests.Session()
-        retries = Retry(
-            total=5,
-            backoff_factor=0.5,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["GET"]
-        )
-        adapter = HTTPAdapter(max_retries=retries)
-        session.mount("https://", adapter)
-        session.mount("http://", adapter)
-        return session
-
-    def _exponential_backoff(self, attempt):
-        """計算指數退避時間，防止請求過於頻繁"""
-        return min(self.base_wait_time * (2 ** attempt) + random.uniform(0, 1), 60)
-
-    def get_request(self, url, params=None, headers=None, attempt=0):
+    def get_request(self, url, params=None, headers=None, projection=None):
         if not headers:
             headers = self.headers
 
-        try:
-            response = self.session.get(url, params=params, headers=headers, timeout=30)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.HTTPError as e:
+        if self.response_cache:
+            cached = self.response_cache.get(url, params)
+            if cached is not None:
+                return projection.project(cached) if projection else cached
+            if self.response_cache.offline:
+                logging.warning(f"Offline replay: no cached response for URL: {url} with params: {params}")
+                return None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                logging.info(f"Retrying... (Attempt {attempt}/{self.max_retries})")
+            # 由速率控制器決定送出時間，取代固定的 sleep 與指數退避
+            self.metrics.add_time('sleep', self.rate_limiter.acquire())
+            start = time.monotonic()
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=30)
+            except self.session.request_errors as e:
+                latency = time.monotonic() - start
+                self.rate_limiter.record(None, latency)
+                self.metrics.record_request(url, None, latency, attempt=attempt)
+                logging.error(f"Request failed for URL: {url} with params: {params}. Error: {str(e)}")
+                continue
+
+            latency = time.monotonic() - start
+            self.rate_limiter.record(response.status_code, latency, response.headers.get('Retry-After'))
+            self.metrics.record_request(url, response.status_code, latency, len(response.content), attempt)
             if response.status_code == 404:
                 logging.error(f"404 Not Found for URL: {url}. Skipping this job.")
                 return None
-            logging.error(f"Request failed for URL: {url} with params: {params}. Error: {str(e)}")
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Request failed for URL: {url} with params: {params}. Error: {str(e)}")
-            if attempt < 5:
-                wait_time = self._exponential_backoff(attempt)
-                logging.info(f"Retrying in {wait_time:.2f} seconds... (Attempt {attempt + 1}/5)")
-                time.sleep(wait_time)
-                return self.get_request(url, params, headers, attempt + 1)
+            if response.status_code >= 400:
+                logging.error(f"Request failed for URL: {url} with params: {params}. Status: {response.status_code}")
+                if response.status_code != 429 and response.status_code < 500:
+                    return None
+                continue
+            try:
+                with self.metrics.timer('parse'):
+                    if projection and not self.response_cache:
+                        return projection.decode(response.content)
+                    data = loads(response.content)
+            except ValueError as e:
+                logging.error(f"Request failed for URL: {url} with params: {params}. Error: {str(e)}")
+                return None
+            if self.response_cache:
+                self.response_cache.set(url, params, data)
+            return projection.project(data) if projection else data
+
+        logging.error(f"Max retries reached for URL: {url}")
         return None
 
     def fetch_jobs(self, city_code, job_code):
         url = 'https://www.104.com.tw/jobs/search/list'
         all_jobs = []
-        job_name = next((key for key, value in self.job_codes.items() if value == job_code), None)
+        job_name = self.job_codes.name(job_code)
 
         max_pages = 1
         for page in range(1, max_pages + 1):
@@ -127,36 +263,20 @@ class JobScraper:
             jobs = response['data']['list']
             for job in jobs:
                 job['JobCat'] = job_name
-                link_data = job.get('link', {})
-                apply_analyze = link_data.get('applyAnalyze', '')
-
-                if apply_analyze:
-                    job_code = apply_analyze.split('/')[6].split('?')[0]
-                    job['code'] = job_code
-                else:
-                    logging.warning(f"Missing 'applyAnalyze' in job link: {link_data}")
+                job['code'] = job_code_from_link(job.get('link'))
+                if not job['code']:
+                    logging.warning(f"Missing 'applyAnalyze' in job link: {job.get('link')}")
                     continue
 
-                header = {
-                    'Accept': 'application/json, text/plain, */*',
-                    'Accept-Encoding': 'gzip, deflate, br, zstd',
-                    'Accept-Language': 'zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7',
-                    'Connection': 'keep-alive',
-                    'Host': 'www.104.com.tw',
-                    'Referer': 'https://www.104.com.tw/',
-                    'User-Agent': self._get_random_ua()
-                }
                 job_detail_url = f"https://www.104.com.tw/job/ajax/content/{job['code']}"
-                rep = self.get_request(job_detail_url, headers=header)
-                
-                if rep and 'data' in rep:
-                    job['condition'] = rep['data'].get('condition', {})
-                    job['jobCategory'] = rep['data']['jobDetail'].get('jobCategory', {})
-    
-                    # 抓取公司的 URL
-                    cust_url = rep['data']['header'].get('custUrl', None)
-                    if cust_url:
-                        company_code = cust_url.split('/')[-1]  # 取出公司的 code
+                detail = self.get_request(job_detail_url, headers=self.detail_headers, projection=JOB_DETAIL)
+
+                if detail:
+                    for field in ('condition', 'jobCategory', 'welfare', 'skills', 'contact'):
+                        job[field] = detail[field]
+
+                    company_code = detail['company_code']
+                    if company_code:
                         company_url = f"https://www.104.com.tw/company/ajax/content/{company_code}"
         
                         company_response = self.get_request(company_url)
@@ -166,13 +286,13 @@ class JobScraper:
                         else:
                             logging.warning(f"Failed to fetch company details for company_code: {company_code}")
                     else:
-                        logging.warning(f"Missing 'custUrl' in response header: {rep['data']['header']}")
+                        logging.warning(f"Missing 'custUrl' in job details for code: {job['code']}")
                 else:
                     logging.warning(f"Failed to fetch job details for code: {job['code']}")
 
 
             all_jobs.extend(jobs)
-            time.sleep(random.uniform(2, 5))
+            self.metrics.add_jobs(len(jobs))
 
         logging.info(f"Total jobs fetched for job_code {job_code} ({job_name}): {len(all_jobs)}")
         return all_jobs
@@ -185,68 +305,107 @@ class JobScraper:
             logging.error(f"Error saving to csv: {str(e)}")
 
     def map_dataframe_to_db(self, df):
-        # Define the mapping from DataFrame columns to database fields with types
-        dtype_mapping = {
-            'jobType': VARCHAR(255),
-            'jobNo': VARCHAR(255),
-            'jobName': VARCHAR(255),
-            'jobNameSnippet': TEXT,
-            'jobRole': VARCHAR(255),
-            'jobRo': VARCHAR(255),
-            'jobAddrNo': VARCHAR(255),
-            'jobAddrNoDesc': VARCHAR(255),
-            'jobAddress': TEXT,
-            'description': TEXT,
-            'descWithoutHighlight': TEXT,
-            'optionEdu': VARCHAR(255),
-            'period': VARCHAR(255),
-            'periodDesc': VARCHAR(255),
-            'applyCnt': INTEGER,
-            'applyType': VARCHAR(255),
-            'applyDesc': VARCHAR(255),
-            'custNo': VARCHAR(255),
-            'custName': VARCHAR(255),
-            'coIndustry': VARCHAR(255),
-            'coIndustryDesc': VARCHAR(255),
-            'salaryLow': INTEGER,
-            'salaryHigh': INTEGER,
-            'salaryDesc': VARCHAR(255),
-            's10': VARCHAR(255),
-            'appearDate': DATE,
-            'appearDateDesc': VARCHAR(255),
-            'optionZone': VARCHAR(255),
-            'isApply':  INTEGER,
-            'applyDate': DATE,
-            'isSave':  INTEGER,
-            'descSnippet': TEXT,
-            'tags': TEXT,
-            'landmark': VARCHAR(255),
-            'link': TEXT,
-            'jobsource': VARCHAR(255),
-            'jobNameRaw': TEXT,
-            'custNameRaw': TEXT,
-            'lon': FLOAT,
-            'lat': FLOAT,
-            'remoteWorkType': VARCHAR(255),
-            'major': VARCHAR(255),
-            'salaryType': VARCHAR(255),
-            'dist': VARCHAR(255),
-            'mrt': VARCHAR(255),
-            'mrtDesc': VARCHAR(255),
-            'JobCat': VARCHAR(255),
-            'code': VARCHAR(255),
-            'condition': TEXT,
-            'jobCategory': TEXT,
-            'company_employees': VARCHAR(255),
-            'company_capital': VARCHAR(255)
-        }
-
-        # Create a new DataFrame with the mapped columns
-        mapped_df = df.rename(columns={col: col for col in dtype_mapping.keys()})
-
-        return mapped_df
-
-    def save_to_mysql(self, df):
+        # 只保留資料表有的欄位，並依 DTYPE_MAPPING 的順序排列
+        return df.reindex(columns=list(DTYPE_MAPPING))
+
+    def serialize_nested_columns(self, df):
+        """依已知的巢狀欄位（NESTED_COLUMNS）一次序列化成 JSON，不需掃描整個 DataFrame"""
+        df = df.copy()
+        for col in NESTED_COLUMNS:
+            if col in df.columns:
+                df[col] = [_dumps(x) if isinstance(x, (dict, list)) else x for x in df[col].tolist()]
+        return df
+
+    def _jobs_table(self):
+        """依 DTYPE_MAPPING 建立 jobs 資料表與索引，只在第一次呼叫時執行"""
+        if self._table is None:
+            metadata = MetaData()
+            columns = [
+                Column(name, column_type, primary_key=(name == 'code'))
+                for name, column_type in DTYPE_MAPPING.items()
+            ]
+            self._table = Table(
+                'jobs', metadata, *columns,
+                Index('ix_jobs_jobNo', 'jobNo'),
+                Index('ix_jobs_custNo', 'custNo'),
+                Index('ix_jobs_appearDate', 'appearDate'),
+                Index('ix_jobs_JobCat', 'JobCat')
+            )
+            metadata.create_all(self.engine, checkfirst=True)
+            self._add_missing_columns()
+        return self._table
+
+    def _add_missing_columns(self):
+        """既有的 jobs 資料表補上 DTYPE_MAPPING 後來新增的欄位（例如 welfare、skills、contact）"""
+        existing = {column['name'] for column in inspect(self.engine).get_columns('jobs')}
+        missing = [name for name in DTYPE_MAPPING if name not in existing]
+        if not missing:
+            return
+        with self.engine.begin() as conn:
+            for name in missing:
+                column_type = self._table.c[name].type.compile(dialect=self.engine.dialect)
+                conn.execute(text(f'ALTER TABLE jobs ADD COLUMN `{name}` {column_type}'))
+        logging.info(f"Added columns to the jobs table: {', '.join(missing)}")
+
+    def _prepare_rows(self, df):
+        """轉換日期欄位、去掉沒有 code 的資料，並把 NaN 換成 None"""
+        df = df.copy()
+        for col in ('appearDate', 'applyDate'):
+            values = pd.to_numeric(df[col], errors='coerce').astype('Int64').astype('string')
+            df[col] = pd.to_datetime(values, format='%Y%m%d', errors='coerce').dt.date
+
+        missing_code = df['code'].isna()
+        if missing_code.any():
+            logging.warning(f"Skipping {int(missing_code.sum())} rows without a job code")
+            df = df[~missing_code]
+        df['code'] = df['code'].astype(str)
+        return df.astype(object).where(df.notna(), None)
+
+    def _upsert_statement(self, table):
+        update_columns = [name for name in DTYPE_MAPPING if name != 'code']
+        dialect = self.engine.dialect.name
+        if dialect == 'mysql':
+            stmt = mysql_insert(table)
+            return stmt.on_duplicate_key_update({name: stmt.inserted[name] for name in update_columns})
+        if dialect == 'sqlite':
+            stmt = sqlite_insert(table)
+            return stmt.on_conflict_do_update(
+                index_elements=['code'], set_={name: stmt.excluded[name] for name in update_columns}
+            )
+        raise ValueError(f"Bulk upsert is not supported for {dialect}")
+
+    def _bulk_upsert(self, df, batch_size):
+        """分批 INSERT ... ON DUPLICATE KEY UPDATE，重複爬到的職缺以 code 覆蓋"""
+        stmt = self._upsert_statement(self._jobs_table())
+        records = df.to_dict('records')
+        with self.engine.begin() as conn:
+            for start in range(0, len(records), batch_size):
+                conn.execute(stmt, records[start:start + batch_size])
+        return len(records)
+
+    def _load_data_infile(self, df):
+        """MySQL 專用的快速路徑：寫成暫存 TSV 後以 LOAD DATA LOCAL INFILE 匯入，重複的 code 以 REPLACE 覆蓋"""
+        if self.engine.dialect.name != 'mysql':
+            raise ValueError("LOAD DATA LOCAL INFILE requires MySQL")
+        self._jobs_table()
+
+        with tempfile.NamedTemporaryFile('w', suffix='.tsv', delete=False, encoding='utf-8', newline='') as f:
+            write_load_data_file(f, df)
+            path = f.name
+        try:
+            columns = ', '.join(f'`{name}`' for name in df.columns)
+            sql = text(
+                "LOAD DATA LOCAL INFILE :path REPLACE INTO TABLE jobs CHARACTER SET utf8mb4 "
+                "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+                f"({columns})"
+            )
+            with self.engine.begin() as conn:
+                conn.execute(sql, {'path': path})
+        finally:
+            os.remove(path)
+        return len(df)
+
+    def save_to_mysql(self, df, use_load_data=False):
         if df.empty:
             logging.info("No data to save to MySQL.")
             return
@@ -254,31 +413,15 @@ class JobScraper:
         # Map the DataFrame to the database structure
             mapped_df = self.map_dataframe_to_db(df)
 
-        # 找出並轉換包含 dict 或 list 的欄位
-            dict_columns = mapped_df.applymap(lambda x: isinstance(x, dict)).any()
-            list_columns = mapped_df.applymap(lambda x: isinstance(x, list)).any()
-
-            for col in dict_columns[dict_columns].index.tolist():
-                mapped_df[col] = mapped_df[col].apply(lambda x: json.dumps(x) if isinstance(x, dict) else x)
-        
-            for col in list_columns[list_columns].index.tolist():
-                mapped_df[col] = mapped_df[col].apply(lambda x: json.dumps(x) if isinstance(x, list) else x)
-
-            MYSQL_HOST = '127.0.0.1'
-            MYSQL_PORT = '3306'
-            MYSQL_USER = 'root'
-            MYSQL_PASSWORD = quote_plus(MYSQL_PASSWORD)
-            MYSQL_DB = MYSQL_DB
-            db_url = f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}"
-
-            self.engine = create_engine(db_url, pool_pre_ping=True)
-
-            with self.engine.connect() as conn:
-                logging.info("Database connection successful.")
-
-            # 插入資料時使用 method='multi'
-            mapped_df.to_sql('jobs', con=self.engine, if_exists='append', index=False, method='multi')
-            logging.info("Successfully saved data to MySQL.")
+        # 轉換包含 dict 或 list 的欄位
+            with self.metrics.timer('save'):
+                rows = self._prepare_rows(self.serialize_nested_columns(mapped_df))
+                if use_load_data:
+                    count = self._load_data_infile(rows)
+                else:
+                    count = self._bulk_upsert(rows, self.batch_size)
+            self.metrics.add_saved(count)
+            logging.info(f"Successfully saved {count} rows to MySQL.")
     
         except Exception as e:
             logging.error(f"Error saving to MySQL: {str(e)}", exc_info=True)
@@ -294,25 +437,27 @@ class JobScraper:
                     jobs = self.fetch_jobs(city_code, job_code)
                     if jobs:
                         all_jobs.extend(jobs)
-                        time.sleep(random.uniform(20, 30))
+                    self.rate_limiter.log_metrics()
                 except Exception as e:
                     logging.error(f"Error processing {city_name} - {job_name}: {str(e)}")
                     continue
 
             if all_jobs:
-                filename = f'./job_104_data_{city_name}_{datetime.now().strftime("%Y%m%d_%H%M")}.csv'
                 df = pd.DataFrame(all_jobs)
-                #logging.info(df.dtypes)
-                # print(df.dtypes)
-                #self.save_to_csv(df, filename)
                 self.save_to_mysql(df)  # 新增插入到 MySQL 的步驟
+        self.metrics.log_summary()
 
 
 if __name__ == "__main__":
     MYSQL_HOST = 'localhost'
     MYSQL_PORT = '3306'
     MYSQL_USER = 'root'
-    MYSQL_PASSWORD = MYSQL_PASSWORD
-    MYSQL_DB = MYSQL_DB
-    scraper = JobScraper(MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DB)
+    MYSQL_PASSWORD = os.environ.get('MYSQL_PASSWORD', '')
+    MYSQL_DB = os.environ.get('MYSQL_DB', 'job104')
+    # HTTP_CACHE_DIR 啟用回應快取；HTTP_CACHE_OFFLINE=1 時只從快取重播
+    HTTP_CACHE_DIR = os.environ.get('HTTP_CACHE_DIR')
+    response_cache = None
+    if HTTP_CACHE_DIR:
+        response_cache = ResponseCache(HTTP_CACHE_DIR, offline=os.environ.get('HTTP_CACHE_OFFLINE') == '1')
+    scraper = JobScraper(MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DB, response_cache=response_cache)
     scraper.run()
@@ -1,11 +1,25 @@
-import requests
-import pandas as pd
 import time
-import random
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import argparse
+import functools
+import json
 import logging
+import os
+import threading
 from datetime import datetime
+from urllib.parse import urlsplit
+
+from code_registry import CodeTable, load_registry
+from company_cache import CompanyCache
+from crawl_index import CrawlIndex
+from crawl_metrics import CrawlMetrics, profile
+from crawl_queue import CrawlQueue
+from field_projection import JOB_DETAIL, job_code_from_link, loads
+from job_record import JobRecord
+from query_planner import PlannedQuery, QueryPlanner, SearchQuery
+from rate_control import AdaptiveRateLimiter
+from session_manager import SessionManager
+from response_cache import ResponseCache
+from sinks import JOBCAT_SEPARATOR, SINKS
 
 logging.basicConfig(
     level=logging.INFO,
@@ -17,616 +31,61 @@ logging.basicConfig(
 )
 
 class JobScraper:
-    def __init__(self):
-        self.city_codes = {
-            "台北市": "6001001000",
-            "新北市": "6001002000",
-            "台中市": "6001008000",
-            "台南市": "6001014000",
-            "桃園市": "6001005000",
-            "高雄市": "6001016000",
-            "新竹縣市": "6001006000",
-            "彰化縣": "6001010000",
-            "雲林縣": "6001012000",
-            "屏東縣": "6001018000"
-         }
-
-        self.job_codes = {
-             "儲備幹部": "2001001002",
-             "經營管理主管": "2001001001",
-             "主管特別助理": "2001001003",
-            "副總經理": "2001001004",
-            "總經理": "2001001005",
-            "執行長": "2001001006",
-            "營運長": "2001001007",
-            "人力資源人員": "2001002002",
-            "人力資源助理": "2001002005",
-            "人力資源主管": "2001002001",
-            "教育訓練人員": "2001002003",
-            "人力／外勞仲介": "2001002004",
-            "招募顧問": "2001002006",
-            "行政助理": "2002001012",
-            "行政人員": "2002001003",
-            "行政主管": "2002001001",
-            "工讀生": "2002001011",
-            "秘書": "2002001005",
-            "總務": "2002001004",
-            "總務主管": "2002001002",
-            "櫃檯接待人員": "2002001010",
-            "資料輸入人員": "2002001006",
-            "總機": "2002001009",
-            "文件管理師": "2002001007",
-            "圖書管理人員": "2002001008",
-            "律師": "2002002002",
-            "法務": "2002002004",
-            "法務助理": "2002002008",
-            "法務主管": "2002002001",
-            "商標／專利人員": "2002002005",
-            "專利工程師": "2002002009",
-            "專利師": "2002002010",
-            "法遵人員": "2002002011",
-            "工商登記人員": "2002002007",
-            "代書／地政士": "2002002003",
-            "其他法律專業人員": "2002002006",
-            "銀行辦事員": "2003002007",
-            "證券營業員": "2003002019",
-            "理財專員": "2003002006",
-            "金融交易員": "2003002003",
-            "金融營業員": "2003002005",
-            "金融承銷員": "2003002004",
-            "金融研究員": "2003002002",
-            "金融主管": "2003002001",
-            "保險業務／經紀人": "2003002010",
-            "保險主管": "2003002018",
-            "融資／信用業務人員": "2003002011",
-            "核保／保險內勤人員": "2003002013",
-            "理賠人員": "2003002014",
-            "股務人員": "2003002016",
-            "催收人員": "2003002012",
-            "券商後線人員": "2003002015",
-            "統計精算人員": "2003002008",
-            "投資經理人": "2003002017",
-            "風險管理人員": "2003002020",
-            "不動產估價師": "2003002009",
-            "記帳／出納／一般會計": "2003001006",
-            "主辦會計": "2003001004",
-            "成本會計": "2003001005",
-            "財務會計助理": "2003001010",
-            "財務分析／財務人員": "2003001003",
-            "財務或會計主管": "2003001001",
-            "稽核人員": "2003001008",
-            "稽核主管": "2003001011",
-            "會計師": "2003001002",
-            "查帳／審計人員": "2003001007",
-            "財務長": "2003001012",
-            "記帳士": "2003001013",
-            "稅務人員": "2003001009",
-            "社群行銷": "2004001014",
-            "行銷企劃": "2004001005",
-            "行銷助理": "2004001012",
-            "行銷主管": "2004001002",
-            "網站行銷企劃": "2004001007",
-            "產品行銷企劃": "2004001004",
-            "活動企劃": "2004001006",
-            "廣告文案／企劃": "2004001009",
-            "廣告企劃主管": "2004001001",
-            "不動產／商場開發人員": "2004001011",
-            "市場調查／市場分析": "2004001010",
-            "神秘客": "2004001015",
-            "媒體公關人員／主管": "2004001003",
-            "公關助理": "2004001016",
-            "媒體公關／宣傳採買": "2004001008",
-            "媒體或出版主管": "2004001013",
-            "行銷總監": "2004001017",
-            "數位行銷": "2004001018",
-            "電商行銷": "2004001019",
-            "遊戲企劃": "2004002005",
-            "網站企劃": "2004002006",
-            "傳播媒體企劃": "2004002003",
-            "出版企劃": "2004002004",
-            "產品企劃": "2004002002",
-            "產品企劃主管": "2004002001",
-            "專案經理": "2004003006",
-            "專案助理": "2004003007",
-            "產品管理師": "2004003005",
-            "永續管理師": "2004003008",
-            "專案管理主管": "2004003001",
-            "軟體專案管理師": "2004003003",
-            "營運管理師/系統整合/ERP專案師": "2004003002",
-            "其他專案管理師": "2004003004",
-            "電話客服": "2005001004",
-            "客服主管": "2005001001",
-            "文字客服": "2005001006",
-            "電訪人員": "2005001007",
-            "其他客服人員": "2005001005",
-            "門市／店員／專櫃人員": "2005002004",
-            "店長／賣場管理人員": "2005002001",
-            "售票／收銀人員": "2005002005",
-            "連鎖店管理人員": "2005002002",
-            "商化人員": "2005002006",
-            "國內業務": "2005003004",
-            "國外業務": "2005003005",
-            "國內業務主管": "2005003001",
-            "國外業務主管": "2005003002",
-            "內勤業務": "2005003016",
-            "業務助理": "2005003013",
-            "醫藥業務代表": "2005003008",
-            "電話行銷人員": "2005003007",
-            "不動產經紀人": "2005003009",
-            "汽車銷售人員": "2005003010",
-            "廣告AE業務": "2005003006",
-            "通路開發人員": "2005003015",
-            "專案業務主管": "2005003003",
-            "產品事業處主管": "2005003014",
-            "傳銷人員": "2005003011",
-            "駐校代表": "2005003012",
-            "國貿人員": "2005004001",
-            "國貿助理": "2005004004",
-            "船務／報關人員": "2005004002",
-            "保稅人員": "2005004003",
-            "餐廚助手": "2006001008",
-            "餐飲服務生": "2006001001",
-            "咖啡師": "2006001012",
-            "茶師": "2006001017",
-            "調酒師／吧台人員": "2006001007",
-            "洗碗人員": "2006001010",
-            "食品技師": "2006001013",
-            "西餐廚師": "2006001003",
-            "中餐廚師": "2006001002",
-            "日式廚師": "2006001011",
-            "其他類廚師": "2006001004",
-            "麵包師": "2006001005",
-            "麵包學徒": "2006001014",
-            "西點／蛋糕師": "2006001006",
-            "侍酒師": "2006001015",
-            "食品衛生管理師": "2006001009",
-            "行政主廚": "2006001016",
-            "房務": "2006002009",
-            "飯店工作人員": "2006002003",
-            "領隊": "2006002006",
-            "導遊": "2006002007",
-            "導覽員": "2006002010",
-            "地勤人員": "2006002005",
-            "空服員": "2006002004",
-            "OP/旅行社人員": "2006002008",
-            "飯店或餐廳主管": "2006002002",
-            "旅遊休閒類主管": "2006002001",
-            "美容師": "2006003001",
-            "美容助理": "2006003008",
-            "美甲師": "2006003007",
-            "美甲助理": "2006003015",
-            "美髮師": "2006003002",
-            "美髮助理": "2006003009",
-            "寵物美容師": "2006003006",
-            "寵物美容助理": "2006003011",
-            "寵物保姆": "2006003012",
-            "美療／芳療師": "2006003005",
-            "醫美諮詢師": "2006003013",
-            "整體造型師": "2006003003",
-            "美睫師": "2006003010",
-            "紋繡師": "2006003014",
-            "美姿美儀人員": "2006003004",
-            "美容主管": "2006003016",
-            "彩妝師": "2006003017",
-            "iOS工程師": "2007001013",
-            "Android工程師": "2007001014",
-            "前端工程師": "2007001015",
-            "後端工程師": "2007001016",
-            "全端工程師": "2007001017",
-            "數據分析師": "2007001018",
-            "軟體工程師": "2007001004",
-            "軟體助理工程師": "2007001019",
-            "軟體專案主管": "2007001001",
-            "系統分析師": "2007001007",
-            "資料科學家": "2007001021",
-            "資料工程師": "2007001022",
-            "AI工程師": "2007001020",
-            "演算法工程師": "2007001012",
-            "韌體工程師": "2007001005",
-            "電玩程式設計師": "2007001008",
-            "Internet程式設計師": "2007001006",
-            "資訊助理": "2007001010",
-            "區塊鏈工程師": "2007001023",
-            "BIOS工程師": "2007001011",
-            "通訊軟體工程師": "2007001003",
-            "電子商務技術主管": "2007001002",
-            "其他資訊專業人員": "2007001009",
-            "系統工程師": "2007002006",
-            "網路管理工程師": "2007002005",
-            "資安工程師": "2007002009",
-            "資訊設備管制人員": "2007002007",
-            "雲端工程師": "2007002010",
-            "網路安全分析師": "2007002008",
-            "MES工程師": "2007002004",
-            "MIS程式設計師": "2007002003",
-            "資料庫管理人員": "2007002002",
-            "'MIS/網管主管'": "2007002001",
-            "資安主管": "2007002011",
-            "領班": "2010001001",
-            "作業員／包裝員": "2010001002",
-            "銑床人員": "2010001007",
-            "車床人員": "2010001006",
-            "CNC機台操作人員": "2010001004",
-            "CNC電腦程式編排人員": "2010001005",
-            "手工包裝工及有關工作者": "2010001028",
-            "塑膠射出技術人員": "2010001011",
-            "塑膠模具技術人員": "2010001009",
-            "機加工技術人員": "2010001010",
-            "機械裝配員": "2010001023",
-            "線切割技術員": "2010001035",
-            "雷射操作技術員": "2010001036",
-            "精密拋光技術人員": "2010001034",
-            "其他機械操作員": "2010001029",
-            "沖壓模具技術人員": "2010001008",
-            "焊接人員": "2010001016",
-            "板金技術員": "2010001014",
-            "塗裝技術人員": "2010001039",
-            "電機工程技術員": "2010001003",
-            "電機設備裝配員": "2010001024",
-            "紡織工務": "2010001017",
-            "噴漆人員": "2010001013",
-            "打版人員": "2010001018",
-            "鍋爐操作技術人員": "2010001038",
-            "壓鑄模具技術人員": "2010001032",
-            "鑄造／鍛造模具技術人員": "2010001030",
-            "電鍍／表面處理技術人員": "2010001033",
-            "粉末冶金模具技術人員": "2010001031",
-            "PCB技術人員": "2010001015",
-            "推土機操作員": "2010001026",
-            "吊車司機": "2010001027",
-            "車縫人員": "2010001020",
-            "染整人員": "2010001037",
-            "製鞋人員": "2010001019",
-            "印刷技術人員": "2010001012",
-            "珠寶及貴金屬技術員": "2010001022",
-            "樂器製造及調音技術員": "2010001021",
-            "農業及林業設備操作員": "2010001025",
-            "挖土機司機": "2010001040",
-            "FAE工程師": "2010002016",
-            "客服工程師": "2010002017",
-            "產維修人員": "2010002005",
-            "產品售後技術服務": "2010002001",
-            "業務支援工程師": "2010002002",
-            "空調冷凍技術人員": "2010002006",
-            "電機裝修工": "2010002011",
-            "電子設備裝修工": "2010002012",
-            "通信測試維修人員": "2010002004",
-            "電信及電力線路架設工": "2010002014",
-            "精密儀器製造工及修理工": "2010002015",
-            "電話及電報機裝修工": "2010002013",
-            "電腦組裝／測試": "2010002003",
-            "汽車檢驗員": "2010002018",
-            "汽車學徒": "2010002019",
-            "機車學徒": "2010002020",
-            "汽車／機車引擎技術人員": "2010002007",
-            "其他汽車／機車技術維修人員": "2010002008",
-            "飛機裝修工": "2010002009",
-            "農業及工業用機器裝修工": "2010002010",
-            "倉管": "2011001004",
-            "採購助理": "2011001006",
-            "採購人員": "2011001003",
-            "採購主管": "2011001001",
-            "物管／資材": "2011001005",
-            "資材主管": "2011001002",
-            "倉儲物流人員": "2011002009",
-            "快遞": "2011002003",
-            "外送員": "2011002011",
-            "小客車／計程車及小貨車司機": "2011002005",
-            "大貨車及其他類司機": "2011002006",
-            "運輸交通人員": "2011002002",
-            "運輸物流類主管": "2011002001",
-            "主管司機": "2011002014",
-            "堆高機人員": "2011002012",
-            "隨車人員": "2011002013",
-            "船長／大副／船員": "2011002010",
-            "飛安人員": "2011002008",
-            "飛行機師": "2011002007",
-            "鐵路車輛駕駛員": "2011002004",
-            "聯結車司機": "2011002015",
-            "工務人員／助理": "2012001010",
-            "土木技師／工程師": "2012001004",
-            "結構技師／工程師": "2012001005",
-            "水技師／工程師": "2012001008",
-            "建築師": "2012001002",
-            "內業工程師": "2012001009",
-            "營建主管": "2012001001",
-            "土地開發人員": "2012001014",
-            "水電工程師": "2012001011",
-            "水利技師/工程師": "2012001006",
-            "估算人員": "2012001012",
-            "工程配管繪圖": "2012001007",
-            "發包人員": "2012001013",
-            "都市／交通規劃人員": "2012001003",
-            "工地監工／主任": "2012002002",
-            "木工": "2012002006",
-            "木工學徒": "2012002016",
-            "水電工": "2012002013",
-            "水電學徒": "2012002015",
-            "營造工程師": "2012002001",
-            "建築物清潔工": "2012002009",
-            "建築物電力系統維修工": "2012002003",
-            "金屬建材架構人員": "2012002010",
-            "油漆工": "2012002008",
-            "混凝土工": "2012002005",
-            "泥水工": "2012002007",
-            "泥水小工及有關工作者": "2012002011",
-            "防水施工人員": "2012002014",
-            "砌磚工及砌石工": "2012002004",
-            "其他營建構造工": "2012002012",
-            "室內設計師": "2012003006",
-            "室內設計助理": "2012003008",
-            "軟裝設計師": "2012003009",
-            "建築設計師": "2012003002",
-            "景觀設計師": "2012003007",
-            "水電及其他工程繪圖人員": "2012003003",
-            "消防繪圖人員": "2012003010",
-            "機械設計工程師": "2012003004",
-            "CAD/CAM工程師": "2012003001",
-            "量測／儀校人員": "2012003005",
-            "平面設計／美編": "2013001005",
-            "美編助理": "2013001019",
-            "視覺設計師": "2013001017",
-            "產品設計師": "2013001020",
-            "UI設計師": "2013001015",
-            "UX設計師": "2013001016",
-            "網頁設計師": "2013001006",
-            "工業設計師": "2013001010",
-            "多媒體動畫設計師": "2013001004",
-            "多媒體開發主管": "2013001001",
-            "展場／櫥窗佈置人員": "2013001003",
-            "服裝／皮包／鞋類設計": "2013001009",
-            "服裝設計助理": "2013001018",
-            "電腦繪圖人員": "2013001012",
-            "設計助理": "2013001013",
-            "美術設計": "2013001007",
-            "商業設計": "2013001008",
-            "廣告設計": "2013001002",
-            "包裝設計": "2013001011",
-            "織品設計": "2013001014",
-            "攝影師": "2013002012",
-            "攝影助理": "2013002015",
-            "模特兒": "2013002004",
-            "直播主": "2013002018",
-            "演員": "2013002002",
-            "主持人": "2013002017",
-            "剪輯師": "2013002019",
-            "剪輯助理": "2013002020",
-            "影音企劃": "2013002021",
-            "影片製作技術人員": "2013002010",
-            "經紀人": "2013002022",
-            "製片": "2013002023",
-            "製片助理": "2013002024",
-            "編劇": "2013002025",
-            "節目製作人員": "2013002001",
-            "節目助理": "2013002014",
-            "視聽工程人員": "2013002016",
-            "燈光／音響師": "2013002011",
-            "導演導播": "2013002003",
-            "音樂家／作曲／歌唱及演奏家": "2013002005",
-            "舞蹈指導與舞蹈家": "2013002006",
-            "藝術指導 ／藝術總監": "2013002007",
-            "播音／配音人員": "2013002009",
-            "電台工作人員": "2013002008",
-            "其他娛樂事業人員": "2013002013",
-            "特效師": "2013002026",
-            "3D建模師": "2013002027",
-            "英文翻譯": "2014001002",
-            "日文翻譯": "2014001003",
-            "韓文翻譯": "2014001007",
-            "越南翻譯": "2014001008",
-            "印尼翻譯": "2014001009",
-            "泰文翻譯": "2014001010",
-            "菲律賓翻譯": "2014001011",
-            "德文翻譯": "2014001012",
-            "西班牙文翻譯": "2014001013",
-            "法文翻譯": "2014001014",
-            "其他翻譯": "2014001004",
-            "文編／校對／文字工作者": "2014001005",
-            "編輯助理": "2014001015",
-            "技術文件／說明書編譯": "2014001001",
-            "排版人員": "2014001006",
-            "記者": "2014002001",
-            "其他傳媒工作": "2014002002",
-            "藥師": "2015001005",
-            "藥師助理": "2015001015",
-            "護理師及護士": "2015001004",
-            "專科護理師": "2015001021",
-            "居家護理師": "2015001026",
-            "研究護理師": "2015001027",
-            "護理長": "2015001028",
-            "營養師": "2015001006",
-            "健康管理師": "2015001025",
-            "物理治療師": "2015001019",
-            "勞工健康服務護理人員": "2015001024",
-            "職能治療師": "2015001018",
-            "驗光師": "2015001011",
-            "醫事放射師": "2015001016",
-            "醫師": "2015001001",
-            "醫事檢驗師": "2015001003",
-            "獸醫師": "2015001007",
-            "心理師": "2015001023",
-            "聽力師": "2015001029",
-            "語言治療師": "2015001020",
-            "呼吸治療師": "2015001017",
-            "牙醫師": "2015001002",
-            "牙體技術師": "2015001022",
-            "中醫師": "2015001009",
-            "治療師": "2015001013",
-            "麻醉醫師": "2015001010",
-            "公共衛生醫師": "2015001008",
-            "復健技術師": "2015001012",
-            "其他醫療人員": "2015001014",
-            "診所助理": "2015002005",
-            "牙醫助理": "2015002006",
-            "獸醫助理": "2015002015",
-            "照顧服務員": "2015002002",
-            "照顧實務指導員": "2015002011",
-            "居家服務督導員": "2015002012",
-            "安心服務員": "2015002010",
-            "個案管理師": "2015002014",
-            "專任管理人員": "2015002013",
-            "醫院行政管理人員": "2015002001",
-            "放射性設備使用技術員": "2015002007",
-            "醫療設備控制人員": "2015002008",
-            "按摩／推拿師": "2015002004",
-            "其他醫療從業人員": "2015002009",
-            "研究助理": "2016001013",
-            "生物學研究員": "2016001011",
-            "統計學研究員": "2016001007",
-            "心理學研究員": "2016001010",
-            "物理學研究員": "2016001001",
-            "化學研究員": "2016001004",
-            "數學研究員": "2016001006",
-            "應用科學研究員": "2016001012",
-            "地質與地球科學研究員": "2016001005",
-            "氣象學研究員": "2016001003",
-            "哲學／歷史／政治研究員": "2016001009",
-            "社會／人類學研究員": "2016001008",
-            "天文學研究員": "2016001002",
-            "其他研究人員": "2016001014",
-            "英文老師": "2016002024",
-            "日文老師": "2016002025",
-            "韓文老師": "2016002026",
-            "語文補習班老師": "2016002011",
-            "補習班導師／管理人員": "2016002001",
-            "健身教練": "2016002027",
-            "運動教練": "2016002019",
-            "家教": "2016002028",
-            "教保員": "2016002020",
-            "托育員": "2016002023",
-            "安親班老師": "2016002008",
-            "幼教班老師": "2016002007",
-            "幼兒園園長": "2016002029",
-            "社工": "2016002018",
-            "就業服務員": "2016002030",
-            "講師": "2016002021",
-            "助教": "2016002003",
-            "教授／副教授／助理教授": "2016002002",
-            "升學補習班老師": "2016002009",
-            "數理補習班老師": "2016002022",
-            "電腦補習班老師": "2016002010",
-            "中文老師": "2016002031",
-            "作文老師": "2016002032",
-            "數學老師": "2016002033",
-            "美術老師": "2016002013",
-            "音樂老師": "2016002014",
-            "游泳教練": "2016002034",
-            "鋼琴老師": "2016002035",
-            "珠心算老師": "2016002012",
-            "中等學校教師": "2016002004",
-            "國小學校教師": "2016002005",
-            "特殊教育教師": "2016002006",
-            "其他才藝類老師": "2016002016",
-            "其他補習班老師": "2016002015",
-            "其他類講師": "2016002017",
-            "助理工程師": "2008001023",
-            "工程助理": "2008001024",
-            "機械工程師": "2008001006",
-            "電子工程師": "2008001009",
-            "電力工程師": "2008001030",
-            "電源工程師": "2008001013",
-            "數位IC設計工程師": "2008001015",
-            "類比IC設計工程師": "2008001014",
-            "IC佈局工程師": "2008001022",
-            "半導體工程師": "2008001016",
-            "光學工程師": "2008001019",
-            "熱傳工程師": "2008001028",
-            "零件工程師": "2008001010",
-            "光電工程師": "2008001018",
-            "光電工程研發主管": "2008001002",
-            "RF通訊工程師": "2008001021",
-            "電信／通訊系統工程師": "2008001020",
-            "通訊工程研發主管": "2008001003",
-            "太陽能技術工程師": "2008001027",
-            "PCB佈線工程師": "2008001012",
-            "硬體研發工程師": "2008001011",
-            "硬體工程研發主管": "2008001001",
-            "電子產品系統工程師": "2008001026",
-            "微機電工程師": "2008001017",
-            "聲學／噪音工程師": "2008001029",
-            "機電技師／工程師": "2008001008",
-            "電機師／工程師": "2008001005",
-            "其他特殊工程師": "2008001025",
-            "其他工程研發主管": "2008001004",
-            "材料研發人員": "2008002004",
-            "化工化學工程師": "2008002001",
-            "實驗化驗人員": "2008002005",
-            "特用化學工程師": "2008002003",
-            "紡織化學工程師": "2008002002",
-            "生物科技研發人員": "2008003003",
-            "醫藥研發人員": "2008003002",
-            "醫療器材研發工程師": "2008003007",
-            "食品研發人員": "2008003001",
-            "化學工程研發人員": "2008003004",
-            "病理藥理人員": "2008003005",
-            "農藝／畜產研究人員": "2008003006",
-            "生管": "2009001004",
-            "生管助理": "2009001005",
-            "生產管理主管": "2009001001",
-            "工業工程師／生產線規劃": "2009001003",
-            "廠長": "2009001006",
-            "工廠主管": "2009001002",
-            "自動控制工程師": "2009002003",
-            "生產設備工程師": "2009002002",
-            "SMT工程師": "2009002004",
-            "半導體製程工程師": "2009002005",
-            "半導體設備工程師": "2009002007",
-            "LCD製程工程師": "2009002006",
-            "LCD設備工程師": "2009002008",
-            "生產技術／製程工程師": "2009002001",
-            "軟韌體測試工程師": "2009003007",
-            "可靠度工程師": "2009003003",
-            "測試人員": "2009003005",
-            "硬體測試工程師": "2009003004",
-            "'EMC/電子安規工程師'": "2009003008",
-            "'IC封裝/測試工程師'": "2009003006",
-            "品管／檢驗人員": "2009003010",
-            "品管／品保工程師": "2009003002",
-            "'ISO/品保人員'": "2009003009",
-            "品管／品保主管": "2009003001",
-            "故障分析工程師": "2009003011",
-            "廠務": "2009004006",
-            "廠務助理": "2009004007",
-            "職業安全衛生管理員": "2009004008",
-            "職業安全衛生管理師": "2009004001",
-            "環境工程人員 / 工程師": "2009004003",
-            "安全／衛生相關檢驗人員": "2009004002",
-            "公共衛生人員": "2009004005",
-            "防火及建築檢驗人員": "2009004004",
-            "救生員": "2017001004",
-            "消防專業人員": "2017001002",
-            "消防員": "2017001003",
-            "志願役軍官／士官／士兵": "2017001001",
-            "保全人員／警衛": "2017002001",
-            "保全技術人員": "2017002002",
-            "總幹事": "2017002005",
-            "社區秘書": "2017002006",
-            "大樓管理員": "2017002003",
-            "其他保安服務工作": "2017002004",
-            "農藝作物栽培工作者": "2018001001",
-            "一般動物飼育工作者": "2018001002",
-            "水產養殖工作者": "2018001004",
-            "林木伐運工作者": "2018001003",
-            "清潔工／資源回收人員": "2018002012",
-            "家庭代工": "2018002007",
-            "家事服務人員": "2018002013",
-            "加油員": "2018002010",
-            "顧問": "2018002001",
-            "花藝／園藝人員": "2018002008",
-            "花藝助理": "2018002015",
-            "汽車美容人員": "2018002014",
-            "生鮮人員": "2018002009",
-            "派報生／傳單派送": "2018002011",
-            "公家機關相關人員": "2018002005",
-            "生命禮儀師": "2018002003",
-            "志工": "2018002002",
-            "藝術品／珠寶鑑價／拍賣顧問": "2018002006",
-            "星象占卜人員": "2018002004"
-        }
+    def __init__(self, base_url='https://www.104.com.tw', company_cache=None, crawl_queue=None, output_format='csv',
+                 output_dir='.', rate_limiter=None, crawl_index=None, response_cache=None, metrics=None,
+                 session=None, plan_queries=False):
+        self.base_url = base_url
+        self.metrics = metrics or CrawlMetrics()
+        self.response_cache = response_cache
+        # 有 crawl_index 時為增量模式：列表沒變動的職缺沿用上次的明細
+        self.crawl_index = crawl_index
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.metrics.watch_rate_limiter(urlsplit(base_url).netloc, self.rate_limiter)
+        self.output_dir = output_dir
+        self.company_cache = company_cache or CompanyCache()
+        self.crawl_queue = crawl_queue or CrawlQueue()
+        self.sink_class = SINKS[output_format]
+        self.seen_jobs = {}
+        self.duplicate_hits = 0
+        # 管線模式下，列表執行緒併入類別與寫出執行緒清除職缺會同時進行
+        self._seen_lock = threading.Lock()
+        registry = load_registry()
+        self.city_codes = registry.cities
+        self.job_codes = registry.jobs
+        # 完整的職務類別表；select_codes 或指定 job_codes 後，用來判斷是否爬過所有類別
+        self.all_job_codes = registry.jobs
 
-        self.session = self._create_session()
+        # 所有類別共用同一個 session，只在第一次（或 cookie 過期時）暖機
+        self.session = session or SessionManager()
         self._init_headers()
-        self.base_wait_time = 3
+        self.max_pages = 149
+        self.max_retries = 5
+        # 規劃搜尋時，小類別合併成一個搜尋、超過頁數上限的類別依行政區或薪資拆分
+        self.planner = QueryPlanner(self) if plan_queries else None
+
+    @property
+    def city_codes(self):
+        return self._city_codes
+
+    @city_codes.setter
+    def city_codes(self, codes):
+        self._city_codes = codes if isinstance(codes, CodeTable) else CodeTable(codes)
+
+    @property
+    def job_codes(self):
+        return self._job_codes
+
+    @job_codes.setter
+    def job_codes(self, codes):
+        # 直接指定 dict 時也包成 CodeTable，才能由 code 反查類別名稱
+        self._job_codes = codes if isinstance(codes, CodeTable) else CodeTable(codes)
+
+    def select_codes(self, city_prefixes=None, job_prefixes=None):
+        """只保留 code 符合前綴的城市與職務類別，未指定的維持全部"""
+        if city_prefixes:
+            self.city_codes = self.city_codes.select(city_prefixes)
+        if job_prefixes:
+            self.job_codes = self.job_codes.select(job_prefixes)
 
     def _init_headers(self):
         self.headers = {
@@ -638,160 +97,373 @@ class JobScraper:
             'Host': 'www.104.com.tw',
             'Origin': 'https://www.104.com.tw',
             'Referer': 'https://www.104.com.tw/jobs/search/',
-            'User-Agent': self._get_random_ua()
+            'User-Agent': self.session.user_agent
+        }
+        self.detail_headers = {
+            'Accept': 'application/json, text/plain, */*',
+            'Accept-Encoding': 'gzip, deflate, br, zstd',
+            'Accept-Language': 'zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7',
+            'Connection': 'keep-alive',
+            'Host': 'www.104.com.tw',
+            'Referer': 'https://www.104.com.tw/',
+            'User-Agent': self.session.user_agent
         }
-
-    def _get_random_ua(self):
-        user_agents = [
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:123.0) Gecko/20100101 Firefox/123.0'
-        ]
-        return random.choice(user_agents)
-
-    def _create_session(self):
-        session = requests.Session()
-        retries = Retry(
-            total=5,
-            backoff_factor=0.5,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["GET"]
-        )
-        adapter = HTTPAdapter(max_retries=retries)
-        session.mount("https://", adapter)
-        session.mount("http://", adapter)
-        return session
 
     def _init_session(self):
+        if (self.response_cache and self.response_cache.offline) or not self.session.needs_warm_up():
+            return True
         try:
+            self.metrics.add_time('sleep', self.rate_limiter.acquire())
             self.session.get(
-                'https://www.104.com.tw/jobs/search/',
+                f'{self.base_url}/jobs/search/',
                 headers=self.headers,
                 timeout=10
             )
+            self.session.mark_warm()
             return True
         except Exception as e:
             logging.error(f"Error initializing session: {str(e)}")
             return False
 
-    def _exponential_backoff(self, attempt):
-        return min(self.base_wait_time * (2 ** attempt) + random.uniform(0, 1), 60)
-
-    def get_request(self, url, params=None, headers=None, attempt=0):
+    def get_request(self, url, params=None, headers=None, projection=None):
+        """回傳解析後的 JSON；指定 projection（field_projection.Projection）時只回傳投影的欄位"""
         if not headers:
             headers = self.headers
 
+        if self.response_cache:
+            cached = self.response_cache.get(url, params)
+            if cached is not None:
+                return projection.project(cached) if projection else cached
+            if self.response_cache.offline:
+                logging.warning(f"Offline replay: no cached response for URL: {url} with params: {params}")
+                return None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                logging.info(f"Retrying... (Attempt {attempt}/{self.max_retries})")
+            # 由速率控制器決定送出時間，取代固定的 sleep 與指數退避
+            self.metrics.add_time('sleep', self.rate_limiter.acquire())
+            start = time.monotonic()
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=30)
+            except self.session.request_errors as e:
+                latency = time.monotonic() - start
+                self.rate_limiter.record(None, latency)
+                self.metrics.record_request(url, None, latency, attempt=attempt)
+                logging.error(f"Request failed for URL: {url} with params: {params}. Error: {str(e)}")
+                continue
+
+            latency = time.monotonic() - start
+            self.rate_limiter.record(response.status_code, latency, response.headers.get('Retry-After'))
+            self.metrics.record_request(url, response.status_code, latency, len(response.content), attempt)
+            if response.status_code >= 400:
+                logging.error(f"Request failed for URL: {url} with params: {params}. Status: {response.status_code}")
+                if response.status_code in (401, 403):
+                    # cookie 可能已失效，下一個類別開始前重新暖機
+                    self.session.invalidate()
+                if response.status_code != 429 and response.status_code < 500:
+                    return None
+                continue
+            try:
+                with self.metrics.timer('parse'):
+                    if projection and not self.response_cache:
+                        # 不需要保存完整回應時，直接由 bytes 解析出投影的欄位
+                        return projection.decode(response.content)
+                    data = loads(response.content)
+            except ValueError as e:
+                logging.error(f"Request failed for URL: {url} with params: {params}. Error: {str(e)}")
+                return None
+            if self.response_cache:
+                self.response_cache.set(url, params, data)
+            return projection.project(data) if projection else data
+
+        logging.error(f"Max retries reached for URL: {url}")
+        return None
+
+    def _build_search_params(self, city_code, job_code, page):
+        return {
+            'ro': '0',
+            'kwop': '7',
+            'keyword': '',
+            'order': '15',
+            'asc': '0',
+            'page': str(page),
+            'mode': 'l',
+            'jobsource': '2018indexpoc',
+            'langFlag': '0',
+            'langStatus': '0',
+            'recommended': '0',
+            'area': city_code,
+            'jobcat': job_code,
+            'isnew': '0',
+            'dist': '0',
+            'scmax': '',
+            'scmin': '',
+            'scstrict': '0',
+            'scneg': '0',
+            'excludeReadJob': '',
+            'cat': '',
+            'indcat': '',
+            'kwoperator': '1'
+        }
+
+    def query_params(self, query, page):
+        """SearchQuery 第 page 頁的搜尋參數"""
+        params = self._build_search_params(query.area, query.jobcat, page)
+        params.update(query.params())
+        return params
+
+    def _query_name(self, query):
+        name = JOBCAT_SEPARATOR.join(self.job_codes.name(code, code) for code in query.job_codes)
+        if query.key != query.jobcat:
+            name += f" [{query.key[len(query.jobcat):]}]"
+        return name
+
+    def _job_cat_from_detail(self, job):
+        """合併搜尋的列表看不出職缺屬於哪個類別，改由明細的 jobCategory 取出有在爬的類別"""
+        categories = job.get('jobCategory') or []
+        names = [self.job_codes.name(c.get('code')) for c in categories if isinstance(c, dict)]
+        return JOBCAT_SEPARATOR.join(dict.fromkeys(name for name in names if name))
+
+    def _parse_job_code(self, job):
+        code = job_code_from_link(job.get('link'))
+        if code:
+            job['code'] = code
+            return code
+        logging.warning(f"Missing 'applyAnalyze' in job link: {job.get('link')}")
+        return None
+
+    def _fetch_job_detail(self, job):
+        """抓取職缺明細，回傳 JOB_DETAIL 投影後的欄位"""
+        job_detail_url = f"{self.base_url}/job/ajax/content/{job['code']}"
+        return self.get_request(job_detail_url, headers=self.detail_headers, projection=JOB_DETAIL)
+
+    def _apply_job_detail(self, job, detail):
+        """寫入職缺明細欄位，回傳公司的 code（沒有則回傳 None）"""
+        if not detail:
+            logging.warning(f"Failed to fetch job details for code: {job['code']}")
+            return None
+
+        for field in ('condition', 'jobCategory', 'welfare', 'skills', 'contact'):
+            job[field] = detail[field]
+        if not job['JobCat']:
+            job['JobCat'] = self._job_cat_from_detail(job)
+
+        if not detail['company_code']:
+            logging.warning(f"Missing 'custUrl' in job details for code: {job['code']}")
+        return detail['company_code']
+
+    def _merge_seen_job(self, job):
+        """職缺已在其他類別抓過時，只把類別併入 JobCat 並回傳 True"""
+        with self._seen_lock:
+            if job['code'] not in self.seen_jobs:
+                self.seen_jobs[job['code']] = job
+                return False
+
+            self.duplicate_hits += 1
+            seen = self.seen_jobs[job['code']]
+            if not job['JobCat']:
+                return True
+            # 已寫出的職缺只保留 code，類別先記在 crawl_queue，城市結束時再併入輸出檔
+            if seen is None:
+                self.crawl_queue.add_job_category(job['code'], job['JobCat'])
+            else:
+                categories = seen['JobCat'].split(JOBCAT_SEPARATOR) if seen['JobCat'] else []
+                if job['JobCat'] not in categories:
+                    seen['JobCat'] = JOBCAT_SEPARATOR.join(categories + [job['JobCat']])
+            return True
+
+    def _log_dedup_stats(self):
+        logging.info(
+            f"Job dedup: {len(self.seen_jobs)} unique jobs, {self.duplicate_hits} duplicate "
+            f"category hits skipped"
+        )
+
+    def _parse_company_response(self, company_response):
+        if company_response and 'data' in company_response:
+            return {
+                'empNo': company_response['data'].get('empNo', 'N/A'),
+                'capital': company_response['data'].get('capital', 'N/A')
+            }
+        return None
+
+    def _apply_company_detail(self, job, company_code, company):
+        if company:
+            job['company_employees'] = company['empNo']
+            job['company_capital'] = company['capital']
+        else:
+            logging.warning(f"Failed to fetch company details for company_code: {company_code}")
+
+    def _fetch_company(self, company_code):
+        company = self.company_cache.get(company_code)
+        if company is None:
+            company_url = f"{self.base_url}/company/ajax/content/{company_code}"
+            company = self._parse_company_response(self.get_request(company_url))
+            if company:
+                self.company_cache.set(company_code, company)
+        return company
+
+    def _total_pages(self, response):
+        """從搜尋結果第一頁取得總頁數，取不到時回傳 max_pages"""
+        data = response.get('data') or {}
+        total = data.get('totalPage')
+        if total is None:
+            total = ((response.get('metadata') or {}).get('pagination') or {}).get('lastPage')
         try:
-            response = self.session.get(url, params=params, headers=headers, timeout=30)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Request failed for URL: {url} with params: {params}. Error: {str(e)}")
-            if attempt < 5:
-                wait_time = self._exponential_backoff(attempt)
-                logging.info(f"Retrying in {wait_time:.2f} seconds... (Attempt {attempt + 1}/5)")
-                time.sleep(wait_time)
-                return self.get_request(url, params, headers, attempt + 1)
+            return max(1, min(int(total), self.max_pages))
+        except (TypeError, ValueError):
+            return self.max_pages
+
+    def _remaining_page_params(self, city_code, job_code, response):
+        return [
+            self._build_search_params(city_code, job_code, page)
+            for page in range(2, self._total_pages(response) + 1)
+        ]
+
+    def _list_jobs(self, response, params):
+        if not response or 'data' not in response or 'list' not in response['data']:
+            logging.warning(f"Unexpected response format: {response}")
+            return None
+        if not response['data']['list']:
+            logging.info(f"No more jobs after page {int(params['page']) - 1} for job_code {params['jobcat']}")
+        return response['data']['list']
+
+    def _log_page(self, params, job_name):
+        logging.info(
+            f"Fetching page {params['page']} for job_code {params['jobcat']} ({job_name}) "
+            f"in city_code {params['area']}..."
+        )
+
+    def _filter_new_jobs(self, jobs, job_name):
+        """回傳 (要輸出的職缺, 需要抓明細的職缺)"""
+        new_jobs = []
+        to_enrich = []
+        for raw in jobs:
+            # 只保留要輸出的欄位，原始 dict 隨即釋放
+            job = JobRecord.from_api(raw)
+            job['JobCat'] = job_name
+            if not self._parse_job_code(job):
+                new_jobs.append(job)
+            elif not self._merge_seen_job(job):
+                new_jobs.append(job)
+                if not (self.crawl_index and self.crawl_index.carry_forward(job)):
+                    to_enrich.append(job)
+                elif not job['JobCat']:
+                    job['JobCat'] = self._job_cat_from_detail(job)
+        return new_jobs, to_enrich
+
+    def _enrich_job(self, job):
+        company_code = self._apply_job_detail(job, self._fetch_job_detail(job))
+        if company_code:
+            self._apply_company_detail(job, company_code, self._fetch_company(company_code))
+
+    def _iter_list_pages(self, query, pages=None, first_page=None):
+        """只抓搜尋列表，逐頁產生 (page, last_page, jobs, to_enrich)，明細留給呼叫端處理
+
+        first_page 為規劃搜尋時已抓到的第一頁回應，直接沿用不再請求
+        """
+        url = f'{self.base_url}/jobs/search/list'
+        # 合併多個類別的搜尋，JobCat 等明細回來後再由 jobCategory 決定
+        job_name = self.job_codes.name(query.job_codes[0]) if len(query.job_codes) == 1 else None
+        log_name = self._query_name(query)
+
+        page_params = [self.query_params(query, page) for page in (pages or [1])]
+        while page_params:
+            params = page_params.pop(0)
+            if params['page'] == '1' and first_page is not None:
+                response, first_page = first_page, None
             else:
-                logging.error(f"Max retries reached for URL: {url}")
-                return None
-    
+                self._log_page(params, log_name)
+                response = self.get_request(url, params=params)
+            jobs = self._list_jobs(response, params)
+            if jobs is None:
+                yield int(params['page']), None, None, None
+                return
+            if not jobs:
+                return
+
+            last_page = None
+            if params['page'] == '1':
+                # 第一頁回來後即可依總頁數產生其餘頁面的參數
+                last_page = self._total_pages(response)
+                page_params = [self.query_params(query, page) for page in range(2, last_page + 1)]
+
+            with self.metrics.timer('parse'):
+                new_jobs, to_enrich = self._filter_new_jobs(jobs, job_name)
+            yield int(params['page']), last_page, new_jobs, to_enrich
+
+    def iter_job_pages(self, city_code, job_code, pages=None):
+        """逐頁產生 (page, last_page, jobs)；last_page 只在第一頁有值，請求失敗時 jobs 為 None
+
+        pages 指定要抓的頁面（續跑時使用），預設從第一頁開始
+        """
+        query = SearchQuery(city_code, [job_code])
+        for page, last_page, new_jobs, to_enrich in self._iter_list_pages(query, pages):
+            for job in to_enrich or ():
+                self._enrich_job(job)
+            if new_jobs is not None:
+                self.metrics.add_jobs(len(new_jobs))
+            yield page, last_page, new_jobs
+
     def fetch_jobs(self, city_code, job_code):
-        url = 'https://www.104.com.tw/jobs/search/list'
         all_jobs = []
-        job_name = next((key for key, value in self.job_codes.items() if value == job_code), None)
+        job_name = self.job_codes.name(job_code)
 
         if not self._init_session():
             logging.error("Failed to initialize session")
             return []
-        max_pages = 149
-        for page in range(1, max_pages + 1):
-            params = {
-                'ro': '0',
-                'kwop': '7',
-                'keyword': '',
-                'order': '15',
-                'asc': '0',
-                'page': str(page),
-                'mode': 'l',
-                'jobsource': '2018indexpoc',
-                'langFlag': '0',
-                'langStatus': '0',
-                'recommended': '0',
-                'area': city_code,
-                'jobcat': job_code,
-                'isnew': '0',
-                'dist': '0',
-                'scmax': '',
-                'scmin': '',
-                'scstrict': '0',
-                'scneg': '0',
-                'excludeReadJob': '',
-                'cat': '',
-                'indcat': '',
-                'kwoperator': '1'
-            }
 
-            logging.info(f"Fetching page {page} for job_code {job_code} ({job_name}) in city_code {city_code}...")
-            response = self.get_request(url, params=params)
-
-            if not response or 'data' not in response or 'list' not in response['data']:
-                logging.warning(f"Unexpected response format: {response}")
-                break
-
-            jobs = response['data']['list']
-            for job in jobs:
-                job['JobCat'] = job_name
-                link_data = job.get('link', {})
-                apply_analyze = link_data.get('applyAnalyze', '')
-
-                if apply_analyze:
-                    job_code = apply_analyze.split('/')[6].split('?')[0]
-                    job['code'] = job_code
-                else:
-                    logging.warning(f"Missing 'applyAnalyze' in job link: {link_data}")
-                    continue
-
-                header = {
-                    'Accept': 'application/json, text/plain, */*',
-                    'Accept-Encoding': 'gzip, deflate, br, zstd',
-                    'Accept-Language': 'zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7',
-                    'Connection': 'keep-alive',
-                    'Host': 'www.104.com.tw',
-                    'Referer': 'https://www.104.com.tw/',
-                    'User-Agent': self._get_random_ua()
-                }
-                job_detail_url = f"https://www.104.com.tw/job/ajax/content/{job['code']}"
-                rep = self.get_request(job_detail_url, headers=header)
-                
-                if rep and 'data' in rep:
-                    job['condition'] = rep['data'].get('condition', {})
-                    job['jobCategory'] = rep['data']['jobDetail'].get('jobCategory', {})
-    
-                    # 抓取公司的 URL
-                    cust_url = rep['data']['header'].get('custUrl', None)
-                    if cust_url:
-                        company_code = cust_url.split('/')[-1]  # 取出公司的 code
-                        company_url = f"https://www.104.com.tw/company/ajax/content/{company_code}"
-        
-                        company_response = self.get_request(company_url)
-                        if company_response and 'data' in company_response:
-                            job['company_employees'] = company_response['data'].get('empNo', 'N/A')
-                            job['company_capital'] = company_response['data'].get('capital', 'N/A')
-                        else:
-                            logging.warning(f"Failed to fetch company details for company_code: {company_code}")
-                    else:
-                        logging.warning(f"Missing 'custUrl' in response header: {rep['data']['header']}")
-                else:
-                    logging.warning(f"Failed to fetch job details for code: {job['code']}")
-
-
-            all_jobs.extend(jobs)
-            time.sleep(random.uniform(2, 5))
+        for page, last_page, jobs in self.iter_job_pages(city_code, job_code):
+            if jobs:
+                all_jobs.extend(jobs)
 
         logging.info(f"Total jobs fetched for job_code {job_code} ({job_name}): {len(all_jobs)}")
         return all_jobs
 
+    def _crawl_query(self, planned, sink):
+        """抓取一個搜尋，逐頁寫入 sink 並標記完成，回傳是否全部成功
+
+        crawl_queue 以 query.key 記錄頁面進度；單一類別、不拆分的搜尋，key 就是類別 code
+        """
+        query = planned.query
+        city_code, key = query.city_code, query.key
+        pages = self.crawl_queue.pending_pages(city_code, key)
+        if pages == []:
+            self.crawl_queue.complete_category(city_code, key)
+            return True
+
+        if not self._init_session():
+            logging.error("Failed to initialize session")
+            return False
+
+        for page, last_page, jobs, to_enrich in self._iter_list_pages(query, pages, planned.first_page):
+            if jobs is None:
+                logging.warning(f"Page {page} of search {key} failed; it will be retried on the next run")
+                return False
+            for job in to_enrich:
+                self._enrich_job(job)
+            self.metrics.add_jobs(len(jobs))
+            if last_page:
+                self.crawl_queue.add_pages(city_code, key, last_page)
+            self._commit_page(city_code, key, page, jobs, sink)
+
+        self.crawl_queue.complete_category(city_code, key)
+        return True
+
+    def _commit_page(self, city_code, job_code, page, jobs, sink):
+        """把一頁職缺寫入 sink 並標記完成；已寫出的職缺在 seen_jobs 中只保留 code"""
+        codes = [job['code'] for job in jobs if job.get('code')]
+        with self._seen_lock:
+            with self.metrics.timer('save'):
+                offset = sink.write(jobs)
+            self.crawl_queue.mark_done(city_code, job_code, page, codes, offset)
+            for code in codes:
+                self.seen_jobs[code] = None
+        self.metrics.add_saved(len(jobs))
+        if self.crawl_index:
+            self.crawl_index.record(city_code, jobs)
+        return len(jobs)
+
     def save_to_csv(self, df, filename):
         try:
             df.to_csv(filename, index=False, encoding='utf-8-sig')
@@ -799,26 +471,251 @@ class JobScraper:
         except Exception as e:
             logging.error(f"Error saving to csv: {str(e)}")
 
-    def run(self):
-        for city_name, city_code in self.city_codes.items():
-            all_jobs = []
-
-            for job_name, job_code in self.job_codes.items():
-                logging.info(f"Fetching data for {city_name} - {job_name}")
-                try:
-                    jobs = self.fetch_jobs(city_code, job_code)
-                    if jobs:
-                        all_jobs.extend(jobs)
-                        time.sleep(random.uniform(20, 30))
-                except Exception as e:
-                    logging.error(f"Error processing {city_name} - {job_name}: {str(e)}")
-                    continue
-
-            if all_jobs:
-                filename = f'./job_104_data_{city_name}_{datetime.now().strftime("%Y%m%d_%H%M")}.csv'
-                df = pd.DataFrame(all_jobs)
-                self.save_to_csv(df, filename)
+    def _group_units(self, units):
+        """把 (城市, 職務類別) 依城市分組，回傳 [(city_name, {job_name: job_code})]"""
+        if units is None:
+            return [(city_name, self.job_codes) for city_name in self.city_codes]
+        grouped = {}
+        for city_name, job_name in units:
+            grouped.setdefault(city_name, {})[job_name] = self.job_codes[job_name]
+        return list(grouped.items())
+
+    def _begin_incremental(self, city_names):
+        """索引是空的時候，先以各城市最近一次的輸出檔建立索引"""
+        if self.crawl_index.is_new():
+            for city_name in city_names:
+                for path in self.sink_class.latest_output(self.output_dir, city_name):
+                    count = self.crawl_index.seed(self.city_codes[city_name], self.sink_class.read_rows(path))
+                    logging.info(f"Seeded crawl index with {count} jobs from {path}")
+        self.crawl_index.begin_run()
+
+    def _crawled_categories(self, job_codes):
+        """finish_run 用的類別名稱集合；爬過完整類別表的所有類別時為 None"""
+        if set(self.all_job_codes.values()) <= set(job_codes.values()):
+            return None
+        return set(job_codes)
+
+    def _finish_incremental(self, crawled):
+        """結束增量爬取，把新增、變動、下架的職缺 code 寫成 delta 檔
+
+        crawled 為 {city_code: 類別名稱集合或 None}，只含所有類別都完整爬完的城市
+        """
+        delta = self.crawl_index.finish_run(crawled)
+        filename = os.path.join(self.output_dir, f'job_104_delta_{datetime.now().strftime("%Y%m%d_%H%M")}.json')
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(delta, f, ensure_ascii=False, indent=2)
+        self.crawl_index.log_stats()
+        logging.info(
+            f"Delta: {len(delta['added'])} added, {len(delta['changed'])} changed, "
+            f"{len(delta['removed'])} removed; saved to {filename}"
+        )
+        return delta
+
+    def _plan_city(self, city_code, job_codes):
+        """回傳這個城市尚未完成的類別要送出的 [PlannedQuery]；沒有 planner 時每個類別一個搜尋
+
+        規劃前暖機失敗時回傳 None，整個城市視為失敗，類別都不標記完成
+        """
+        pending = CodeTable(
+            (name, code) for name, code in job_codes.items() if not self.crawl_queue.is_category_done(city_code, code)
+        )
+        if not self.planner or not pending:
+            return [PlannedQuery(SearchQuery(city_code, [code]), None, None, None) for code in pending.values()]
+        if not self._init_session():
+            logging.error("Failed to initialize session")
+            return None
+        return self.planner.plan(city_code, pending)
+
+    def _complete_planned(self, city_code, job_codes):
+        """規劃過的搜尋都完成後，才把城市的每個類別標記為完成"""
+        if self.planner and not self.planner.incomplete:
+            for job_code in job_codes.values():
+                self.crawl_queue.complete_category(city_code, job_code)
+
+    def _reset_planner(self):
+        # 每個城市重新判斷，上一個城市的規劃失敗不會影響這個城市
+        if self.planner:
+            self.planner.incomplete = False
+
+    def _crawl_city(self, city_name, city_code, job_codes, sink):
+        self._reset_planner()
+        planned_queries = self._plan_city(city_code, job_codes)
+        if planned_queries is None:
+            return
+        failed = False
+        for planned in planned_queries:
+            if self.crawl_queue.is_category_done(city_code, planned.query.key):
+                continue
+            query_name = self._query_name(planned.query)
+            logging.info(f"Fetching data for {city_name} - {query_name}")
+            try:
+                failed = not self._crawl_query(planned, sink) or failed
+                self.rate_limiter.log_metrics()
+            except Exception as e:
+                logging.error(f"Error processing {city_name} - {query_name}: {str(e)}")
+                failed = True
+                continue
+        if not failed:
+            self._complete_planned(city_code, job_codes)
+
+    def run(self, units=None):
+        """units 為 [(城市名稱, 職務類別名稱)]，預設爬取所有城市 × 所有類別"""
+        # 續跑時，已寫出的職缺不再重抓明細
+        for code in self.crawl_queue.seen_codes():
+            self.seen_jobs.setdefault(code, None)
+        groups = self._group_units(units)
+        if self.crawl_index:
+            self._begin_incremental([city_name for city_name, job_codes in groups])
+
+        incomplete = 0
+        # 本輪各城市的輸出路徑，續跑時為上次中斷的檔案；分片合併時只讀這些檔案
+        self.run_outputs = {}
+        for city_name, job_codes in groups:
+            city_code = self.city_codes[city_name]
+            filename, offset = self.crawl_queue.output_file(
+                city_code, self.sink_class.output_path(self.output_dir, city_name, datetime.now())
+            )
+            self.run_outputs[city_name] = filename
+            if self.crawl_queue.is_finalized(city_code):
+                continue
+            sink = self.sink_class(filename, offset)
+            self._crawl_city(city_name, city_code, job_codes, sink)
+
+            pending = [code for code in job_codes.values() if not self.crawl_queue.is_category_done(city_code, code)]
+            if pending:
+                incomplete += len(pending)
+                continue
+            # 把已寫出的職缺後來命中的類別併入 JobCat
+            with self.metrics.timer('save'):
+                sink.merge_job_categories(self.crawl_queue.extra_categories(city_code), JOBCAT_SEPARATOR)
+                sink.close()
+            self.crawl_queue.mark_finalized(city_code)
+
+        self.company_cache.log_stats()
+        if self.response_cache:
+            self.response_cache.log_stats()
+        self._log_dedup_stats()
+        self.metrics.log_summary()
+        if incomplete:
+            logging.warning(f"{incomplete} categories incomplete; rerun with the same crawl queue to resume")
+            return
+        self.crawl_queue.clear()
+        if self.crawl_index:
+            # 只爬部分類別時，只有這些類別的職缺能判斷是否已下架
+            self._finish_incremental({
+                self.city_codes[name]: self._crawled_categories(job_codes) for name, job_codes in groups
+            })
+
+def create_scraper(output_dir='.', output_format='csv', metrics=None, incremental=False, cache_dir=None,
+                   offline=False, http2=False, pipeline=False, detail_workers=8, company_workers=4, queue_size=64,
+                   plan=False, max_jobcats=10):
+    """依 CLI 選項建立爬蟲；續跑佇列與增量索引放在 output_dir"""
+    options = dict(
+        metrics=metrics,
+        crawl_queue=CrawlQueue(os.path.join(output_dir, 'crawl_queue.sqlite')),
+        output_format=output_format,
+        output_dir=output_dir,
+        crawl_index=CrawlIndex(os.path.join(output_dir, 'crawl_index.sqlite')) if incremental else None,
+        response_cache=ResponseCache(cache_dir, offline=offline) if cache_dir else None,
+        plan_queries=plan
+    )
+    if pipeline:
+        from pipeline import PipelinedJobScraper
+        scraper = PipelinedJobScraper(
+            session=SessionManager(pool_size=detail_workers + company_workers + 1, http2=http2),
+            detail_workers=detail_workers,
+            company_workers=company_workers,
+            queue_size=queue_size,
+            **options
+        )
+    else:
+        scraper = JobScraper(session=SessionManager(http2=http2), **options)
+    if scraper.planner:
+        scraper.planner.max_jobcats = max_jobcats
+    return scraper
+
+
+def main():
+    parser = argparse.ArgumentParser(description="爬取 104 人力銀行職缺")
+    parser.add_argument('--format', default='csv', choices=sorted(SINKS), help="輸出格式")
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--shard', help="只執行第 i 個 shard（共 N 個），格式為 i/N")
+    parser.add_argument('--processes', type=int, help="在本機以 N 個 process 執行全部 shard 並合併")
+    parser.add_argument('--merge', type=int, metavar='N', help="合併 N 個 shard 的輸出")
+    parser.add_argument('--incremental', action='store_true', help="只抓新增或變動職缺的明細，並輸出 delta 檔")
+    parser.add_argument('--cache-dir', help="把 API 回應快取在這個目錄")
+    parser.add_argument('--offline', action='store_true', help="只從 --cache-dir 的快取重播，不連網")
+    parser.add_argument('--city-prefix', nargs='+', help="只爬 code 以這些前綴開頭的城市，例如 6001001")
+    parser.add_argument('--job-prefix', nargs='+', help="只爬 code 以這些前綴開頭的職務類別，例如 2001 為整個大類")
+    parser.add_argument('--metrics-port', type=int, help="在這個 port 提供 Prometheus 格式的 /metrics")
+    parser.add_argument('--metrics-snapshot', help="定期把指標的 JSON 快照寫到這個檔案")
+    parser.add_argument('--snapshot-interval', type=float, default=60, help="JSON 快照的間隔秒數")
+    parser.add_argument('--profile', help="剖析整個爬取並把結果寫到這個檔案")
+    parser.add_argument('--profiler', default='cprofile', choices=['cprofile', 'pyinstrument'])
+    parser.add_argument('--http2', action='store_true', help="以 httpx 的 HTTP/2 連線送出請求")
+    parser.add_argument('--pipeline', action='store_true', help="以列表、明細、公司、寫出分段的管線爬取")
+    parser.add_argument('--detail-workers', type=int, default=8, help="管線模式抓取職缺明細的執行緒數")
+    parser.add_argument('--company-workers', type=int, default=4, help="管線模式抓取公司資料的執行緒數")
+    parser.add_argument('--queue-size', type=int, default=64, help="管線各階段佇列的長度上限")
+    parser.add_argument('--plan', action='store_true', help="先探測各類別的職缺數，合併小類別、拆分超過頁數上限的類別")
+    parser.add_argument('--max-jobcats', type=int, default=10, help="規劃搜尋時一個搜尋最多合併的類別數")
+    args = parser.parse_args()
+    if args.offline and not args.cache_dir:
+        parser.error("--offline requires --cache-dir")
+    if args.processes and (args.metrics_port or args.metrics_snapshot or args.profile):
+        # 每個 process 各有自己的指標與剖析結果，需要時改以 --shard 分別執行
+        parser.error("--metrics-port, --metrics-snapshot and --profile cannot be used with --processes; "
+                     "run each shard with --shard instead")
+
+    import sharding
+    # 分片執行時同樣套用，增量索引與續跑佇列放在各 shard 的目錄
+    options = dict(
+        incremental=args.incremental,
+        cache_dir=args.cache_dir,
+        offline=args.offline,
+        http2=args.http2,
+        pipeline=args.pipeline,
+        detail_workers=args.detail_workers,
+        company_workers=args.company_workers,
+        queue_size=args.queue_size,
+        plan=args.plan,
+        max_jobcats=args.max_jobcats
+    )
+    if args.processes:
+        sharding.run_sharded(
+            args.processes, output_dir=args.output_dir, output_format=args.format,
+            city_prefixes=args.city_prefix, job_prefixes=args.job_prefix, **options
+        )
+    elif args.merge:
+        sharding.merge_shards(args.merge, args.output_dir, args.format)
+    else:
+        metrics = CrawlMetrics()
+        if args.metrics_port:
+            metrics.serve_prometheus(args.metrics_port)
+        if args.metrics_snapshot:
+            metrics.start_snapshots(args.metrics_snapshot, args.snapshot_interval)
+        scraper = None
+        try:
+            if args.shard:
+                index, count = sharding.parse_shard(args.shard)
+                crawl = functools.partial(
+                    sharding.run_shard, index, count, args.output_dir, args.format, args.city_prefix,
+                    args.job_prefix, metrics=metrics, **options
+                )
+            else:
+                scraper = create_scraper(args.output_dir, args.format, metrics, **options)
+                scraper.select_codes(args.city_prefix, args.job_prefix)
+                crawl = scraper.run
+            if args.profile:
+                with profile(args.profile, args.profiler):
+                    crawl()
+            else:
+                crawl()
+        finally:
+            if scraper:
+                scraper.session.close()
+            metrics.stop()
+
 
 if __name__ == "__main__":
-    scraper = JobScraper()
-    scraper.run()
+    main()
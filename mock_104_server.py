@@ -0,0 +1,298 @@
+import argparse
+import csv
+import glob
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from code_registry import load_registry
+from crawl_index import decode_nested
+from sinks import NESTED_COLUMNS
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# 列表 API 不會回傳的欄位（由爬蟲補上或來自明細 API）
+_DETAIL_COLUMNS = {
+    'JobCat', 'code', 'condition', 'jobCategory', 'company_employees', 'company_capital', 'welfare', 'skills', 'contact'
+}
+_WELFARE_TAGS = ('年終獎金', '員工旅遊', '彈性上下班', '員工停車位', '健康檢查', '三節獎金')
+_SKILLS = ('Excel', '文書處理', '門市管理', '行銷企劃', 'SQL', '客戶服務')
+
+
+def load_fixtures(path=None):
+    """以範例 CSV 建立列表 API 的職缺資料，巢狀欄位還原成 dict / list"""
+    path = path or glob.glob(os.path.join(ROOT, 'job_104_data_*.csv'))[0]
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        return [
+            {k: decode_nested(v) if k in NESTED_COLUMNS else v for k, v in row.items() if k not in _DETAIL_COLUMNS}
+            for row in csv.DictReader(f)
+        ]
+
+
+def _district(city, index, config):
+    return f"{city[:7]}{index % config['districts'] + 1:03d}"
+
+
+def _salary(index):
+    # 月薪 25,000 ~ 74,000 元
+    return 25000 + index * 37 % 50 * 1000
+
+
+class Mock104Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # 標頭與內容分兩次送出，不關掉 Nagle 會和 delayed ACK 疊出約 40 ms 的額外延遲
+    disable_nagle_algorithm = True
+
+    job_detail_re = re.compile(r'^/job/ajax/content/([0-9a-z]+)$')
+    company_re = re.compile(r'^/company/ajax/content/cust([0-9]+)$')
+
+    def do_GET(self):
+        server = self.server
+        config = server.config
+        parts = urlsplit(self.path)
+        if parts.path == '/jobs/search/':
+            return self._send_html('<html></html>')
+
+        delay = server.delay()
+        if delay:
+            time.sleep(delay)
+        status = server.injected_status()
+        if status == 429:
+            return self._send_json({'status': 429}, status=429, headers={'Retry-After': str(config['retry_after'])})
+        if status:
+            return self._send_json({'status': status}, status=status)
+
+        if parts.path == '/jobs/search/list':
+            query = parse_qs(parts.query)
+            return self._send_json(self._search_list(query))
+        match = self.job_detail_re.match(parts.path)
+        if match:
+            return self._send_json(self._job_detail(match.group(1)))
+        match = self.company_re.match(parts.path)
+        if match:
+            return self._send_json(self._company(int(match.group(1))))
+
+        self._send_json({'status': 404}, status=404)
+
+    def _matches(self, query):
+        """依 area（城市或行政區）、jobcat（可用逗號合併多個）、scmin/scmax 篩選職缺，回傳 [(jobcat, index)]"""
+        config = self.server.config
+        area = query.get('area', [''])[0]
+        city = area[:7] + '000'
+        scmin = int(query.get('scmin', [''])[0] or 0)
+        scmax = int(query.get('scmax', [''])[0] or 10 ** 9)
+        matches = []
+        for jobcat in query.get('jobcat', [''])[0].split(','):
+            for index in range(config['category_sizes'].get(jobcat, config['pages'] * config['jobs_per_page'])):
+                if area != city and _district(city, index, config) != area:
+                    continue
+                if not scmin <= _salary(index) <= scmax:
+                    continue
+                matches.append((jobcat, index))
+        return city, matches
+
+    def _search_list(self, query):
+        config = self.server.config
+        fixtures = self.server.fixtures
+        page = int(query.get('page', ['1'])[0])
+        city, matches = self._matches(query)
+        per_page = config['jobs_per_page']
+        # 和 104 一樣，超過 max_pages 的頁面不會回傳資料
+        shown = matches[(page - 1) * per_page:page * per_page]
+        if config['max_pages'] and page > config['max_pages']:
+            shown = []
+
+        jobs = []
+        for jobcat, index in shown:
+            code = f"{jobcat}{city[4:7]}{index:05d}"
+            cust_no = f"cust{index % config['companies']}"
+            job = dict(fixtures[index % len(fixtures)])
+            job.update({
+                'jobNo': code,
+                'jobAddrNo': _district(city, index, config),
+                'custNo': cust_no,
+                'salaryLow': f'{_salary(index):07d}',
+                'link': {
+                    'applyAnalyze': f'//www.104.com.tw/jobs/apply/analysis/{code}?channel=104rpt&jobsource=mock',
+                    'job': f'//www.104.com.tw/job/{code}?jobsource=mock',
+                    'cust': f'//www.104.com.tw/company/{cust_no}?jobsource=mock'
+                }
+            })
+            jobs.append(job)
+        return {
+            'data': {
+                'list': jobs,
+                'totalCount': len(matches),
+                'totalPage': -(-len(matches) // per_page),
+                'pageNo': page
+            }
+        }
+
+    def _job_detail(self, code):
+        config = self.server.config
+        jobcat, index = code[:10], int(code[13:])
+        fixture = self.server.fixtures[index % len(self.server.fixtures)]
+        description = load_registry().jobs.name(jobcat, fixture.get('coIndustryDesc', ''))
+        skills = [{'code': str(i), 'description': _SKILLS[(index + i) % len(_SKILLS)]} for i in range(index % 3)]
+        return {
+            'data': {
+                'header': {
+                    'jobName': fixture.get('jobName', ''),
+                    'custName': fixture.get('custName', ''),
+                    'custUrl': f"https://www.104.com.tw/company/cust{index % config['companies']}"
+                },
+                'contact': {'hrName': '人資部', 'email': '', 'phone': [], 'reply': '2 天內回覆'},
+                'condition': {
+                    'edu': fixture.get('optionEdu', ''), 'workExp': fixture.get('periodDesc', ''), 'skill': skills,
+                    'specialty': []
+                },
+                'welfare': {
+                    'tag': [_WELFARE_TAGS[(index + i) % len(_WELFARE_TAGS)] for i in range(1 + index % 4)],
+                    'welfare': fixture.get('description', '')
+                },
+                'jobDetail': {
+                    'jobDescription': fixture.get('description', ''),
+                    'jobCategory': [{'code': jobcat, 'description': description}],
+                    'addressRegion': fixture.get('jobAddrNoDesc', ''),
+                    'longitude': fixture.get('lon', ''),
+                    'latitude': fixture.get('lat', '')
+                }
+            }
+        }
+
+    def _company(self, index):
+        fixture = self.server.fixtures[index % len(self.server.fixtures)]
+        employees = ((fixture.get('tags') or {}).get('emp') or {}).get('desc', '').replace('員工', '')
+        return {'data': {'empNo': employees or '暫不提供', 'capital': '暫不提供'}}
+
+    def _send_json(self, payload, status=200, headers=None):
+        self._send(json.dumps(payload, ensure_ascii=False).encode('utf-8'), 'application/json', status, headers)
+
+    def _send_html(self, body):
+        self._send(body.encode('utf-8'), 'text/html')
+
+    def _send(self, body, content_type, status=200, headers=None):
+        self.server.count(urlsplit(self.path).path, status)
+        self.send_response(status)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(format % args)
+
+
+class Mock104Server(ThreadingHTTPServer):
+    """模擬的 104 API；延遲、錯誤率與 429 突發都由 config 控制，可在執行中修改
+
+    - latency 為固定延遲，jitter 為額外的指數分佈延遲平均值（製造長尾）
+    - error_rate 為回應 500 的比例
+    - 每 rate_limit_every 個 API 請求中，前 rate_limit_burst 個回應 429 並附上 Retry-After: retry_after
+
+    每個城市 × 職務類別有固定的一組職缺（預設 pages × jobs_per_page 筆，可用 category_sizes 個別指定），
+    平均分佈在 districts 個行政區；搜尋條件只是篩選這組職缺，max_pages 之後的頁面和 104 一樣不回傳資料
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, handler, config, fixtures):
+        super().__init__(address, handler)
+        self.config = config
+        self.fixtures = fixtures
+        self.stats = {}
+        self._requests = 0
+        self._random = random.Random(config.get('seed'))
+        self._lock = threading.Lock()
+
+    def delay(self):
+        config = self.config
+        with self._lock:
+            extra = self._random.expovariate(1 / config['jitter']) if config['jitter'] else 0.0
+        return config['latency'] + extra
+
+    def injected_status(self):
+        """依設定決定這個請求要不要回應錯誤，回傳狀態碼或 None"""
+        config = self.config
+        with self._lock:
+            self._requests += 1
+            position = (self._requests - 1) % config['rate_limit_every'] if config['rate_limit_every'] else None
+            if position is not None and position < config['rate_limit_burst']:
+                return 429
+            if config['error_rate'] and self._random.random() < config['error_rate']:
+                return 500
+        return None
+
+    def count(self, path, status):
+        endpoint = path.rsplit('/', 1)[0] if path.startswith(('/job/', '/company/')) else path
+        with self._lock:
+            key = (endpoint, status)
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+
+def start_mock_server(host='127.0.0.1', port=0, latency=0.05, pages=3, jobs_per_page=20, companies=15, jitter=0.0,
+                      error_rate=0.0, rate_limit_every=0, rate_limit_burst=0, retry_after=1, seed=None,
+                      fixtures=None, category_sizes=None, districts=12, max_pages=None):
+    """在背景執行緒啟動模擬的 104 API，回傳 (server, base_url)"""
+    config = {
+        'latency': latency,
+        'jitter': jitter,
+        'pages': pages,
+        'jobs_per_page': jobs_per_page,
+        'companies': companies,
+        'category_sizes': category_sizes or {},
+        'districts': districts,
+        'max_pages': max_pages,
+        'error_rate': error_rate,
+        'rate_limit_every': rate_limit_every,
+        'rate_limit_burst': rate_limit_burst,
+        'retry_after': retry_after,
+        'seed': seed
+    }
+    server = Mock104Server((host, port), Mock104Handler, config, fixtures or load_fixtures())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在本機啟動模擬的 104 API")
+    parser.add_argument('--port', type=int, default=8104)
+    parser.add_argument('--latency', type=float, default=0.05, help="每個 API 請求的固定延遲秒數")
+    parser.add_argument('--jitter', type=float, default=0.0, help="額外延遲（指數分佈）的平均秒數")
+    parser.add_argument('--pages', type=int, default=3)
+    parser.add_argument('--jobs-per-page', type=int, default=20)
+    parser.add_argument('--companies', type=int, default=15)
+    parser.add_argument('--districts', type=int, default=12, help="每個城市的行政區數")
+    parser.add_argument('--max-pages', type=int, help="和 104 一樣只回傳前 N 頁")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="回應 500 的比例")
+    parser.add_argument('--rate-limit-every', type=int, default=0, help="每 N 個請求發生一次 429 突發")
+    parser.add_argument('--rate-limit-burst', type=int, default=0, help="每次 429 突發的請求數")
+    parser.add_argument('--retry-after', type=float, default=1)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server, base_url = start_mock_server(
+        port=args.port, latency=args.latency, jitter=args.jitter, pages=args.pages, jobs_per_page=args.jobs_per_page,
+        companies=args.companies, error_rate=args.error_rate, rate_limit_every=args.rate_limit_every,
+        rate_limit_burst=args.rate_limit_burst, retry_after=args.retry_after, seed=args.seed,
+        districts=args.districts, max_pages=args.max_pages
+    )
+    logging.info(f"Mock 104 server listening on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from functools import partial
+
+from main_scratch import JobScraper
+from session_manager import SessionManager
+
+# 佇列結束標記，每個 worker 收到一個後結束
+_STOP = object()
+
+
+class _Page:
+    """一頁列表的職缺，明細與公司資料都補齊（pending 歸零）後交給寫出階段"""
+
+    __slots__ = ('job_code', 'page', 'jobs', 'pending', 'failed', '_lock')
+
+    def __init__(self, job_code, page, jobs, pending):
+        self.job_code = job_code
+        self.page = page
+        self.jobs = jobs
+        self.pending = pending
+        self.failed = False
+        self._lock = threading.Lock()
+
+    def finish_one(self, failed=False):
+        """完成一筆職缺的補資料，回傳這一頁是否已全部完成"""
+        with self._lock:
+            self.failed = self.failed or failed
+            self.pending -= 1
+            return self.pending == 0
+
+
+class _CategoryEnd:
+    """列表階段結束一個搜尋時送出，produced 為送往寫出階段的頁數；job_code 為搜尋的 key"""
+
+    __slots__ = ('job_code', 'job_name', 'produced', 'failed')
+
+    def __init__(self, job_code, job_name):
+        self.job_code = job_code
+        self.job_name = job_name
+        self.produced = 0
+        self.failed = False
+
+
+class PipelinedJobScraper(JobScraper):
+    """以分段管線爬取：列表 → 職缺明細 → 公司資料 → 寫出
+
+    列表執行緒只負責翻頁，明細與公司資料各由一組 worker 處理，寫出在主執行緒進行；
+    各階段之間為長度 queue_size 的佇列，下游跟不上時上游會阻塞（backpressure），
+    公司資料查詢變慢不會卡住列表翻頁。
+    輸出的資料列與 JobScraper 相同，但頁面寫出的順序不固定。
+    """
+
+    def __init__(self, *args, detail_workers=8, company_workers=4, queue_size=64, report_interval=30, **kwargs):
+        if kwargs.get('session') is None:
+            # 每個 worker 與列表執行緒各占一條連線
+            kwargs['session'] = SessionManager(pool_size=detail_workers + company_workers + 1)
+        super().__init__(*args, **kwargs)
+        self.detail_workers = detail_workers
+        self.company_workers = company_workers
+        self.queue_size = queue_size
+        self.report_interval = report_interval
+        self._company_inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    def _queues(self):
+        return {'detail': self._detail_queue, 'company': self._company_queue, 'write': self._write_queue}
+
+    def _report_queue_depth(self, stop):
+        """每秒更新佇列長度指標，每 report_interval 秒寫一次 log"""
+        elapsed = 0
+        while True:
+            for stage, q in self._queues().items():
+                self.metrics.set_queue_depth(stage, q.qsize())
+            if stop.wait(1):
+                return
+            elapsed += 1
+            if elapsed >= self.report_interval:
+                elapsed = 0
+                depths = ', '.join(f"{stage} {q.qsize()}/{self.queue_size}" for stage, q in self._queues().items())
+                logging.info(f"Pipeline queue depth: {depths}")
+
+    def _produce(self, city_name, city_code, job_codes):
+        """列表階段：逐個搜尋翻頁，把需要補資料的職缺送進明細佇列"""
+        try:
+            planned_queries = self._plan_city(city_code, job_codes)
+            if planned_queries is None:
+                self._plan_failed = True
+                planned_queries = []
+            for planned in planned_queries:
+                key = planned.query.key
+                if self.crawl_queue.is_category_done(city_code, key):
+                    continue
+                query_name = self._query_name(planned.query)
+                logging.info(f"Fetching data for {city_name} - {query_name}")
+                end = _CategoryEnd(key, query_name)
+                try:
+                    end.failed = not self._produce_query(planned, end)
+                except Exception as e:
+                    logging.error(f"Error processing {city_name} - {query_name}: {str(e)}")
+                    end.failed = True
+                self._write_queue.put(end)
+        except Exception as e:
+            logging.error(f"Error planning searches for {city_name}: {str(e)}")
+            self._plan_failed = True
+        finally:
+            self._write_queue.put(_STOP)
+
+    def _produce_query(self, planned, end):
+        """回傳列表是否全部抓取成功"""
+        city_code, key = planned.query.city_code, planned.query.key
+        pages = self.crawl_queue.pending_pages(city_code, key)
+        if pages == []:
+            return True
+        if not self._init_session():
+            logging.error("Failed to initialize session")
+            return False
+
+        for page, last_page, jobs, to_enrich in self._iter_list_pages(planned.query, pages, planned.first_page):
+            if jobs is None:
+                logging.warning(f"Page {page} of search {key} failed; it will be retried on the next run")
+                return False
+            if last_page:
+                self.crawl_queue.add_pages(city_code, key, last_page)
+            end.produced += 1
+            item = _Page(key, page, jobs, len(to_enrich))
+            if not to_enrich:
+                self._write_queue.put(item)
+            for job in to_enrich:
+                self._detail_queue.put((item, job))
+        return True
+
+    def _detail_worker(self):
+        while True:
+            task = self._detail_queue.get()
+            if task is _STOP:
+                return
+            item, job = task
+            try:
+                company_code = self._apply_job_detail(job, self._fetch_job_detail(job))
+            except Exception as e:
+                logging.error(f"Error fetching job details for code {job['code']}: {str(e)}")
+                self._finish_job(item, failed=True)
+                continue
+            if company_code:
+                self._company_queue.put((item, job, company_code))
+            else:
+                self._finish_job(item)
+
+    def _company_worker(self):
+        while True:
+            task = self._company_queue.get()
+            if task is _STOP:
+                return
+            item, job, company_code = task
+            with self._inflight_lock:
+                # 同一間公司正在查詢時只掛上回呼，不重複送出請求
+                future = self._company_inflight.get(company_code)
+                owner = future is None
+                if owner:
+                    future = self._company_inflight[company_code] = Future()
+            future.add_done_callback(partial(self._on_company, item, job, company_code))
+            if not owner:
+                continue
+            try:
+                future.set_result(self._fetch_company(company_code))
+            except Exception as e:
+                logging.error(f"Error fetching company details for company_code {company_code}: {str(e)}")
+                future.set_exception(e)
+            finally:
+                with self._inflight_lock:
+                    self._company_inflight.pop(company_code, None)
+
+    def _on_company(self, item, job, company_code, future):
+        if future.exception() is not None:
+            self._finish_job(item, failed=True)
+            return
+        try:
+            self._apply_company_detail(job, company_code, future.result())
+        except Exception as e:
+            logging.error(f"Error applying company details for company_code {company_code}: {str(e)}")
+            self._finish_job(item, failed=True)
+            return
+        self._finish_job(item)
+
+    def _finish_job(self, item, failed=False):
+        if item.finish_one(failed):
+            self._write_queue.put(item)
+
+    def _crawl_city(self, city_name, city_code, job_codes, sink):
+        self._detail_queue = queue.Queue(self.queue_size)
+        self._company_queue = queue.Queue(self.queue_size)
+        self._write_queue = queue.Queue(self.queue_size)
+        self._plan_failed = False
+        self._reset_planner()
+        stop_report = threading.Event()
+        threads = [threading.Thread(target=self._report_queue_depth, args=(stop_report,), daemon=True)]
+        threads += [threading.Thread(target=self._detail_worker, daemon=True) for _ in range(self.detail_workers)]
+        threads += [threading.Thread(target=self._company_worker, daemon=True) for _ in range(self.company_workers)]
+        producer = threading.Thread(target=self._produce, args=(city_name, city_code, job_codes), daemon=True)
+        for thread in threads + [producer]:
+            thread.start()
+
+        failed = self._write(city_code, sink)
+        # 寫出階段結束時，列表已送出結束標記，所有頁面也都離開了明細與公司佇列
+        producer.join()
+        for _ in range(self.detail_workers):
+            self._detail_queue.put(_STOP)
+        for _ in range(self.company_workers):
+            self._company_queue.put(_STOP)
+        stop_report.set()
+        for thread in threads:
+            thread.join()
+        if not (failed or self._plan_failed):
+            self._complete_planned(city_code, job_codes)
+
+    def _write(self, city_code, sink):
+        """寫出階段：頁面補齊即寫入 sink，一個搜尋的頁面都寫完後才標記完成；回傳是否有搜尋失敗"""
+        processed = {}
+        failed = set()
+        ended = {}
+        stopped = False
+        while not (stopped and not ended):
+            item = self._write_queue.get()
+            if item is _STOP:
+                stopped = True
+                continue
+            if isinstance(item, _CategoryEnd):
+                ended[item.job_code] = item
+                if item.failed:
+                    failed.add(item.job_code)
+            elif item.failed:
+                processed[item.job_code] = processed.get(item.job_code, 0) + 1
+                logging.warning(
+                    f"Page {item.page} of search {item.job_code} failed; it will be retried on the next run"
+                )
+                failed.add(item.job_code)
+            else:
+                processed[item.job_code] = processed.get(item.job_code, 0) + 1
+                try:
+                    self.metrics.add_jobs(len(item.jobs))
+                    self._commit_page(city_code, item.job_code, item.page, item.jobs, sink)
+                except Exception as e:
+                    logging.error(f"Error saving page {item.page} of search {item.job_code}: {str(e)}")
+                    failed.add(item.job_code)
+
+            # 結束標記可能比最後幾頁先到，每寫完一頁都檢查類別是否已全部寫出
+            end = ended.get(item.job_code)
+            if end and processed.get(end.job_code, 0) == end.produced:
+                del ended[end.job_code]
+                if end.job_code not in failed:
+                    self.crawl_queue.complete_category(city_code, end.job_code)
+                    logging.info(f"Finished {end.job_name}: {end.produced} pages written")
+                    self.rate_limiter.log_metrics()
+        return bool(failed)
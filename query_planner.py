@@ -0,0 +1,194 @@
+import logging
+
+# 薪資切分的起始區間（月薪，元）；超過頁數上限的區間再對半切
+SALARY_BOUNDS = (0, 30000, 40000, 50000, 70000, 100000, 9999999)
+
+
+class SearchQuery:
+    """一組搜尋條件：城市（或其下的行政區）× 一或多個職務類別 × 薪資區間
+
+    key 為 crawl_queue 記錄頁面進度用的字串；單一類別、整個城市、不限薪資時就是類別 code，與原本的進度相容
+    """
+
+    __slots__ = ('city_code', 'area', 'job_codes', 'scmin', 'scmax')
+
+    def __init__(self, city_code, job_codes, area=None, scmin='', scmax=''):
+        self.city_code = city_code
+        self.area = area or city_code
+        self.job_codes = tuple(job_codes)
+        self.scmin = str(scmin)
+        self.scmax = str(scmax)
+
+    @property
+    def jobcat(self):
+        return ','.join(self.job_codes)
+
+    @property
+    def key(self):
+        key = self.jobcat
+        if self.area != self.city_code:
+            key += f'@{self.area}'
+        if self.scmin or self.scmax:
+            key += f'${self.scmin}-{self.scmax}'
+        return key
+
+    def params(self):
+        """覆寫 _build_search_params 的搜尋參數"""
+        return {'area': self.area, 'jobcat': self.jobcat, 'scmin': self.scmin, 'scmax': self.scmax}
+
+    def replace(self, **changes):
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return SearchQuery(**fields)
+
+    def __repr__(self):
+        return f'SearchQuery({self.key!r})'
+
+
+class PlannedQuery:
+    """規劃好的搜尋；first_page 為探測時抓到的第一頁回應，爬取時直接沿用"""
+
+    __slots__ = ('query', 'total', 'pages', 'first_page')
+
+    def __init__(self, query, total, pages, first_page):
+        self.query = query
+        self.total = total
+        self.pages = pages
+        self.first_page = first_page
+
+
+class QueryPlanner:
+    """把城市 × 職務類別的搜尋切分或合併，讓每個搜尋都在 max_pages 之內，且請求數盡量少
+
+    1. 同一個中類（code 前 7 碼）的類別以逗號合併成一個 jobcat 搜尋，每次最多 max_jobcats 個
+    2. 合併後超過頁數上限時對半拆開，直到單一類別
+    3. 單一類別仍超過上限時依行政區（area 的末 3 碼）拆分，行政區的筆數加總等於城市的筆數時即停止探測
+    4. 行政區仍超過上限（或行政區無法涵蓋全部職缺）時依薪資區間（scmin/scmax）拆分
+
+    每次拆分都以第一頁的 totalCount 確認子搜尋的筆數加總與原搜尋相同；無法完整涵蓋時保留原搜尋並記錄警告。
+    探測失敗的搜尋不列入計畫並設定 incomplete，這個城市的類別不會標記完成，下次執行時重新規劃
+    """
+
+    def __init__(self, scraper, max_jobcats=10, max_districts=40, salary_bounds=SALARY_BOUNDS, min_salary_band=1000):
+        self.scraper = scraper
+        self.max_jobcats = max_jobcats
+        self.max_districts = max_districts
+        self.salary_bounds = salary_bounds
+        self.min_salary_band = min_salary_band
+        self.probes = 0
+        self.incomplete = False
+
+    @property
+    def max_pages(self):
+        return self.scraper.max_pages
+
+    def probe(self, query):
+        """抓第一頁，回傳 PlannedQuery；請求失敗時回傳 None"""
+        self.probes += 1
+        url = f'{self.scraper.base_url}/jobs/search/list'
+        response = self.scraper.get_request(url, params=self.scraper.query_params(query, 1))
+        if not response or 'data' not in response:
+            logging.warning(f"Failed to probe search {query.key}; it will be planned again on the next run")
+            self.incomplete = True
+            return None
+        data = response['data']
+        listed = len(data.get('list') or [])
+        total = data.get('totalCount')
+        pages = data.get('totalPage')
+        if total is None:
+            total = ((response.get('metadata') or {}).get('pagination') or {}).get('total', listed)
+        total = int(total)
+        if pages is None or (listed and total > listed):
+            # 以實際的每頁筆數推算需要的頁數，不受 API 回報的頁數上限影響
+            pages = -(-total // listed) if listed else 0
+        return PlannedQuery(query, total, int(pages), response)
+
+    def fits(self, planned):
+        return planned.pages <= self.max_pages
+
+    def plan(self, city_code, job_codes):
+        """回傳 [PlannedQuery]，涵蓋 job_codes（CodeTable）在這個城市的所有職缺"""
+        self.probes = 0
+        self.incomplete = False
+        chunks = []
+        for family in job_codes.families(2).values():
+            codes = list(family.values())
+            chunks += [codes[i:i + self.max_jobcats] for i in range(0, len(codes), self.max_jobcats)]
+
+        planned = []
+        for codes in chunks:
+            planned += self._plan_categories(SearchQuery(city_code, codes))
+        planned = [item for item in planned if item.total]
+        logging.info(
+            f"Planned {len(planned)} searches for {len(job_codes)} categories in city_code {city_code} "
+            f"with {self.probes} probe requests; {sum(item.pages for item in planned)} pages in total"
+        )
+        return planned
+
+    def _plan_categories(self, query):
+        planned = self.probe(query)
+        if planned is None:
+            return []
+        if self.fits(planned):
+            return [planned]
+        if len(query.job_codes) > 1:
+            middle = len(query.job_codes) // 2
+            return (
+                self._plan_categories(query.replace(job_codes=query.job_codes[:middle]))
+                + self._plan_categories(query.replace(job_codes=query.job_codes[middle:]))
+            )
+        return self._split_by_district(planned)
+
+    def _split_by_district(self, parent):
+        query = parent.query
+        children = []
+        covered = 0
+        for number in range(1, self.max_districts + 1):
+            if covered >= parent.total:
+                break
+            planned = self.probe(query.replace(area=f'{query.city_code[:7]}{number:03d}'))
+            if planned is None:
+                return []
+            if planned.total:
+                children.append(planned)
+                covered += planned.total
+        if covered != parent.total:
+            logging.warning(
+                f"Districts cover {covered} of {parent.total} jobs for {query.key}; splitting by salary instead"
+            )
+            return self._split_by_salary(parent)
+
+        result = []
+        for child in children:
+            result += [child] if self.fits(child) else self._split_by_salary(child)
+        return result
+
+    def _split_by_salary(self, parent):
+        bands = list(zip(self.salary_bounds, self.salary_bounds[1:]))
+        children = []
+        for low, high in bands:
+            # 區間不重疊：scmax 為下一個區間的下限減一
+            children += self._plan_salary_band(parent.query, low, high - 1 if high != self.salary_bounds[-1] else high)
+        if None in children:
+            return []
+        if sum(child.total for child in children) != parent.total:
+            covered = sum(child.total for child in children)
+            logging.warning(
+                f"Salary bands cover {covered} of {parent.total} jobs for {parent.query.key}; "
+                f"keeping the search as is, pages after {self.max_pages} cannot be fetched"
+            )
+            return [parent]
+        return children
+
+    def _plan_salary_band(self, query, low, high):
+        planned = self.probe(query.replace(scmin=low, scmax=high))
+        if planned is None:
+            return [None]
+        if not planned.total:
+            return []
+        if self.fits(planned) or high - low < self.min_salary_band:
+            if not self.fits(planned):
+                logging.warning(f"Search {planned.query.key} still exceeds {self.max_pages} pages")
+            return [planned]
+        middle = (low + high) // 2
+        return self._plan_salary_band(query, low, middle) + self._plan_salary_band(query, middle + 1, high)
@@ -0,0 +1,101 @@
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+def parse_retry_after(value):
+    """Retry-After 可能是秒數或 HTTP 日期，統一換成秒數"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class AdaptiveRateLimiter:
+    """AIMD 速率控制：回應正常且夠快時逐步加速，遇到 429/5xx 或延遲升高時倍數降速
+
+    target_rate 為目前允許的每秒請求數，current_rate 為最近 window 秒內實際送出的速率
+    """
+
+    def __init__(self, initial_rate=0.5, min_rate=0.05, max_rate=5.0, increase=0.1, decrease=0.5,
+                 slow_decrease=0.9, latency_target=2.0, window=60.0):
+        self.target_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_decrease = slow_decrease
+        self.latency_target = latency_target
+        self.window = window
+        self.latency = None
+        self.throttled = 0
+        self._next_slot = time.monotonic()
+        self._blocked_until = 0.0
+        self._sent = deque()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """預約下一個請求的時段，回傳需要等待的秒數"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, self._blocked_until, now)
+            self._next_slot = slot + 1.0 / self.target_rate
+            self._sent.append(slot)
+            return slot - now
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def record(self, status, latency, retry_after=None):
+        """回報一次請求的結果；status 為 None 表示連線失敗"""
+        with self._lock:
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            if status is None or status == 429 or status >= 500:
+                self.throttled += 1
+                self.target_rate = max(self.target_rate * self.decrease, self.min_rate)
+                delay = parse_retry_after(retry_after)
+                if delay:
+                    self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+                logging.warning(f"Backing off after status {status}: target rate {self.target_rate:.2f} req/s")
+            elif self.latency > self.latency_target:
+                self.target_rate = max(self.target_rate * self.slow_decrease, self.min_rate)
+            elif status < 400:
+                # 每個成功的請求加 increase / rate，約等於每秒加 increase
+                self.target_rate = min(self.target_rate + self.increase / self.target_rate, self.max_rate)
+
+    @property
+    def current_rate(self):
+        with self._lock:
+            cutoff = time.monotonic() - self.window
+            while self._sent and self._sent[0] < cutoff:
+                self._sent.popleft()
+            return len(self._sent) / self.window
+
+    def metrics(self):
+        return {
+            'current_rate': self.current_rate,
+            'target_rate': self.target_rate,
+            'latency': self.latency,
+            'throttled': self.throttled
+        }
+
+    def log_metrics(self):
+        metrics = self.metrics()
+        latency = f"{metrics['latency']:.2f} s" if metrics['latency'] is not None else 'n/a'
+        logging.info(
+            f"Rate: current {metrics['current_rate']:.2f} req/s, target {metrics['target_rate']:.2f} req/s, "
+            f"latency {latency}, throttled {metrics['throttled']}"
+        )
@@ -0,0 +1,107 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 各類 API 回應的保存秒數：搜尋列表變動快，公司資料幾乎不變
+DEFAULT_TTLS = {
+    'search': 3600,
+    'job': 24 * 3600,
+    'company': 7 * 24 * 3600,
+    'other': 3600
+}
+
+
+def endpoint_type(url):
+    if '/jobs/search/list' in url:
+        return 'search'
+    if '/job/ajax/content/' in url:
+        return 'job'
+    if '/company/ajax/content/' in url:
+        return 'company'
+    return 'other'
+
+
+class ResponseCache:
+    """get_request 的磁碟快取：以 URL + params 的 SHA-256 為檔名，內容為壓縮後的 JSON
+
+    有安裝 zstandard 時以 zstd 壓縮，否則使用 gzip；offline=True 時只從快取讀取（離線重播）
+    """
+
+    def __init__(self, cache_dir='.http_cache', ttls=None, offline=False):
+        self.cache_dir = cache_dir
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, url, params=None):
+        payload = json.dumps([url, sorted((params or {}).items())], ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key, extension):
+        return os.path.join(self.cache_dir, key[:2], f'{key}.json.{extension}')
+
+    def _read(self, key):
+        """回傳 (資料, 寫入時間)；沒有快取時回傳 None"""
+        for extension in ('zst', 'gz'):
+            path = self._path(key, extension)
+            try:
+                with open(path, 'rb') as f:
+                    raw = f.read()
+                stored_at = os.path.getmtime(path)
+            except FileNotFoundError:
+                continue
+            if extension == 'zst':
+                if zstandard is None:
+                    continue
+                raw = zstandard.ZstdDecompressor().decompress(raw)
+            else:
+                raw = gzip.decompress(raw)
+            return json.loads(raw), stored_at
+        return None
+
+    def get(self, url, params=None):
+        entry = self._read(self.key(url, params))
+        # 離線重播時不管是否過期都直接使用
+        fresh = entry is not None and (
+            self.offline or time.time() - entry[1] <= self.ttls[endpoint_type(url)]
+        )
+        with self._lock:
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry[0] if fresh else None
+
+    def set(self, url, params, data):
+        key = self.key(url, params)
+        raw = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        if zstandard is not None:
+            extension, raw = 'zst', zstandard.ZstdCompressor(level=3).compress(raw)
+        else:
+            extension, raw = 'gz', gzip.compress(raw, compresslevel=6)
+
+        path = self._path(key, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先寫暫存檔再改名，中斷時不會留下寫了一半的快取
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(raw)
+        os.replace(tmp_path, path)
+
+    def log_stats(self):
+        total = self.hits + self.misses
+        hit_rate = self.hits / total * 100 if total else 0.0
+        logging.info(f"Response cache: {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate)")
@@ -0,0 +1,88 @@
+import logging
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:123.0) Gecko/20100101 Firefox/123.0'
+]
+
+
+class SessionManager:
+    """長時間共用的 HTTP session
+
+    連線池大小依並行數設定；暖機（取得 cookie）一次後跨類別沿用，超過 warmup_ttl 秒才重新暖機；
+    http2=True 時改用 httpx 的 HTTP/2 多工連線（需要 pip install httpx[http2]）
+    """
+
+    def __init__(self, pool_size=10, http2=False, warmup_ttl=30 * 60, user_agent=None):
+        self.pool_size = pool_size
+        self.http2 = http2
+        self.warmup_ttl = warmup_ttl
+        # 同一個 session 固定一個 User-Agent，和 cookie 一致
+        self.user_agent = user_agent or random.choice(USER_AGENTS)
+        self.warmups = 0
+        self._warmed_at = None
+        self._lock = threading.Lock()
+        if http2:
+            if httpx is None:
+                raise ImportError("HTTP/2 sessions require httpx: pip install 'httpx[http2]'")
+            self.request_errors = (httpx.HTTPError,)
+        else:
+            self.request_errors = (requests.exceptions.RequestException,)
+        self._client = self._create_client()
+
+    def _create_client(self):
+        if self.http2:
+            # 自訂 transport 時 Client 的 limits 不會生效，連線池大小要交給 transport
+            limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            transport = httpx.HTTPTransport(http2=True, retries=5, limits=limits)
+            return httpx.Client(http2=True, transport=transport)
+
+        session = requests.Session()
+        # 429/5xx 交給 get_request 與速率控制器處理，這裡只重試連線錯誤
+        retries = Retry(
+            total=5,
+            backoff_factor=0.5,
+            allowed_methods=["GET"],
+            respect_retry_after_header=False
+        )
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retries)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def get(self, url, params=None, headers=None, timeout=30):
+        if self.http2 and headers:
+            # HTTP/2 不允許 Connection 這類逐跳標頭
+            headers = {k: v for k, v in headers.items() if k.lower() not in ('connection', 'keep-alive')}
+        return self._client.get(url, params=params, headers=headers, timeout=timeout)
+
+    def needs_warm_up(self):
+        with self._lock:
+            return self._warmed_at is None or time.monotonic() - self._warmed_at > self.warmup_ttl
+
+    def mark_warm(self):
+        with self._lock:
+            self._warmed_at = time.monotonic()
+            self.warmups += 1
+
+    def invalidate(self):
+        """下次請求前重新暖機，例如 cookie 失效時"""
+        with self._lock:
+            self._warmed_at = None
+
+    def close(self):
+        self._client.close()
+        logging.info(f"Closed HTTP session after {self.warmups} warm-up requests")
@@ -0,0 +1,117 @@
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from code_registry import load_registry
+from main_scratch import JOBCAT_SEPARATOR, create_scraper
+from sinks import SINKS
+
+# 每個 shard 最近一輪的輸出路徑（相對於 shard 目錄），合併時只讀這些檔案
+MANIFEST = 'outputs.json'
+
+
+def parse_shard(value):
+    """解析 CLI 的 'i/N'（i 從 0 開始）"""
+    index, count = (int(part) for part in value.split('/'))
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard {value!r}: expected i/N with 0 <= i < N")
+    return index, count
+
+
+def shard_units(city_codes, job_codes, index, count):
+    """把 (城市, 職務類別) 矩陣輪流分配給 count 個 shard，回傳第 index 個 shard 的工作"""
+    units = [(city_name, job_name) for city_name in city_codes for job_name in job_codes]
+    return units[index::count]
+
+
+def shard_dir(output_dir, index, count):
+    return os.path.join(output_dir, 'shards', f'shard_{index}_of_{count}')
+
+
+def run_shard(index, count, output_dir='.', output_format='csv', city_prefixes=None, job_prefixes=None, **options):
+    """在獨立的 session 與速率預算下執行單一 shard，輸出、續跑佇列與增量索引都放在 shard 自己的目錄
+
+    city_prefixes / job_prefixes 限定要爬的代碼前綴，所有 shard 必須使用相同的設定；
+    options 為 create_scraper 的其他選項（incremental、cache_dir、pipeline、plan 等）
+    """
+    directory = shard_dir(output_dir, index, count)
+    os.makedirs(directory, exist_ok=True)
+    scraper = create_scraper(directory, output_format, **options)
+    try:
+        scraper.select_codes(city_prefixes, job_prefixes)
+        units = shard_units(scraper.city_codes, scraper.job_codes, index, count)
+        logging.info(f"Shard {index}/{count}: {len(units)} city/category units")
+        scraper.run(units)
+    finally:
+        scraper.session.close()
+    # 續跑佇列在完成後會清空，另外記下本輪的輸出，避免合併時混入之前的輸出檔
+    manifest = {name: os.path.relpath(path, directory) for name, path in scraper.run_outputs.items()}
+    with open(os.path.join(directory, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return directory
+
+
+def shard_outputs(directory):
+    """回傳 {城市名稱: 輸出路徑}，為 shard 最近一輪 run_shard 的輸出"""
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found: run the shard before merging")
+    with open(path, encoding='utf-8') as f:
+        return {name: os.path.join(directory, filename) for name, filename in json.load(f).items()}
+
+
+def merge_shards(count, output_dir='.', output_format='csv', city_names=None, batch_size=1000):
+    """合併各 shard 的輸出：同一職缺只保留一列，並把各 shard 命中的類別併入 JobCat
+
+    只讀各 shard 最近一輪記錄在 MANIFEST 的輸出，shard 目錄中之前的輸出檔不列入
+    """
+    sink_class = SINKS[output_format]
+    outputs = [shard_outputs(shard_dir(output_dir, index, count)) for index in range(count)]
+    if city_names is None:
+        city_names = load_registry().cities
+
+    for city_name in city_names:
+        files = [path for shard in outputs if city_name in shard for path in sink_class.written_files(shard[city_name])]
+        if not files:
+            continue
+
+        categories = {}
+        for path in files:
+            for row in sink_class.read_rows(path):
+                if row.get('code'):
+                    job_cats = categories.setdefault(row['code'], [])
+                    job_cats.extend(c for c in (row.get('JobCat') or '').split(JOBCAT_SEPARATOR) if c)
+
+        sink = sink_class(sink_class.output_path(output_dir, city_name, datetime.now()))
+        written = set()
+        batch = []
+        for path in files:
+            for row in sink_class.read_rows(path):
+                code = row.get('code')
+                if code:
+                    if code in written:
+                        continue
+                    written.add(code)
+                    row['JobCat'] = JOBCAT_SEPARATOR.join(dict.fromkeys(categories[code]))
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    sink.write(batch)
+                    batch = []
+        sink.write(batch)
+        sink.close()
+        logging.info(f"Merged {len(files)} shard outputs for {city_name}: {len(written)} unique jobs")
+
+
+def run_sharded(count, processes=None, output_dir='.', output_format='csv', city_prefixes=None, job_prefixes=None,
+                **options):
+    """以 process pool 在本機執行全部 shard，完成後合併"""
+    with ProcessPoolExecutor(max_workers=processes or count) as pool:
+        futures = [
+            pool.submit(run_shard, index, count, output_dir, output_format, city_prefixes, job_prefixes, **options)
+            for index in range(count)
+        ]
+        for future in futures:
+            future.result()
+    merge_shards(count, output_dir, output_format)
@@ -0,0 +1,307 @@
+import csv
+import glob
+import json
+import logging
+import os
+from datetime import date, datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# 與既有 CSV 表頭相同的欄位順序，JobCat 與 code 之後為職缺明細與公司資料
+JOB_COLUMNS = [
+    'jobType', 'jobNo', 'jobName', 'jobNameSnippet', 'jobRole', 'jobRo', 'jobAddrNo', 'jobAddrNoDesc',
+    'jobAddress', 'description', 'descWithoutHighlight', 'optionEdu', 'period', 'periodDesc', 'applyCnt',
+    'applyType', 'applyDesc', 'custNo', 'custName', 'coIndustry', 'coIndustryDesc', 'salaryLow', 'salaryHigh',
+    'salaryDesc', 's10', 'appearDate', 'appearDateDesc', 'optionZone', 'isApply', 'applyDate', 'isSave',
+    'descSnippet', 'tags', 'landmark', 'link', 'jobsource', 'jobNameRaw', 'custNameRaw', 'lon', 'lat',
+    'remoteWorkType', 'major', 'salaryType', 'dist', 'mrt', 'mrtDesc', 'JobCat', 'code',
+    'condition', 'jobCategory', 'company_employees', 'company_capital', 'welfare', 'skills', 'contact'
+]
+
+# 同一職缺命中多個職務類別時，JobCat 以此分隔
+JOBCAT_SEPARATOR = '、'
+
+# 欄式輸出時的型別；其餘欄位一律為字串
+INT_COLUMNS = {'applyCnt', 'salaryLow', 'salaryHigh', 'isApply', 'isSave'}
+FLOAT_COLUMNS = {'lon', 'lat'}
+DATE_COLUMNS = {'appearDate', 'applyDate'}
+# API 回傳的 dict / list 欄位，欄式輸出時存成 JSON 字串
+NESTED_COLUMNS = {'tags', 'link', 'major', 'condition', 'jobCategory', 'welfare', 'skills', 'contact'}
+
+
+class CsvSink:
+    """逐批把職缺附加到 UTF-8-BOM CSV，欄位固定為 JOB_COLUMNS
+
+    offset 為已確認寫入的檔案大小，續跑時會截掉超出的部分
+    """
+
+    extension = 'csv'
+
+    @classmethod
+    def output_path(cls, output_dir, city_name, now):
+        return os.path.join(output_dir, f'job_104_data_{city_name}_{now.strftime("%Y%m%d_%H%M")}.{cls.extension}')
+
+    @classmethod
+    def output_files(cls, output_dir, city_name):
+        """列出某城市在 output_dir 下的所有輸出檔"""
+        pattern = f'job_104_data_{glob.escape(city_name)}_*.{cls.extension}'
+        return sorted(glob.glob(os.path.join(glob.escape(output_dir), pattern)))
+
+    @classmethod
+    def latest_output(cls, output_dir, city_name):
+        """最近一次爬取的輸出檔"""
+        return cls.output_files(output_dir, city_name)[-1:]
+
+    @classmethod
+    def written_files(cls, filename):
+        """以 filename 建立的 sink 實際寫出的檔案"""
+        return [filename] if os.path.exists(filename) else []
+
+    def __init__(self, filename, offset=0, columns=JOB_COLUMNS):
+        self.filename = filename
+        self.columns = columns
+        self.offset = offset
+        # 丟棄上次中斷時寫了一半、尚未確認的資料
+        if os.path.exists(filename) and os.path.getsize(filename) > offset:
+            with open(filename, 'r+b') as f:
+                f.truncate(offset)
+
+    def write(self, jobs):
+        """寫入一批職缺並回傳新的 offset"""
+        if not jobs:
+            return self.offset
+        with open(self.filename, 'a', newline='', encoding='utf-8-sig') as f:
+            writer = csv.DictWriter(f, fieldnames=self.columns, extrasaction='ignore', lineterminator='\n')
+            if not self.offset:
+                writer.writeheader()
+            writer.writerows(jobs)
+        self.offset = os.path.getsize(self.filename)
+        return self.offset
+
+    @classmethod
+    def read_rows(cls, filename):
+        with open(filename, newline='', encoding='utf-8-sig') as f:
+            yield from csv.DictReader(f)
+
+    def _write_rows(self, filename, rows):
+        with open(filename, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.DictWriter(f, fieldnames=self.columns, extrasaction='ignore', lineterminator='\n')
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def merge_job_categories(self, extra, separator):
+        """以串流方式重寫檔案，把 extra（{code: [類別, ...]}）併入 JobCat"""
+        if not extra or not os.path.exists(self.filename):
+            return
+
+        def merged(rows):
+            for row in rows:
+                categories = [c for c in (row.get('JobCat') or '').split(separator) if c]
+                row['JobCat'] = separator.join(dict.fromkeys(categories + extra.get(row.get('code'), [])))
+                yield row
+
+        tmp_filename = f'{self.filename}.tmp'
+        self._write_rows(tmp_filename, merged(self.read_rows(self.filename)))
+        os.replace(tmp_filename, self.filename)
+        self.offset = os.path.getsize(self.filename)
+
+    def close(self):
+        if self.offset:
+            logging.info(f"Successfully saved data to {self.filename}")
+
+
+class JsonlSink(CsvSink):
+    """每行一筆 JSON 的輸出，巢狀欄位保留為 JSON 物件"""
+
+    extension = 'jsonl'
+
+    def write(self, jobs):
+        if not jobs:
+            return self.offset
+        with open(self.filename, 'a', encoding='utf-8') as f:
+            self._write_lines(f, jobs)
+        self.offset = os.path.getsize(self.filename)
+        return self.offset
+
+    def _write_lines(self, f, rows):
+        for row in rows:
+            record = {column: row.get(column) for column in self.columns}
+            f.write(json.dumps(record, ensure_ascii=False, default=str))
+            f.write('\n')
+
+    @classmethod
+    def read_rows(cls, filename):
+        with open(filename, encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+    def _write_rows(self, filename, rows):
+        with open(filename, 'w', encoding='utf-8') as f:
+            self._write_lines(f, rows)
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_date(value):
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(str(value), '%Y%m%d').date()
+    except ValueError:
+        return None
+
+
+def _to_json(value):
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _to_str(value):
+    if value is None or isinstance(value, str):
+        return value
+    return str(value)
+
+
+class ParquetSink:
+    """以 pyarrow 輸出具型別的 Parquet，依城市與爬取日期分區
+
+    目錄結構為 job_104_parquet/city=<城市>/crawl_date=<YYYY-MM-DD>/，每批寫成一個
+    <HHMM>-<序號>.parquet 檔；offset 為已確認寫入的檔案數
+    """
+
+    extension = 'parquet'
+    root = 'job_104_parquet'
+
+    @classmethod
+    def output_path(cls, output_dir, city_name, now):
+        return os.path.join(
+            output_dir, cls.root, f'city={city_name}', f'crawl_date={now.strftime("%Y-%m-%d")}', now.strftime("%H%M")
+        )
+
+    @classmethod
+    def output_files(cls, output_dir, city_name):
+        pattern = os.path.join(glob.escape(output_dir), cls.root, f'city={glob.escape(city_name)}', '*', '*.parquet')
+        return sorted(glob.glob(pattern))
+
+    @classmethod
+    def latest_output(cls, output_dir, city_name):
+        """最近一次爬取的所有 part 檔（同一分區目錄下相同的 HHMM 前綴）"""
+        files = cls.output_files(output_dir, city_name)
+        if not files:
+            return []
+        directory = os.path.dirname(files[-1])
+        prefix = os.path.basename(files[-1]).rsplit('-', 1)[0] + '-'
+        return [path for path in files if os.path.dirname(path) == directory and os.path.basename(path).startswith(prefix)]
+
+    @classmethod
+    def written_files(cls, filename):
+        """filename 為 <HHMM> 前綴，實際寫出的是 <HHMM>-<序號>.parquet"""
+        return sorted(glob.glob(f'{glob.escape(filename)}-*.parquet'))
+
+    @classmethod
+    def read_rows(cls, filename):
+        yield from pq.read_table(filename).to_pylist()
+
+    def __init__(self, filename, offset=0, columns=JOB_COLUMNS):
+        if pa is None:
+            raise ImportError("Parquet output requires pyarrow: pip install pyarrow")
+        self.filename = filename
+        self.columns = columns
+        self.offset = offset
+        self.schema = pa.schema([(column, self._arrow_type(column)) for column in columns])
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        # 丟棄上次中斷時寫出、尚未確認的檔案
+        for part in self._parts()[offset:]:
+            os.remove(part)
+
+    def _arrow_type(self, column):
+        if column in INT_COLUMNS:
+            return pa.int64()
+        if column in FLOAT_COLUMNS:
+            return pa.float64()
+        if column in DATE_COLUMNS:
+            return pa.date32()
+        return pa.string()
+
+    def _converter(self, column):
+        if column in INT_COLUMNS:
+            return _to_int
+        if column in FLOAT_COLUMNS:
+            return _to_float
+        if column in DATE_COLUMNS:
+            return _to_date
+        if column in NESTED_COLUMNS:
+            return _to_json
+        return _to_str
+
+    def _parts(self):
+        return self.written_files(self.filename)
+
+    def _to_table(self, jobs):
+        arrays = {}
+        for column in self.columns:
+            convert = self._converter(column)
+            arrays[column] = [convert(job.get(column)) for job in jobs]
+        return pa.Table.from_pydict(arrays, schema=self.schema)
+
+    def write(self, jobs):
+        if not jobs:
+            return self.offset
+        pq.write_table(self._to_table(jobs), f'{self.filename}-{self.offset:05d}.parquet')
+        self.offset += 1
+        return self.offset
+
+    def write_frame(self, df):
+        """一次寫入整個 DataFrame（已依 schema 正規化，巢狀欄位為 JSON 字串），例如由舊 CSV 轉入"""
+        if df.empty:
+            return self.offset
+        table = pa.Table.from_pandas(df.reindex(columns=self.columns), schema=self.schema, preserve_index=False)
+        pq.write_table(table, f'{self.filename}-{self.offset:05d}.parquet')
+        self.offset += 1
+        return self.offset
+
+    def merge_job_categories(self, extra, separator):
+        """逐檔把 extra（{code: [類別, ...]}）併入 JobCat"""
+        if not extra:
+            return
+        for part in self._parts():
+            table = pq.read_table(part)
+            codes = table.column('code').to_pylist()
+            if not any(code in extra for code in codes):
+                continue
+            job_cats = [
+                separator.join(dict.fromkeys([c for c in (job_cat or '').split(separator) if c] + extra.get(code, [])))
+                for code, job_cat in zip(codes, table.column('JobCat').to_pylist())
+            ]
+            index = table.schema.get_field_index('JobCat')
+            table = table.set_column(index, 'JobCat', pa.array(job_cats, pa.string()))
+            pq.write_table(table, f'{part}.tmp')
+            os.replace(f'{part}.tmp', part)
+
+    def close(self):
+        if self.offset:
+            logging.info(f"Successfully saved data to {os.path.dirname(self.filename)}")
+
+
+SINKS = {
+    'csv': CsvSink,
+    'jsonl': JsonlSink,
+    'parquet': ParquetSink
+}